@@ -2,14 +2,27 @@
 
 
 import argparse
+import filecmp
+import json
 import logging
+import operator
 import os
 import sys
 
 from . import dpkg_graph
+from . import timings
+from .graph import components
+from .graph import error as graph_error
 import purgatory.logging
 
 
+# Sorts graph members by uid with the precomputed integer keys.
+_SORT_KEY = operator.attrgetter("sort_key")
+
+# Characters that turn a package name into a regular expression (see apt-get).
+_REGEX_SPECIAL_CHARS = frozenset(".?+*|[^$")
+
+
 def _generate_graph(parsed_args):
     """Generates a dot file for Graphviz's dot tool representing the graph.
 
@@ -22,14 +35,19 @@ def _generate_graph(parsed_args):
     logging.info("Initializing dpkg graph ...")
     graph = dpkg_graph.DpkgGraph(
         ignore_recommends=parsed_args.ignore_recommends,
-        dpkg_db=parsed_args.dpkg_status_database)
+        dpkg_db=parsed_args.dpkg_status_database,
+        architecture=parsed_args.arch,
+        foreign_architectures=parsed_args.foreign_arch,
+        timings=parsed_args.timings)
 
     logging.info("Generating GraphViz graph from the dpkg graph ... "
                  "(this can take a while)")
-    agraph = graph.graphviz_graph
+    with parsed_args.timings.phase("graphviz graph"):
+        agraph = graph.graphviz_graph
 
     logging.debug("Writing dot file '%s' ...", parsed_args.dotfile)
-    agraph.write(parsed_args.dotfile)
+    with parsed_args.timings.phase("dot file writing"):
+        agraph.write(parsed_args.dotfile)
 
     logging.info("To layout/render the graph with GraphViz's dot tool:")
     logging.info("  dot -T svg -O '%s'", parsed_args.dotfile)
@@ -48,6 +66,162 @@ def _generate_graph(parsed_args):
     return 0
 
 
+def _export_graph(parsed_args):
+    """Exports the graph with the attributes of its nodes and edges.
+
+    Args:
+        parsed_args: The parsed command line arguments.
+
+    Returns:
+        Returns the exit code.
+    """
+    logging.info("Initializing dpkg graph ...")
+    graph = dpkg_graph.DpkgGraph(
+        ignore_recommends=parsed_args.ignore_recommends,
+        dpkg_db=parsed_args.dpkg_status_database,
+        architecture=parsed_args.arch,
+        foreign_architectures=parsed_args.foreign_arch,
+        timings=parsed_args.timings)
+
+    output = parsed_args.output
+    if output == "-" and parsed_args.format in ("graphml", "json"):
+        output = sys.stdout
+    logging.info("Exporting the dpkg graph as %s to '%s' ...",
+                 parsed_args.format, parsed_args.output)
+    try:
+        with parsed_args.timings.phase("export"):
+            graph.export(output, export_format=parsed_args.format,
+                         batch_size=parsed_args.batch_size)
+    except (ImportError, OSError) as ex:
+        logging.error("Exporting the dpkg graph failed: %s", ex)
+        return 1
+
+    return 0
+
+
+def _list_purge_impact(parsed_args):
+    """Lists the expected purge impact of packages.
+
+    Args:
+        parsed_args: The parsed command line arguments.
+
+    Returns:
+        Returns the exit code.
+    """
+    logging.debug("Initializing dpkg graph ...")
+    graph = dpkg_graph.DpkgGraph(
+        ignore_recommends=parsed_args.ignore_recommends,
+        dpkg_db=parsed_args.dpkg_status_database,
+        architecture=parsed_args.arch,
+        foreign_architectures=parsed_args.foreign_arch,
+        timings=parsed_args.timings)
+
+    logging.debug("Determining the purge impact of the packages ...")
+    with parsed_args.timings.phase("purge impact"):
+        node_to_impact = graph.purge_impact
+    installed_pkg_to_impact = {
+        str(node): node_to_impact[node] for node in graph.package_nodes}
+
+    # Without packages the purge impact of all packages will be listed.
+    pkgs = parsed_args.packages
+    if not pkgs:
+        pkgs = installed_pkg_to_impact.keys()
+
+    pkgs_impact = []
+    for pkg in pkgs:
+        impact = installed_pkg_to_impact.get(pkg)
+        if impact is None:  # pragma: no cover
+            logging.info(
+                "The package '%s' is not installed and hence has no purge "
+                "impact.", pkg)
+        else:
+            pkgs_impact.append((pkg, impact))
+
+    # Sort by impact (highest first) and then by package name.
+    pkgs_impact.sort(key=lambda pkg_impact: (-pkg_impact[1], pkg_impact[0]))
+    for pkg, impact in pkgs_impact:
+        print("%s %.3f" % (pkg, impact))
+
+    return 0
+
+
+def _format_size(size):
+    """Returns a human readable string for a size in KiB."""
+    if size < 1024:
+        return "%d KiB" % size
+    size /= 1024
+    if size < 1024:
+        return "%.1f MiB" % size
+    return "%.1f GiB" % (size / 1024)
+
+
+def _print_records(records, output_format, record_to_text):
+    """Prints the records in the given output format.
+
+    Each record is printed as soon as it has been taken from the records
+    iterable.  Hence consumers of the output can start to process the records
+    while the remaining records are still being determined.
+
+    Args:
+        records: Iterable of records (dicts with JSON serializable values).
+        output_format: 'jsonl' for one JSON object per line, 'json' for a JSON
+            array with one object per line or 'text' for the human readable
+            text format.
+        record_to_text: Function returning the text line for a record.
+    """
+    if output_format == "json":
+        print("[")
+    separator = ""
+    for record in records:
+        if output_format == "text":
+            print(record_to_text(record))
+        elif output_format == "json":
+            print(separator + json.dumps(record, sort_keys=True), end="")
+            separator = ",\n"
+        else:
+            print(json.dumps(record, sort_keys=True))
+    if output_format == "json":
+        print("\n]" if separator else "]")
+
+
+def _print_timings(timings, output_format):
+    """Prints the recorded phases to stderr.
+
+    stderr keeps the report apart from the output of the command.
+
+    Args:
+        timings: Timings (purgatory.timings.Timings).
+        output_format: 'json' for a JSON array with an object per phase or
+            'text' for the human readable text format.
+    """
+    phase_timings = timings.phase_timings
+    if output_format == "json":
+        print(json.dumps([phase_timing._asdict()
+                          for phase_timing in phase_timings]),
+              file=sys.stderr)
+        return
+    for phase_timing in phase_timings:
+        line = "%-44s %9.3f s" % (
+            "  " * phase_timing.depth + phase_timing.phase,
+            phase_timing.seconds)
+        if phase_timing.allocated is not None:
+            line += "  allocated %+d KiB" % (phase_timing.allocated // 1024)
+        if phase_timing.peak is not None:
+            line += "  peak %d KiB" % (phase_timing.peak // 1024)
+        print(line, file=sys.stderr)
+
+
+def _leaf_record_to_text(record):
+    """Returns the text line for a leaf record."""
+    if "descriptions" not in record:
+        return record["name"]
+    footprint = record["footprint"]
+    return "%s\t%d\t%s\t%s" % (
+        record["name"], footprint["packages"],
+        _format_size(footprint["installed_size"]),
+        "; ".join(record["descriptions"]))
+
+
 def _list_leaf_packages(parsed_args):
     """Lists the leaf packages.
 
@@ -60,35 +234,180 @@ def _list_leaf_packages(parsed_args):
     logging.debug("Initializing dpkg graph ...")
     graph = dpkg_graph.DpkgGraph(
         ignore_recommends=parsed_args.ignore_recommends,
-        dpkg_db=parsed_args.dpkg_status_database)
+        dpkg_db=parsed_args.dpkg_status_database,
+        keep=_keep_packages(parsed_args),
+        architecture=parsed_args.arch,
+        foreign_architectures=parsed_args.foreign_arch,
+        timings=parsed_args.timings)
 
     logging.debug("Determining leafs of the dpkg graph ...")
-    leafs = graph.leafs
+    with parsed_args.timings.phase("leafs"):
+        leafs = graph.leafs
     logging.debug("  Leafs: %d", len(leafs))
 
+    # The footprint (purged packages and their size) is only determined if it
+    # is needed as it requires to simulate the purge of each leaf.
+    with_footprint = parsed_args.long or (
+        parsed_args.sort != "name" and not parsed_args.unsorted)
+
+    def leaf_records():
+        """Yields a record per leaf."""
+        for leaf in leafs:
+            if graph.keep_node in leaf:
+                continue  # The KeepNode is a leaf but not a package.
+
+            # Most leafs consist only of a single PackageNode. The only
+            # exception are leaf cycles that consist of several PackageNodes
+            # and TargetVersionsNodes to glue the PackageNodes together. Leaf
+            # cycles can be arbitrarily complex and hence it is impossible to
+            # print the relationship between the nodes in a leaf cycle as text
+            # output. So only the PackageNodes are printed.
+            leaf_pkg_nodes = [
+                node for node in leaf
+                if isinstance(node, dpkg_graph.package_node.PackageNode)]
+            leaf_pkg_nodes.sort(key=_SORT_KEY)
+            leaf_pkgs = [str(node) for node in leaf_pkg_nodes]
+            record = {
+                "name": " ".join(leaf_pkgs),
+                "cycle_members": leaf_pkgs if len(leaf_pkgs) > 1 else [],
+                "layer": 0,
+            }
+            if with_footprint:
+                try:
+                    footprint = graph.purge_footprint(leaf)
+                except dpkg_graph.KeepNodeCanNotBeMarkedDeletedError:
+                    logging.debug(
+                        "Skipping the leaf '%s' as purging it would purge "
+                        "packages that need to be kept.", record["name"])
+                    continue
+                record["footprint"] = {
+                    "packages": len(footprint.package_nodes),
+                    "installed_size": footprint.installed_size,
+                }
+            if parsed_args.long:
+                descriptions = []
+                for node in leaf_pkg_nodes:
+                    metadata = node.metadata
+                    if metadata is not None and metadata.description:
+                        descriptions.append(metadata.description)
+                record["descriptions"] = descriptions
+            yield record
+
     logging.debug("Listing leafs of the dpkg graph ...")
-    leafs_str = []
-    for leaf in leafs:
-        # Most leafs consist only of a single PackageNode. The only exception
-        # are leaf cycles that consist of several PackageNodes and
-        # TargetVersionsNodes to glue the PackageNodes together. Leaf cycles
-        # can be arbitrarily complex and hence it is impossible to print the
-        # relationship between the nodes in a leaf cycle as text output. So
-        # only the PackageNodes are printed.
-        leaf_str_list = []
-        for node in leaf:
-            if isinstance(node, dpkg_graph.package_node.PackageNode):
-                leaf_str_list.append(str(node))
-        leaf_str_list.sort()
-        leaf_str = " ".join(leaf_str_list)
-        leafs_str.append(leaf_str)
-    leafs_str.sort()
-    for leaf_str in leafs_str:
-        print(leaf_str)
+    # The records are generated lazily and hence the footprints are
+    # determined while the records are sorted or printed.
+    with parsed_args.timings.phase("leaf listing"):
+        records = leaf_records()
+        if not parsed_args.unsorted:
+            # Sort by name or by the number of purged packages or the total
+            # size of the purged packages (both largest first).
+            if parsed_args.sort == "count":
+                records = sorted(records, key=lambda record: (
+                    -record["footprint"]["packages"], record["name"]))
+            elif parsed_args.sort == "size":
+                records = sorted(records, key=lambda record: (
+                    -record["footprint"]["installed_size"], record["name"]))
+            else:
+                records = sorted(records, key=lambda record: record["name"])
+
+        _print_records(records, parsed_args.format, _leaf_record_to_text)
 
     return 0
 
 
+def _plan_reinstall(parsed_args):
+    """Prints the apt command to restore the installed packages.
+
+    Args:
+        parsed_args: The parsed command line arguments.
+
+    Returns:
+        Returns the exit code.
+    """
+    logging.debug("Initializing dpkg graph ...")
+    graph = dpkg_graph.DpkgGraph(
+        ignore_recommends=parsed_args.ignore_recommends,
+        dpkg_db=parsed_args.dpkg_status_database,
+        keep=_keep_packages(parsed_args),
+        architecture=parsed_args.arch,
+        foreign_architectures=parsed_args.foreign_arch,
+        timings=parsed_args.timings)
+
+    logging.debug("Determining the reinstall plan ...")
+    plan = graph.reinstall_plan(baseline_dpkg_db=parsed_args.baseline)
+    logging.debug(
+        "%d packages to install and %d packages to prevent.",
+        len(plan.install), len(plan.prevent))
+    if not plan.install:
+        logging.info(
+            "The baseline already contains all installed packages.")
+        return 0
+
+    # Appending '-' to a package name tells apt to not install the package.
+    print(
+        "Run this apt command after a minimal install to install all leaf "
+        "packages without installing the recommended packages that aren't "
+        "installed now:")
+    cmd = "apt install %s" % " ".join(
+        plan.install + [pkg + "-" for pkg in plan.prevent])
+    if os.geteuid() != 0:
+        cmd = "sudo " + cmd
+    print(cmd)
+
+    return 0
+
+
+def _select_package_nodes(graph, packages, globs):
+    """Selects the package nodes by package names and patterns.
+
+    Like with Apt a package is selected by its exact name.  If no package
+    with the exact name is installed then the name is treated as a regular
+    expression if it contains characters with a special meaning in regular
+    expressions.  Patterns have to match the whole package name.
+
+    Args:
+        graph: The DpkgGraph to select the package nodes from.
+        packages: List of package names or regular expressions.
+        globs: List of shell-style wildcard patterns.
+
+    Returns:
+        Set of the selected package nodes.
+
+    Raises:
+        purgatory.graph.InvalidNamePatternError: If a regular expression is
+            invalid.
+    """
+    name_index = graph.package_name_index
+    pkg_nodes = set()
+    for pkg in sorted(packages):
+        pkg_node = name_index.get(pkg)
+        if pkg_node is not None:
+            pkg_nodes |= set((pkg_node,))
+            continue
+        if _REGEX_SPECIAL_CHARS.intersection(pkg):
+            matches = name_index.match_regex(pkg)
+            logging.debug(
+                "The regular expression '%s' matches %d packages.", pkg,
+                len(matches))
+            if matches:
+                pkg_nodes |= set(matches.values())
+                continue
+        logging.info(
+            "The package '%s' is not installed and hence doesn't need to be "
+            "marked for removal.", pkg)
+    for pattern in sorted(globs):
+        matches = name_index.match_glob(pattern)
+        logging.debug(
+            "The glob pattern '%s' matches %d packages.", pattern,
+            len(matches))
+        if not matches:
+            logging.info(
+                "No installed package matches the glob pattern '%s'.",
+                pattern)
+        pkg_nodes |= set(matches.values())
+    return pkg_nodes
+
+
 def _purge_packages(parsed_args):
     """Purges the specified packages.
 
@@ -101,38 +420,159 @@ def _purge_packages(parsed_args):
     logging.debug("Initializing dpkg graph ...")
     graph = dpkg_graph.DpkgGraph(
         ignore_recommends=parsed_args.ignore_recommends,
-        dpkg_db=parsed_args.dpkg_status_database)
-
-    logging.debug("Building map of package names to packages nodes ...")
-    installed_pkg_to_pkg_node = {
-        str(pkg_node): pkg_node for pkg_node in graph.package_nodes}
+        dpkg_db=parsed_args.dpkg_status_database,
+        keep=_keep_packages(parsed_args),
+        architecture=parsed_args.arch,
+        foreign_architectures=parsed_args.foreign_arch,
+        timings=parsed_args.timings)
 
     logging.debug(
         "Checking if the packages to purge are part of the dpkg graph ...")
-    parsed_args.packages.sort()
-    pkg_nodes_to_purge = set()
-    for pkg_to_purge in parsed_args.packages:
-        pkg_node_to_purge = installed_pkg_to_pkg_node.get(pkg_to_purge)
-        if pkg_node_to_purge is None:  # pragma: no cover
-            logging.info(
-                "The package '%s' is not installed and hence doesn't need to "
-                "be marked for removal.", pkg_to_purge)
-        else:
-            pkg_nodes_to_purge.add(pkg_node_to_purge)
+    try:
+        pkg_nodes_to_purge = _select_package_nodes(
+            graph, parsed_args.packages, parsed_args.glob)
+    except graph_error.InvalidNamePatternError as ex:
+        logging.error("%s", ex)
+        return 1
+
+    # Protected packages are pruned up front as purging them would purge
+    # packages that need to be kept.
+    for pkg_node in sorted(
+            pkg_nodes_to_purge & graph.protected_nodes, key=_SORT_KEY):
+        logging.info(
+            "The package '%s' needs to be kept and hence won't be marked for "
+            "removal.", pkg_node)
+    pkg_nodes_to_purge -= graph.protected_nodes
+
+    # The Apt simulation is started before the packages are marked for
+    # removal as it runs in a forked worker process that needs the graph
+    # without deleted members.
+    simulation = None
+    if parsed_args.verify:
+        logging.debug("Starting the simulation with Apt's resolver ...")
+        simulation = dpkg_graph.AptPurgeSimulation(
+            graph, [str(node) for node in pkg_nodes_to_purge])
+
+    # Cycles are determined before marking the packages as deleted as the
+    # components can't be determined for nodes marked as deleted.
+    pkg_node_to_cycle_members = {}
+    if parsed_args.format != "text":
+        logging.debug("Determining the cycles of the dpkg graph ...")
+        comps = components.strongly_connected_components(graph.nodes)
+        for component in comps:
+            cycle_members = sorted(
+                str(node) for node in component
+                if isinstance(node, dpkg_graph.package_node.PackageNode))
+            if len(cycle_members) > 1:
+                for node in component:
+                    pkg_node_to_cycle_members[node] = cycle_members
+
+    def deleted_pkg_records():
+        """Yields a record per package marked for removal.
+
+        The packages are marked for removal round by round and the records of
+        a round are yielded before the next round is determined.
+        """
+        rounds = graph.iter_mark_members_including_obsolete_deleted(
+            pkg_nodes_to_purge)
+        for layer, round_deleted in enumerate(rounds):
+            round_pkg_nodes = [
+                node for node in round_deleted
+                if isinstance(node, dpkg_graph.package_node.PackageNode)]
+            if not parsed_args.unsorted:
+                round_pkg_nodes.sort(key=_SORT_KEY)
+            for pkg_node in round_pkg_nodes:
+                metadata = pkg_node.metadata
+                yield {
+                    "name": str(pkg_node),
+                    "cycle_members": pkg_node_to_cycle_members.get(
+                        pkg_node, []),
+                    "layer": layer,
+                    "installed_size": (
+                        metadata.installed_size if metadata else None),
+                }
 
     logging.debug(
         "Mark the packages to purge and packages that are obsoleted by this "
         "operation for removal ...")
-    graph.mark_members_including_obsolete_deleted(pkg_nodes_to_purge)
+    records = deleted_pkg_records()
+    try:
+        if not parsed_args.unsorted:
+            records = sorted(records, key=lambda record: record["name"])
 
-    logging.debug("Getting list of packages marked for removal ...")
-    deleted_pkgs = [str(pkg_node) for pkg_node in graph.deleted_package_nodes]
-    deleted_pkgs.sort()
-    logging.debug("%d packages marked for removal.", len(deleted_pkgs))
+        if parsed_args.format != "text":
+            _print_records(records, parsed_args.format, None)
+        else:
+            deleted_pkgs = [record["name"] for record in records]
+            logging.debug(
+                "%d packages marked for removal.", len(deleted_pkgs))
+            print(
+                "Run this apt command to purge the requested packages and "
+                "all packages that would be obsoleted by this operation:")
+            cmd = "apt purge %s" % " ".join(deleted_pkgs)
+            if os.geteuid() != 0:
+                cmd = "sudo " + cmd
+            print(cmd)
+    except dpkg_graph.KeepNodeCanNotBeMarkedDeletedError:
+        logging.error(
+            "The packages can't be purged without purging packages that "
+            "need to be kept.")
+        return 1
+
+    if simulation is None:
+        return 0
+    return _verify_purge(graph, simulation)
+
+
+def _autoremove_packages(parsed_args):
+    """Prints the apt command to purge the packages that are no longer needed.
+
+    Args:
+        parsed_args: The parsed command line arguments.
+
+    Returns:
+        Returns the exit code.
+    """
+    logging.debug("Initializing dpkg graph ...")
+    graph = dpkg_graph.DpkgGraph(
+        ignore_recommends=parsed_args.ignore_recommends,
+        dpkg_db=parsed_args.dpkg_status_database,
+        keep=_keep_packages(parsed_args),
+        architecture=parsed_args.arch,
+        foreign_architectures=parsed_args.foreign_arch,
+        extended_states=parsed_args.extended_states,
+        timings=parsed_args.timings)
+
+    logging.debug("Determining the packages that are no longer needed ...")
+    try:
+        pkg_nodes = graph.autoremovable_package_nodes
+    except OSError as ex:
+        logging.error("Can't read Apt's extended states: %s", ex)
+        return 1
+    logging.debug(
+        "%d of %d automatically installed packages are no longer needed.",
+        len(pkg_nodes), len(graph.auto_installed_packages))
+
+    records = []
+    for pkg_node in pkg_nodes:
+        metadata = pkg_node.metadata
+        records.append({
+            "name": str(pkg_node),
+            "installed_size": metadata.installed_size if metadata else None,
+        })
+    if not parsed_args.unsorted:
+        records.sort(key=lambda record: record["name"])
+
+    if parsed_args.format != "text":
+        _print_records(records, parsed_args.format, None)
+        return 0
+    if not records:
+        logging.info("All automatically installed packages are still needed.")
+        return 0
     print(
-        "Run this apt command to purge the requested packages and all "
-        "packages that would be obsoleted by this operation:")
-    cmd = "apt purge %s" % " ".join(deleted_pkgs)
+        "Run this apt command to purge the automatically installed packages "
+        "that are no longer needed:")
+    cmd = "apt purge %s" % " ".join(record["name"] for record in records)
     if os.geteuid() != 0:
         cmd = "sudo " + cmd
     print(cmd)
@@ -140,6 +580,253 @@ def _purge_packages(parsed_args):
     return 0
 
 
+def _package_names(nodes):
+    """Returns the sorted list of the package names of the nodes."""
+    return sorted(
+        str(node) for node in nodes
+        if isinstance(node, dpkg_graph.package_node.PackageNode))
+
+
+def _diff_record_to_text(record):
+    """Returns the text line for a diff record."""
+    sign = {"added": "+", "removed": "-", "changed": "~"}[record["change"]]
+    if record["kind"] == "cycle":
+        return "%s cycle (%s)" % (sign, " ".join(record["cycle_members"]))
+    if record["kind"] == "footprint":
+        footprint = record["footprint"]
+        return "%s footprint %s: %+d packages, %s%s" % (
+            sign, record["name"], footprint["packages"],
+            "-" if footprint["installed_size"] < 0 else "+",
+            _format_size(abs(footprint["installed_size"])))
+    return "%s %s %s" % (sign, record["kind"], record["name"])
+
+
+def _diff_dpkg_status_databases(parsed_args):
+    """Lists the differences between two dpkg status databases.
+
+    Args:
+        parsed_args: The parsed command line arguments.
+
+    Returns:
+        Returns the exit code.
+    """
+    graph_args = dict(
+        ignore_recommends=parsed_args.ignore_recommends,
+        architecture=parsed_args.arch,
+        foreign_architectures=parsed_args.foreign_arch,
+        timings=parsed_args.timings)
+    if filecmp.cmp(parsed_args.old_dpkg_status_database,
+                   parsed_args.new_dpkg_status_database, shallow=False):
+        logging.info("The dpkg status databases are the same.")
+        return 0
+
+    # The graphs are built independently of each other.  As they are built
+    # in the same process their members share the interned ids and hence can
+    # be compared directly.
+    logging.debug("Initializing old dpkg graph ...")
+    old_graph = dpkg_graph.DpkgGraph(
+        dpkg_db=parsed_args.old_dpkg_status_database, **graph_args)
+    logging.debug("Initializing new dpkg graph ...")
+    new_graph = dpkg_graph.DpkgGraph(
+        dpkg_db=parsed_args.new_dpkg_status_database, **graph_args)
+
+    logging.debug("Determining the differences of the dpkg graphs ...")
+    with parsed_args.timings.phase("diff"):
+        graph_diff = old_graph.diff(new_graph)
+    records = []
+    for change, nodes in (("added", graph_diff.added_nodes),
+                          ("removed", graph_diff.removed_nodes)):
+        for pkg in _package_names(nodes):
+            records.append({"change": change, "kind": "package", "name": pkg})
+    for change, leafs in (("added", graph_diff.added_leafs),
+                          ("removed", graph_diff.removed_leafs)):
+        for leaf in leafs:
+            records.append({"change": change, "kind": "leaf",
+                            "name": " ".join(_package_names(leaf))})
+    for change, cycles in (("added", graph_diff.added_cycles),
+                           ("removed", graph_diff.removed_cycles)):
+        for cycle in cycles:
+            cycle_members = _package_names(cycle)
+            if len(cycle_members) > 1:
+                records.append({"change": change, "kind": "cycle",
+                                "name": " ".join(cycle_members),
+                                "cycle_members": cycle_members})
+
+    logging.debug("Determining the footprint changes of the leafs ...")
+    for leaf, delta in old_graph.footprint_deltas(
+            new_graph, graph_diff).items():
+        records.append({"change": "changed", "kind": "footprint",
+                        "name": " ".join(_package_names(leaf)),
+                        "footprint": {
+                            "packages": delta.packages,
+                            "installed_size": delta.installed_size,
+                        }})
+
+    if not parsed_args.unsorted:
+        kind_order = {"package": 0, "leaf": 1, "cycle": 2, "footprint": 3}
+        records.sort(key=lambda record: (
+            kind_order[record["kind"]], record["name"], record["change"]))
+    _print_records(records, parsed_args.format, _diff_record_to_text)
+
+    return 0
+
+
+def _verify_purge(graph, simulation):
+    """Compares the packages marked for removal with Apt's simulation.
+
+    Args:
+        graph: The DpkgGraph with the packages marked for removal.
+        simulation: The AptPurgeSimulation of the same purge.
+
+    Returns:
+        Returns the exit code; 0 if Apt's resolver reaches the same result.
+    """
+    logging.debug("Waiting for the simulation with Apt's resolver ...")
+    try:
+        apt_removed = simulation.result()
+    except dpkg_graph.AptSimulationError as ex:
+        logging.warning("%s", ex)
+        return 1
+
+    removed = set(str(node) for node in graph.deleted_package_nodes)
+    only_purgatory = sorted(removed - apt_removed)
+    only_apt = sorted(apt_removed - removed)
+    if not only_purgatory and not only_apt:
+        logging.info("Apt's resolver reaches the same result.")
+        return 0
+
+    logging.warning("Apt's resolver reaches a different result!")
+    if only_purgatory:
+        logging.warning(
+            "  Only removed by Purgatory: %s", " ".join(only_purgatory))
+    if only_apt:
+        logging.warning("  Only removed by Apt: %s", " ".join(only_apt))
+    return 1
+
+
+def _chain_record_hops(chain):
+    """Returns the lists of the package names of the hops of a chain.
+
+    Hops without packages (e.g. TargetVersionsNodes) are omitted.  A hop with
+    several packages is a cycle.
+    """
+    hops = []
+    for comp in chain:
+        hop = sorted(
+            str(node) for node in comp
+            if isinstance(node, dpkg_graph.package_node.PackageNode))
+        if hop:
+            hops.append(hop)
+    return hops
+
+
+def _why_record_to_text(record):
+    """Returns the text lines for a why record."""
+    lines = []
+    for chain in record["chains"]:
+        lines.append("%s: %s" % (record["name"], " -> ".join(
+            hop[0] if len(hop) == 1 else "(%s)" % " ".join(hop)
+            for hop in chain)))
+    return "\n".join(lines)
+
+
+def _explain_packages(parsed_args):
+    """Explains why the specified packages are installed.
+
+    Args:
+        parsed_args: The parsed command line arguments.
+
+    Returns:
+        Returns the exit code.
+    """
+    logging.debug("Initializing dpkg graph ...")
+    graph = dpkg_graph.DpkgGraph(
+        ignore_recommends=parsed_args.ignore_recommends,
+        dpkg_db=parsed_args.dpkg_status_database,
+        architecture=parsed_args.arch,
+        foreign_architectures=parsed_args.foreign_arch,
+        timings=parsed_args.timings)
+
+    name_index = graph.package_name_index
+    pkg_nodes = []
+    for pkg in parsed_args.packages:
+        pkg_node = name_index.get(pkg)
+        if pkg_node is None:
+            logging.info(
+                "The package '%s' is not installed and hence there is "
+                "nothing to explain.", pkg)
+        else:
+            pkg_nodes.append(pkg_node)
+
+    # A single package is looked up interactively.  Several packages are
+    # explained in a single pass over the graph.
+    logging.debug("Determining the chains from the leaf packages ...")
+    chain_index = graph.chain_index
+    if len(pkg_nodes) == 1:
+        pkg_node_to_chains = {pkg_nodes[0]: chain_index.shortest_chains(
+            pkg_nodes[0], k=parsed_args.chains)}
+    else:
+        pkg_node_to_chains = chain_index.shortest_chains_of(
+            pkg_nodes, k=parsed_args.chains)
+
+    records = [
+        {"name": str(pkg_node), "chains": [
+            _chain_record_hops(chain) for chain in chains]}
+        for pkg_node, chains in pkg_node_to_chains.items()]
+    if not parsed_args.unsorted:
+        records.sort(key=lambda record: record["name"])
+    _print_records(records, parsed_args.format, _why_record_to_text)
+
+    return 0
+
+
+def _keep_packages(parsed_args):
+    """Returns the set of the packages to keep.
+
+    Args:
+        parsed_args: The parsed command line arguments.
+
+    Returns:
+        Set of the package names given by the keep options and in the keep
+        files.  Empty lines and lines starting with '#' in keep files are
+        ignored.
+    """
+    pkgs = set(parsed_args.keep)
+    for keep_file in parsed_args.keep_file:
+        with keep_file:
+            for line in keep_file:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    pkgs |= set((line,))
+    return pkgs
+
+
+def _add_keep_arguments(parser):
+    """Adds the keep related optional arguments to the parser."""
+    parser.add_argument(
+        "-k", "--keep", default=[], action="append", metavar="<package>",
+        help=("keep the package and all packages it depends on; can be "
+              "given multiple times"))
+    parser.add_argument(
+        "-K", "--keep-file", default=[], action="append",
+        type=argparse.FileType("r"), metavar="<file>",
+        help=("keep the packages listed in the file (one package per line; "
+              "lines starting with '#' are ignored); can be given multiple "
+              "times"))
+
+
+def _add_output_arguments(parser):
+    """Adds the output format related optional arguments to the parser."""
+    parser.add_argument(
+        "-f", "--format", default="text", choices=("text", "jsonl", "json"),
+        help=("the output format; 'jsonl' prints one JSON record per line "
+              "and 'json' a JSON array of the records; defaults to 'text'"))
+    parser.add_argument(
+        "-u", "--unsorted", default=False, action="store_true",
+        help=("print the records as soon as they have been determined "
+              "instead of sorting them first; ignores the sort order"))
+
+
 def _parse_args(args):
     """Parses the command line arguments.
 
@@ -159,11 +846,36 @@ def _parse_args(args):
         metavar="<dpkg status db>",
         help=("the dpkg status database file to use; defaults to "
               "'/var/lib/dpkg/status'"))
+    common_args_parser.add_argument(
+        "-a", "--arch", default=argparse.SUPPRESS, metavar="<arch>",
+        help=("the native architecture of the system the dpkg status "
+              "database belongs to; defaults to the architecture of its "
+              "installed dpkg package"))
+    common_args_parser.add_argument(
+        "--foreign-arch", default=argparse.SUPPRESS, action="append",
+        metavar="<arch>",
+        help=("a foreign architecture of the system the dpkg status database "
+              "belongs to; can be given multiple times; defaults to the "
+              "other architectures of its installed packages"))
     common_args_parser.add_argument(
         "-i", "--ignore-recommends", default=False, action="store_true",
         help=("ignore recommends relationship between packages; typically "
               "allows to purge more packages but might result in unusual or "
               "undesirable configurations; use with great care"))
+    common_args_parser.add_argument(
+        "--timings", default=argparse.SUPPRESS, action="store_true",
+        dest="timings_enabled",
+        help=("print the duration of the phases of the command, e.g. of the "
+              "graph initialization, to stderr"))
+    common_args_parser.add_argument(
+        "--timings-format", default=argparse.SUPPRESS,
+        choices=("json", "text"),
+        help="output format for '--timings'; defaults to 'text'")
+    common_args_parser.add_argument(
+        "--trace-allocations", default=argparse.SUPPRESS,
+        action="store_true",
+        help=("trace the memory allocations of the phases with tracemalloc "
+              "for '--timings'; slows down the command considerably"))
 
     # Actual parser with all the subparsers for the commands. Giving a command
     # is mandatory.
@@ -174,6 +886,55 @@ def _parse_args(args):
         dest="command", metavar="<command>")
     subparsers.required = True
 
+    # 'autoremove' subcommand.
+    autoremove_parser = subparsers.add_parser(
+        "autoremove", parents=[common_args_parser],
+        help=("purges the automatically installed packages that are no "
+              "longer needed like 'apt autoremove' but without running "
+              "Apt's resolver"))
+    autoremove_parser.add_argument(
+        "-e", "--extended-states", default="/var/lib/apt/extended_states",
+        metavar="<extended states>",
+        help=("Apt's extended_states file with the automatically installed "
+              "packages; defaults to '/var/lib/apt/extended_states'"))
+    _add_keep_arguments(autoremove_parser)
+    _add_output_arguments(autoremove_parser)
+
+    # 'diff' subcommand.
+    diff_parser = subparsers.add_parser(
+        "diff", parents=[common_args_parser],
+        help=("lists the added and removed packages, leafs and cycles and "
+              "the changed purge footprints of the leafs between two dpkg "
+              "status databases"))
+    diff_parser.add_argument(
+        "old_dpkg_status_database", metavar="<old dpkg status db>",
+        help="the old dpkg status database file")
+    diff_parser.add_argument(
+        "new_dpkg_status_database", metavar="<new dpkg status db>",
+        help="the new dpkg status database file")
+    _add_output_arguments(diff_parser)
+
+    # 'export' subcommand.
+    export_parser = subparsers.add_parser(
+        "export", parents=[common_args_parser],
+        help=("exports the nodes and edges of Purgatory's internal graph with "
+              "their types, dependency types, probabilities, cycles and "
+              "layers for other tools"))
+    export_parser.add_argument(
+        "output", metavar="<output>",
+        help=("the output file for the 'graphml' and 'json' formats ('-' "
+              "for stdout) or the output directory for the nodes and edges "
+              "tables of the 'arrow' and 'parquet' formats"))
+    export_parser.add_argument(
+        "-f", "--format", default="json",
+        choices=("arrow", "graphml", "json", "parquet"),
+        help=("the export format; 'arrow' and 'parquet' need the pyarrow "
+              "module; defaults to 'json'"))
+    export_parser.add_argument(
+        "-b", "--batch-size", default=65536, type=int, metavar="<rows>",
+        help=("the number of rows per record batch or row group of the "
+              "'arrow' and 'parquet' formats; defaults to 65536"))
+
     # 'graph' subcommand.
     graph_parser = subparsers.add_parser(
         "graph", parents=[common_args_parser],
@@ -182,11 +943,33 @@ def _parse_args(args):
     graph_parser.add_argument(
         "dotfile", metavar="<dot file>", help="the path of the dot file")
 
+    # 'impact' subcommand.
+    impact_parser = subparsers.add_parser(
+        "impact", parents=[common_args_parser],
+        help=("lists the expected number of packages that would be purged "
+              "if the specified packages would be purged; alternatives "
+              "reduce the impact; lists all packages if none are specified"))
+    impact_parser.add_argument(
+        "packages", metavar="<package>", nargs="*",
+        help="package to determine the purge impact for")
+
     # 'leafs' subcommand.
-    subparsers.add_parser(
+    leafs_parser = subparsers.add_parser(
         "leafs", parents=[common_args_parser],
         help=("list the leaf packages; leaf packages are easily purgable "
               "because no other packages depend on them"))
+    leafs_parser.add_argument(
+        "-l", "--long", default=False, action="store_true",
+        help=("list the number and total installed size of the packages that "
+              "would be purged with each leaf and the short descriptions of "
+              "the leaf packages (tab separated)"))
+    _add_keep_arguments(leafs_parser)
+    _add_output_arguments(leafs_parser)
+    leafs_parser.add_argument(
+        "-s", "--sort", default="name", choices=("name", "count", "size"),
+        help=("sort the leafs by name, by the number of packages that would "
+              "be purged or by the total installed size of the packages that "
+              "would be purged; defaults to 'name'"))
 
     # 'purge' subcommand.
     purge_parser = subparsers.add_parser(
@@ -194,15 +977,68 @@ def _parse_args(args):
         help=("purges the specified packages and packages that will be "
               "obsoleted by this operation"))
     purge_parser.add_argument(
-        "packages", metavar="<package>", nargs="+", help="package to purge")
+        "packages", metavar="<package>", nargs="*",
+        help=("package to purge; treated as regular expression that has to "
+              "match the whole package name if no package with this name is "
+              "installed"))
+    purge_parser.add_argument(
+        "-g", "--glob", default=[], action="append", metavar="<pattern>",
+        help=("purge the packages matching the shell-style wildcard "
+              "pattern; can be given multiple times"))
+    purge_parser.add_argument(
+        "--verify", default=False, action="store_true",
+        help=("simulate the purge with Apt's resolver in a background "
+              "process and report differences to Purgatory's result; exits "
+              "with 1 if the results differ"))
+    _add_keep_arguments(purge_parser)
+    _add_output_arguments(purge_parser)
+
+    # 'reinstall-plan' subcommand.
+    reinstall_plan_parser = subparsers.add_parser(
+        "reinstall-plan", parents=[common_args_parser],
+        help=("prints a single apt command that restores the installed "
+              "packages after a minimal install"))
+    reinstall_plan_parser.add_argument(
+        "-b", "--baseline", default=None, metavar="<dpkg status db>",
+        help=("the dpkg status database of the minimal install; packages "
+              "installed there are omitted from the apt command"))
+    _add_keep_arguments(reinstall_plan_parser)
+
+    # 'why' subcommand.
+    why_parser = subparsers.add_parser(
+        "why", parents=[common_args_parser],
+        help=("explains why the specified packages are installed by the "
+              "shortest chains of dependencies from leaf packages; cycles "
+              "are shown as a single hop in parentheses"))
+    why_parser.add_argument(
+        "packages", metavar="<package>", nargs="+",
+        help="installed package to explain")
+    why_parser.add_argument(
+        "-n", "--chains", default=1, type=int, metavar="<count>",
+        help=("the maximal number of chains per package, shortest first; "
+              "defaults to 1"))
+    _add_output_arguments(why_parser)
 
     # Parse command line arguments and determine the function to handle the
     # command.
     parsed_args = root_parser.parse_args(args)
+    if (parsed_args.command == "purge" and not parsed_args.packages and
+            not parsed_args.glob):
+        purge_parser.error("at least one package or pattern is required")
+    if parsed_args.command == "export" and parsed_args.batch_size < 1:
+        export_parser.error("the batch size must be at least 1")
+    if parsed_args.command == "why" and parsed_args.chains < 1:
+        why_parser.error("the number of chains must be at least 1")
     cmd_to_handler = {
+        "autoremove": _autoremove_packages,
+        "diff": _diff_dpkg_status_databases,
+        "export": _export_graph,
         "graph": _generate_graph,
+        "impact": _list_purge_impact,
         "leafs": _list_leaf_packages,
         "purge": _purge_packages,
+        "reinstall-plan": _plan_reinstall,
+        "why": _explain_packages,
     }
     handler = cmd_to_handler.get(parsed_args.command, None)
     if handler is None:  # pragma: no cover
@@ -212,6 +1048,19 @@ def _parse_args(args):
     else:
         parsed_args.command_handler = handler
 
+    # The architecture and timings options are suppressed by default so that
+    # the defaults of the command's parser don't override the options given
+    # before the command.
+    suppressed_defaults = (
+        ("arch", None),
+        ("foreign_arch", None),
+        ("timings_enabled", False),
+        ("timings_format", "text"),
+        ("trace_allocations", False),
+    )
+    for dest, default in suppressed_defaults:
+        setattr(parsed_args, dest, getattr(parsed_args, dest, default))
+
     return parsed_args
 
 
@@ -226,7 +1075,17 @@ def cli(args):
     """
     parsed_args = _parse_args(args)
     purgatory.logging.init_cli_logging(debug=parsed_args.verbose)
-    return parsed_args.command_handler(parsed_args)
+    parsed_args.timings = timings.Timings(
+        enabled=parsed_args.timings_enabled,
+        trace_allocations=parsed_args.trace_allocations)
+    try:
+        with parsed_args.timings.phase(
+                "purgatory %s" % parsed_args.command):
+            return parsed_args.command_handler(parsed_args)
+    finally:
+        if parsed_args.timings.enabled:
+            _print_timings(parsed_args.timings, parsed_args.timings_format)
+        parsed_args.timings.stop()
 
 
 def main():  # pragma: no cover
@@ -23,6 +23,8 @@ Simplifications:
 
 
 # DpkgGraph-specific exceptions.
+from .error import AptSimulationError
+from .error import AptWorkerError
 from .error import DependencyIsNotInstalledError
 from .error import DpkgGraphError
 from .error import EmptyAptCacheError
@@ -31,10 +33,18 @@ from .error import KeepNodeMustBeLeafError
 from .error import PackageIsNotInstalledError
 from .error import UnsupportedDependencyTypeError
 
+# DpkgGraph-specific types.
+from .apt_cache import AptSnapshot
+
 # DpkgGraph-specific classes.
+from .apt_simulation import AptPurgeSimulation
+from .apt_worker import AptWorkerPool
 from .dependency_edge import DependencyEdge
+from .dependency_table import RawDependency
 from .dpkg_graph import DpkgGraph
+from .keep_edge import KeepEdge
 from .keep_node import KeepNode
+from .package_metadata import PackageMetadata
 from .package_node import PackageNode
 from .target_edge import TargetEdge
 from .target_versions_node import TargetVersionsNode
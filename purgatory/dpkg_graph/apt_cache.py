@@ -0,0 +1,203 @@
+"""Opening of the Apt cache and snapshots of the installed packages."""
+
+
+import collections
+import logging
+
+from . import dependency_table
+from . import error
+from . import package_metadata
+from . import package_node
+
+from .. import timings as purgatory_timings
+
+
+AptSnapshot = collections.namedtuple(
+    "AptSnapshot", ["dpkg_db", "architecture", "foreign_architectures",
+                    "ignore_recommends", "packages", "dependencies"])
+AptSnapshot.__doc__ = """Everything a DpkgGraph needs from the Apt cache.
+
+A snapshot only consists of strings and tuples.  Hence it is picklable and
+can be sent between processes, e.g. from an AptWorkerPool worker process.
+
+Attributes:
+    dpkg_db: Absolute path of the dpkg status database file.
+    architecture: Native architecture used to open the Apt cache.
+    foreign_architectures: Frozenset of the foreign architectures used to
+        open the Apt cache.
+    ignore_recommends: True if dependencies of type Recommends were ignored.
+    packages: Tuple of the names (PackageNode uids) of the installed packages.
+    dependencies: Tuple of the tuples of the RawDependency tuples of the
+        installed packages in the order of packages.
+"""
+
+
+# The system's Apt configuration is read only once per process.  Graphs only
+# change the options that differ between dpkg status databases (the database
+# itself and the architectures).  Hence graphs for dpkg status databases of
+# different architectures can be built one after another without reading the
+# Apt configuration again.  The system's defaults for these options are saved
+# as graphs overwrite them in the process-wide Apt configuration.
+_apt_system_architecture = None  # Set once the Apt configuration is read.
+_apt_system_dpkg_db = None  # Set once the Apt configuration is read.
+
+
+def _init_apt_config():
+    """Reads the system's Apt configuration once per process.
+
+    Returns:
+        Tuple of the native architecture of the system and the path of the
+        system's dpkg status database according to Apt.
+    """
+    global _apt_system_architecture  # pylint: disable=global-statement
+    global _apt_system_dpkg_db  # pylint: disable=global-statement
+    import apt_pkg
+
+    if _apt_system_architecture is None:
+        logging.debug("Initializing Apt configuration ...")
+        apt_pkg.init_config()  # pylint: disable=no-member
+        conf = apt_pkg.config  # pylint: disable=no-member
+        _apt_system_architecture = conf.find("APT::Architecture")
+        _apt_system_dpkg_db = conf["Dir::State::status"]
+
+        # As Purgatory uses a special configuration the Apt cache will be
+        # built in memory so that the valid cache on disk for the full
+        # configuration isn't overwritten.
+        conf["Dir::Cache::pkgcache"] = ""
+        conf["Dir::Cache::srcpkgcache"] = ""
+    return _apt_system_architecture, _apt_system_dpkg_db
+
+
+def _configure_apt(dpkg_db, architecture, foreign_architectures):
+    """Configures Apt for the installed packages of a dpkg database.
+
+    See open_apt_cache for the arguments.
+
+    Returns:
+        Tuple of the path of the dpkg status database, the native
+        architecture and the frozenset of the foreign architectures.
+    """
+    import apt_pkg
+
+    system_arch, system_dpkg_db = _init_apt_config()
+    conf = apt_pkg.config  # pylint: disable=no-member
+
+    # Tweak the system's Apt configuration to only read the dpkg status
+    # database as Purgatory is only interested in the installed packages.
+    # This has the nice sideffect that this cuts down the Apt cache opening
+    # time drastically as less files need to be parsed.  The system's dpkg
+    # status database is the saved default as a previous graph might have
+    # overwritten it in the Apt configuration.
+    conf.clear("Dir::State")
+    conf["Dir::State::status"] = dpkg_db or system_dpkg_db
+    dpkg_db = conf["Dir::State::status"]
+    logging.debug("dpkg status database: %s", dpkg_db)
+
+    # Configure Apt for the architectures of the system the dpkg status
+    # database belongs to, which isn't necessarily this system.
+    if foreign_architectures is not None:
+        foreign_architectures = frozenset(foreign_architectures)
+    if architecture is None or foreign_architectures is None:
+        db_architecture, db_foreign_architectures = (
+            package_metadata.read_architectures(dpkg_db))
+        if architecture is None:
+            architecture = db_architecture or system_arch
+        if foreign_architectures is None:
+            foreign_architectures = db_foreign_architectures
+    foreign_architectures -= set((architecture,))
+    logging.debug("Architectures: %s (native), %s (foreign)", architecture,
+                  ", ".join(sorted(foreign_architectures)) or "none")
+    conf["APT::Architecture"] = architecture
+    conf.clear("APT::Architectures")
+    for arch in [architecture] + sorted(foreign_architectures):
+        conf["APT::Architectures::"] = arch
+    return dpkg_db, architecture, foreign_architectures
+
+
+def open_apt_cache(dpkg_db=None, architecture=None,
+                   foreign_architectures=None, timings=None):
+    """Opens the Apt cache with the installed packages of a dpkg database.
+
+    Note that this changes the process-wide Apt configuration.  Use an
+    AptWorkerPool to open Apt caches for several dpkg status databases
+    concurrently.
+
+    Args:
+        dpkg_db: Absolute path to a dpkg status database file.  Defaults to
+            the dpkg status database file of the current Apt configuration.
+        architecture: Native architecture of the system the dpkg status
+            database belongs to.  Defaults to the architecture of the
+            installed dpkg package or to the architecture of this system if
+            dpkg isn't installed.
+        foreign_architectures: Iterable of the foreign architectures of the
+            system the dpkg status database belongs to.  Defaults to the
+            architectures of the installed packages other than the native
+            architecture.
+        timings: Timings (purgatory.timings.Timings) to record the phases of
+            opening the Apt cache in.  Defaults to disabled timings.
+
+    Returns:
+        Tuple of the apt.cache.FilteredCache with the installed packages, the
+        path of the dpkg status database, the native architecture and the
+        frozenset of the foreign architectures.
+
+    Raises:
+        EmptyAptCacheError: If there are no installed packages.
+    """
+    # python-apt is imported on demand as importing it is expensive and not
+    # needed unless a graph is built from Apt.
+    import apt
+    import apt_pkg
+
+    timings = timings or purgatory_timings.Timings(enabled=False)
+    with timings.phase("apt config"):
+        dpkg_db, architecture, foreign_architectures = _configure_apt(
+            dpkg_db, architecture, foreign_architectures)
+
+    # Initialize Apt with the tweaked config.
+    with timings.phase("apt cache open"):
+        logging.debug("Initializing Apt system ...")
+        apt_pkg.init_system()  # pylint: disable=no-member
+
+        # Opening Apt cache. This step actually reads the dpkg status
+        # database.
+        logging.debug("Opening Apt cache ...")
+        cache = apt.cache.Cache()
+
+    # Filter Apt cache to only contain installed packages.
+    with timings.phase("apt cache filter"):
+        filtered_cache = apt.cache.FilteredCache(cache)
+        filtered_cache.set_filter(apt.cache.InstalledFilter())
+        logging.debug("%d installed packages in the Apt cache",
+                      len(filtered_cache))
+
+    if not len(filtered_cache):
+        raise error.EmptyAptCacheError()
+    return filtered_cache, dpkg_db, architecture, foreign_architectures
+
+
+def read_apt_snapshot(dpkg_db=None, ignore_recommends=False,
+                      architecture=None, foreign_architectures=None):
+    """Opens the Apt cache and returns a snapshot of the installed packages.
+
+    See open_apt_cache for the arguments.
+
+    Args:
+        ignore_recommends: Ignores all dependencies of type Recommends.
+
+    Returns:
+        AptSnapshot object.
+    """
+    cache, dpkg_db, architecture, foreign_architectures = open_apt_cache(
+        dpkg_db, architecture, foreign_architectures)
+    pkgs = list(cache)
+    table = dependency_table.extract_dependency_table(
+        pkgs, ignore_recommends, processes=1)
+    return AptSnapshot(
+        dpkg_db=dpkg_db,
+        architecture=architecture,
+        foreign_architectures=foreign_architectures,
+        ignore_recommends=ignore_recommends,
+        packages=tuple(
+            package_node.PackageNode.pkg_to_uid(pkg) for pkg in pkgs),
+        dependencies=tuple(tuple(raw_deps) for raw_deps in table))
@@ -0,0 +1,142 @@
+"""Simulation of a purge with Apt's resolver to cross-check Purgatory."""
+
+
+import logging
+
+from . import error
+from . import package_node
+
+
+def simulate_purge(graph, pkgs):
+    """Simulates the purge of the packages with Apt's resolver.
+
+    The simulation reuses the Apt configuration and the opened Apt cache of
+    the graph.  To let Apt determine the packages obsoleted by the purge the
+    same way Purgatory does, the leaf packages and the kept packages of the
+    graph are marked as manually installed and all other packages as
+    automatically installed.
+    Apt then removes the packages that depend on the purged packages and
+    the automatically installed packages no longer needed by any manually
+    installed package.
+
+    Note that this changes the marks of the graph's Apt cache.  Run it in a
+    separate process (see AptPurgeSimulation) to keep the graph's Apt cache
+    untouched.
+
+    Args:
+        graph: The DpkgGraph that hasn't any members marked as deleted.
+        pkgs: Iterable of the names of the packages to purge.
+
+    Returns:
+        Frozenset of the names of the packages Apt would remove.
+
+    Raises:
+        AptSimulationError: If Apt's resolver fails.
+    """
+    import apt_pkg
+
+    manual_pkgs = set(
+        node.uid for leaf in graph.leafs for node in leaf
+        if isinstance(node, package_node.PackageNode))
+    manual_pkgs |= set(edge.to_node.uid for edge in graph.keep_edges)
+
+    # Purgatory neither knows about Apt's list of packages that should never
+    # be removed automatically nor about Suggests.
+    conf = apt_pkg.config  # pylint: disable=no-member
+    conf.clear("APT::NeverAutoRemove")
+    conf["APT::AutoRemove::SuggestsImportant"] = "false"
+    conf["APT::AutoRemove::RecommendsImportant"] = (
+        "false" if graph.ignore_recommends else "true")
+
+    cache = graph.cache.cache  # Unfiltered apt.cache.Cache
+    try:
+        with cache.actiongroup():
+            for pkg in graph.cache:
+                pkg.mark_auto(str(pkg) not in manual_pkgs)
+            for pkg in pkgs:
+                cache[pkg].mark_delete(auto_fix=True, purge=True)
+    except apt_pkg.Error as ex:  # pylint: disable=no-member
+        raise error.AptSimulationError(str(ex))
+
+    return frozenset(
+        str(pkg) for pkg in graph.cache
+        if pkg.marked_delete or pkg.is_auto_removable)
+
+
+def _simulate_purge_worker(graph, pkgs, connection):
+    """Runs simulate_purge in a worker process and sends back the result."""
+    try:
+        connection.send((simulate_purge(graph, pkgs), None))
+    except error.AptSimulationError as ex:
+        connection.send((None, ex.reason))
+    finally:
+        connection.close()
+
+
+class AptPurgeSimulation:
+    """Simulates a purge with Apt's resolver in a background worker process.
+
+    The worker process is forked so that it inherits the Apt configuration,
+    the opened Apt cache and the graph of the parent process.  Hence the
+    simulation doesn't need to open the Apt cache again and runs
+    concurrently to the purge determined by Purgatory.  On platforms without
+    fork support the simulation runs in the current process when the result
+    is requested.
+    """
+
+    def __init__(self, graph, pkgs):
+        """AptPurgeSimulation constructor.
+
+        The graph must not have members marked as deleted at construction.
+
+        Args:
+            graph: The DpkgGraph to simulate the purge for.
+            pkgs: Iterable of the names of the packages to purge.
+        """
+        self.__graph = graph
+        self.__pkgs = frozenset(pkgs)
+        self.__process = None
+        self.__connection = None
+
+        import multiprocessing
+        try:
+            context = multiprocessing.get_context("fork")
+        except ValueError:  # pragma: no cover
+            logging.debug(
+                "Fork isn't supported - the Apt simulation runs in the "
+                "current process.")
+            return
+        self.__connection, child_connection = context.Pipe(duplex=False)
+        self.__process = context.Process(
+            target=_simulate_purge_worker,
+            args=(graph, self.__pkgs, child_connection), daemon=True)
+        self.__process.start()
+        child_connection.close()
+
+    def result(self):
+        """Waits for the simulation and returns its result.
+
+        Returns:
+            Frozenset of the names of the packages Apt would remove.
+
+        Raises:
+            AptSimulationError: If Apt's resolver fails.
+        """
+        if self.__process is None:  # pragma: no cover
+            try:
+                return simulate_purge(self.__graph, self.__pkgs)
+            finally:
+                self.__graph.cache.cache.clear()
+
+        try:
+            removed, msg = self.__connection.recv()
+        except EOFError:
+            removed, msg = None, None
+        self.__connection.close()
+        self.__process.join()
+        if removed is None and msg is None:
+            msg = "The Apt simulation worker exited with code %s." % (
+                self.__process.exitcode)
+        if msg is not None:
+            raise error.AptSimulationError(msg)
+        return removed
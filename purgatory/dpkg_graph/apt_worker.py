@@ -0,0 +1,123 @@
+"""Reusable worker processes that read Apt snapshots in isolation."""
+
+
+import os
+
+from . import apt_cache
+from . import dpkg_graph
+from . import error
+
+
+def _read_apt_snapshot_worker(kwargs):
+    """Reads an Apt snapshot in a worker process.
+
+    Returns:
+        Tuple of the AptSnapshot and None or None and the reason why the
+        snapshot couldn't be read.  Exceptions aren't sent back as is as not
+        all of them can be unpickled.
+    """
+    try:
+        return apt_cache.read_apt_snapshot(**kwargs), None
+    except (error.DpkgGraphError, SystemError) as ex:
+        return None, str(ex)
+
+
+class AptWorkerPool:
+    """Pool of reusable worker processes that read Apt snapshots.
+
+    Opening the Apt cache changes the process-wide Apt configuration.  Hence
+    graphs for several dpkg status databases can't be built concurrently in
+    one process, not even in threads.  The pool reads the Apt snapshots
+    (see AptSnapshot) in worker processes instead: every worker process has
+    its own Apt configuration and only sends back the compact snapshot from
+    which the DpkgGraph is built in the current process.  The worker
+    processes are reused for further dpkg status databases and don't
+    inherit any state as they are spawned instead of forked.
+
+    The methods of the pool can be called from several threads.
+    """
+
+    def __init__(self, processes=None):
+        """AptWorkerPool constructor.
+
+        Args:
+            processes: Number of worker processes.  Defaults to the number of
+                CPUs.
+        """
+        import multiprocessing
+
+        context = multiprocessing.get_context("spawn")
+        self.__pool = context.Pool(processes or os.cpu_count() or 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops the worker processes once they are idle."""
+        self.__pool.close()
+        self.__pool.join()
+
+    def read_snapshots(self, dpkg_dbs, ignore_recommends=False,
+                       architecture=None, foreign_architectures=None):
+        """Reads the Apt snapshots of dpkg status databases in parallel.
+
+        See DpkgGraph for the arguments.
+
+        Args:
+            dpkg_dbs: Iterable of the paths of the dpkg status database
+                files.  A path of None is the system's dpkg status database.
+
+        Yields:
+            AptSnapshot objects in the order of dpkg_dbs.
+
+        Raises:
+            AptWorkerError: If a snapshot couldn't be read.
+        """
+        requests = [
+            dict(dpkg_db=os.path.abspath(dpkg_db) if dpkg_db else None,
+                 ignore_recommends=ignore_recommends,
+                 architecture=architecture,
+                 foreign_architectures=foreign_architectures)
+            for dpkg_db in dpkg_dbs]
+        results = self.__pool.imap(_read_apt_snapshot_worker, requests)
+        for request, (snapshot, reason) in zip(requests, results):
+            if snapshot is None:
+                raise error.AptWorkerError(request["dpkg_db"], reason)
+            yield snapshot
+
+    def build_graphs(self, dpkg_dbs, ignore_recommends=False, keep=None,
+                     architecture=None, foreign_architectures=None):
+        """Builds the DpkgGraphs of dpkg status databases.
+
+        The Apt snapshots are read in parallel by the worker processes.  See
+        DpkgGraph for the arguments.
+
+        Args:
+            dpkg_dbs: Iterable of the paths of the dpkg status database
+                files.  A path of None is the system's dpkg status database.
+
+        Yields:
+            DpkgGraph objects without an Apt cache in the order of dpkg_dbs.
+
+        Raises:
+            AptWorkerError: If a snapshot couldn't be read.
+        """
+        snapshots = self.read_snapshots(
+            dpkg_dbs, ignore_recommends=ignore_recommends,
+            architecture=architecture,
+            foreign_architectures=foreign_architectures)
+        for snapshot in snapshots:
+            yield dpkg_graph.DpkgGraph(keep=keep, snapshot=snapshot)
+
+    def build_graph(self, dpkg_db=None, **kwargs):
+        """Builds the DpkgGraph of a dpkg status database.
+
+        See build_graphs for the arguments.
+
+        Returns:
+            DpkgGraph object without an Apt cache.
+        """
+        return next(self.build_graphs([dpkg_db], **kwargs))
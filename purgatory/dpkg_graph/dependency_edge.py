@@ -21,12 +21,16 @@ class DependencyEdge(graph.Edge):
     recommends dependency, hence the static probability of 1.0.
     """
 
+    __dep_key_to_kind = {}  # (rawtype, rawstr):kind
+
     def __init__(self, from_node, to_node, dep):
         """DependencyEdge constructor.
 
         Args:
             from_node: PackageNode object.
             to_node: TargetVersionsNode object.
+            dep: apt.package.Dependency or dependency_table.RawDependency
+                object.  Only the rawtype and rawstr attributes are used.
         """
         # Private
         self.__dep = dep
@@ -41,15 +45,35 @@ class DependencyEdge(graph.Edge):
         # Init
         super().__init__(from_node, to_node)
 
+    def _edge_kind(self):
+        """Returns the kind of this edge as part of the edge's key.
+
+        A package can have several dependencies that are fulfilled by the same
+        target versions node (e.g. a Depends and a Recommends).  The kind is a
+        small integer for each distinct dependency type and raw string.
+        """
+        dep = self.__dep  # Initialized by the DependencyEdge constructor.
+        dep_key = (dep.rawtype, dep.rawstr)
+        kind = DependencyEdge.__dep_key_to_kind.get(dep_key)
+        if kind is None:
+            kind = len(DependencyEdge.__dep_key_to_kind)
+            DependencyEdge.__dep_key_to_kind[dep_key] = kind
+        return kind
+
     def _nodes_to_edge_uid(self, from_node, to_node):
         """Returns an uid for this directed edge based on the nodes."""
-        dep = self.__dep  # Initialized by the DependencyEdge constructur.
+        dep = self.__dep  # Initialized by the DependencyEdge constructor.
         return "%s --%s--> %s" % (from_node.uid, dep.rawtype, dep.rawstr)
 
     def _init_str(self):
         """Initializes self._str for self.__str__."""
         self._str = self.uid
 
+    @property
+    def export_attributes(self):
+        """Returns the dict of additional attributes for graph exports."""
+        return {"rawtype": self.__dep.rawtype}
+
     @property
     def graphviz_attributes(self):
         """Returns the attributes dict for the respective GraphViz member."""
@@ -0,0 +1,179 @@
+"""Extraction of the raw dependencies of the installed packages."""
+
+
+import collections
+import logging
+import os
+
+
+RawDependency = collections.namedtuple(
+    "RawDependency", ["rawtype", "rawstr", "target_pkgs", "alternatives"])
+RawDependency.__doc__ = """Raw dependency of an installed package.
+
+Attributes:
+    rawtype: Type of the dependency ('PreDepends', 'Depends' or
+        'Recommends').
+    rawstr: The dependency as written in the package's control file.
+    target_pkgs: Sorted tuple of the names (PackageNode uids) of the installed
+        packages that fulfill the dependency.  Empty if the dependency isn't
+        installed.
+    alternatives: Tuple of the names of all the alternatives of the
+        dependency.  Only set if the dependency isn't installed.
+"""
+
+
+# Minimal number of installed packages for a parallel extraction if the
+# number of processes isn't given explicitly.  Below this number forking the
+# worker processes takes longer than the extraction itself.
+_PARALLEL_MIN_PACKAGES = 2000
+
+# Number of chunks per worker process.  Several chunks per worker process
+# balance the load as the number of dependencies per package varies a lot.
+_CHUNKS_PER_PROCESS = 4
+
+# The installed packages and the dependency types to extract for the worker
+# processes.  These are inherited by the forked worker processes and hence
+# the apt.package.Package objects don't need to be pickled.
+_worker_pkgs = None
+_worker_dep_types = None
+
+# The dependency resolutions of a worker process.  Every worker process has
+# its own dict that is shared by all the chunks the worker process extracts.
+_worker_resolutions = {}
+
+
+def _dependency_types(ignore_recommends):
+    """Returns the tuple of the dependency types to extract."""
+    if ignore_recommends:
+        return ("PreDepends", "Depends")
+    return ("PreDepends", "Depends", "Recommends")
+
+
+def extract_dependencies(pkg, dep_types, resolutions=None):
+    """Extracts the raw dependencies of an installed package.
+
+    Many packages share the same dependencies (e.g. 'libc6 (>= 2.14)').  The
+    resolution of a dependency to the installed target packages only depends
+    on the dependency's raw string (which includes the version relation) and
+    the architecture of the package.  Hence resolved dependencies are looked
+    up in the resolutions dict before Apt is asked to resolve them.
+
+    Args:
+        pkg: The installed apt.package.Package object.
+        dep_types: Tuple of the dependency types to extract.
+        resolutions: Dict of (rawstr, architecture) to (target_pkgs,
+            alternatives) that is used and updated to resolve the
+            dependencies.  Defaults to no resolutions.
+
+    Returns:
+        List of RawDependency tuples.
+    """
+    if resolutions is None:
+        resolutions = {}
+    version = pkg.installed
+    arch = version.architecture
+    raw_deps = []
+    for dep in version.get_dependencies(*dep_types):
+        key = (dep.rawstr, arch)
+        resolution = resolutions.get(key)
+        if resolution is None:
+            target_pkgs = tuple(sorted(set(
+                str(ver.package) for ver in dep.installed_target_versions)))
+            alternatives = ()
+            if not target_pkgs:
+                alternatives = tuple(
+                    base_dep.name for base_dep in dep.or_dependencies)
+            resolution = (target_pkgs, alternatives)
+            resolutions[key] = resolution
+        raw_deps.append(RawDependency(dep.rawtype, dep.rawstr, *resolution))
+    return raw_deps
+
+
+def _extract_chunk(bounds):
+    """Extracts the raw dependencies of a chunk in a worker process.
+
+    Returns:
+        Tuple of the list of the lists of RawDependency tuples and the number
+        of dependencies that had to be resolved by Apt.
+    """
+    start, stop = bounds
+    resolved = len(_worker_resolutions)
+    table = [extract_dependencies(
+        _worker_pkgs[i], _worker_dep_types, _worker_resolutions)
+             for i in range(start, stop)]
+    return table, len(_worker_resolutions) - resolved
+
+
+def _log_resolution_hit_rate(table, resolved):
+    """Logs the hit rate of the dependency resolutions."""
+    lookups = sum(len(raw_deps) for raw_deps in table)
+    logging.debug(
+        "Dependency resolutions: %d lookups, %d resolved by Apt, %.1f%% "
+        "hit rate", lookups, resolved,
+        100.0 * (lookups - resolved) / lookups if lookups else 0.0)
+
+
+def extract_dependency_table(pkgs, ignore_recommends, processes=None):
+    """Extracts the raw dependencies of all the installed packages.
+
+    The extraction is the expensive part of the initialization of a DpkgGraph
+    as Apt has to resolve every dependency.  For many packages the extraction
+    is split into chunks that are extracted in parallel by forked worker
+    processes.  The worker processes inherit the opened Apt cache and only
+    send back the picklable RawDependency tuples.  Only the extraction runs in
+    parallel.  The DpkgGraph constructs its nodes and edges from the table in
+    its own process as graph members can't be shared between processes.
+
+    Args:
+        pkgs: List of the installed apt.package.Package objects.
+        ignore_recommends: Ignores all dependencies of type Recommends.
+        processes: Number of worker processes.  Defaults to the number of
+            CPUs if there are enough packages to benefit from a parallel
+            extraction.  A value of 1 extracts the dependencies in the
+            current process.
+
+    Returns:
+        List of the lists of RawDependency tuples in the order of pkgs.
+    """
+    global _worker_pkgs, _worker_dep_types  # pylint: disable=global-statement
+
+    dep_types = _dependency_types(ignore_recommends)
+    if processes is None:
+        processes = 1
+        if len(pkgs) >= _PARALLEL_MIN_PACKAGES:
+            processes = os.cpu_count() or 1
+    processes = min(processes, len(pkgs))
+
+    context = None
+    if processes > 1:
+        import multiprocessing
+        try:
+            context = multiprocessing.get_context("fork")
+        except ValueError:  # pragma: no cover
+            logging.debug("Fork isn't supported - extracting serially.")
+    if context is None:
+        resolutions = {}
+        table = [extract_dependencies(pkg, dep_types, resolutions)
+                 for pkg in pkgs]
+        _log_resolution_hit_rate(table, len(resolutions))
+        return table
+
+    chunks = processes * _CHUNKS_PER_PROCESS
+    chunk_size = -(-len(pkgs) // chunks)  # Ceiling division
+    bounds = [(start, min(start + chunk_size, len(pkgs)))
+              for start in range(0, len(pkgs), chunk_size)]
+    logging.debug(
+        "Extracting dependencies in %d chunks with %d processes ...",
+        len(bounds), processes)
+
+    _worker_pkgs, _worker_dep_types = pkgs, dep_types
+    try:
+        with context.Pool(processes) as pool:
+            chunk_results = pool.map(_extract_chunk, bounds)
+    finally:
+        _worker_pkgs, _worker_dep_types = None, None
+    table = [raw_deps for chunk_table, _ in chunk_results
+             for raw_deps in chunk_table]
+    _log_resolution_hit_rate(
+        table, sum(resolved for _, resolved in chunk_results))
+    return table
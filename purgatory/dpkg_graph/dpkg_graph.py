@@ -1,15 +1,18 @@
 """Graph representing installed packages in the dpkg status database."""
 
 
+import collections
 import logging
 import os.path
 import types
 
-import apt_pkg
-import apt
-
+from . import apt_cache
 from . import dependency_edge
+from . import dependency_table
 from . import error
+from . import keep_edge
+from . import keep_node
+from . import package_metadata
 from . import package_node
 from . import target_edge
 from . import target_versions_node
@@ -17,14 +20,20 @@ from . import target_versions_node
 from .. import graph
 
 
-# TODO(MS): The constructor of the DpkgGraph class shouls also take the
-# system architecture and properly initialize Apt to use that system arch.
-# If the system architecture isn't supplied the DpkgGraph class should properly
-# auto-detect the system architecture.
 class DpkgGraph(graph.Graph):
     """Graph representing installed packages in the dpkg status database."""
 
-    def __init__(self, ignore_recommends=False, dpkg_db=None):
+    PurgeFootprint = collections.namedtuple(
+        "PurgeFootprint", ["package_nodes", "installed_size"])
+    ReinstallPlan = collections.namedtuple(
+        "ReinstallPlan", ["install", "prevent"])
+    FootprintDelta = collections.namedtuple(
+        "FootprintDelta", ["packages", "installed_size"])
+
+    def __init__(self, ignore_recommends=False, dpkg_db=None, keep=None,
+                 processes=None, architecture=None,
+                 foreign_architectures=None, snapshot=None,
+                 extended_states=None, timings=None):
         """DpkgGraph constructor.
 
         Args:
@@ -32,24 +41,72 @@ class DpkgGraph(graph.Graph):
                 Defaults to False.
             dpkg_db: Absolute path to a dpkg status database file. Defaults to
                 the system's dpkg status database file.
+            keep: Iterable of the names of the installed packages that need
+                to be kept.  The graph gets a KeepNode with KeepEdges to
+                these packages.  Defaults to no packages.
+            processes: Number of worker processes to extract the dependencies
+                of the installed packages in parallel.  Defaults to the number
+                of CPUs for systems with many installed packages.  A value of
+                1 disables the parallel extraction.
+            architecture: Native architecture of the system the dpkg status
+                database belongs to, e.g. 'arm64'.  Defaults to the
+                architecture of the installed dpkg package or to the
+                architecture of this system if dpkg isn't installed.
+            foreign_architectures: Iterable of the foreign architectures of
+                the system the dpkg status database belongs to.  Defaults to
+                the architectures of the installed packages other than the
+                native architecture.
+            snapshot: AptSnapshot to build the graph from instead of opening
+                the Apt cache, e.g. an AptSnapshot from an AptWorkerPool.  The
+                dpkg database, the architectures and ignore_recommends of the
+                snapshot are used and the respective arguments are ignored.
+                The graph has no Apt cache then.
+            extended_states: Path of Apt's extended_states file with the
+                packages marked as automatically installed, e.g.
+                '/var/lib/apt/extended_states'.  The file is read on demand
+                (see auto_installed_packages).  Defaults to no file and hence
+                all packages count as manually installed.
+            timings: Timings (purgatory.timings.Timings) to record the phases
+                of opening the Apt cache and of the initialization in.
+                Defaults to disabled timings.
         """
         # Private
         self.__dpkg_db = None
         if dpkg_db is not None:
             self.__dpkg_db = os.path.abspath(dpkg_db)
+        self.__native_arch = architecture
+        self.__foreign_archs = None
+        if foreign_architectures is not None:
+            self.__foreign_archs = frozenset(foreign_architectures)
         self.__cache = None
+        self.__snapshot = snapshot
+        self.__package_metadata = None
+        self.__extended_states = extended_states
+        self.__auto_installed_packages = None
+        self.__essential_packages = None
+        self.__package_name_index = None
         self.__package_nodes = {}  # uid:node
-        self.__dependency_edges = {}  # uid:edge
-        self.__target_edges = {}  # uid:edge
+        self.__dependency_edges = {}  # key:edge
+        self.__target_edges = {}  # key:edge
         self.__target_versions_nodes = {}  # uid:node
+        self.__missing_recommends = set()  # Package names
+        self.__processes = processes
+        self.__keep = frozenset(keep or ())
+        self.__keep_node = None
+        self.__keep_edges = {}  # key:edge
+        self.__protected_nodes = frozenset()
 
         # Protected
         self._ignore_recommends = ignore_recommends
+        if snapshot is not None:
+            self._ignore_recommends = snapshot.ignore_recommends
 
         # Init
-        self.__init_cache()
+        self.__init_cache(timings)
         logging.debug("Initializing dpkg graph ...")
-        super().__init__()  # Calls _init_nodes and _init_edges.
+        super().__init__(timings)  # Calls _init_nodes_and_edges.
+        with self._timings.phase("dpkg graph protected nodes"):
+            self.__init_protected_nodes()
 
         # Log
         logging.debug("dpkg graph contains:")
@@ -61,50 +118,25 @@ class DpkgGraph(graph.Graph):
                       len(self.__dependency_edges))
         logging.debug("  Target edges: %d",
                       len(self.__target_edges))
+        logging.debug("  Keep edges: %d",
+                      len(self.__keep_edges))
+        logging.debug("  Protected nodes: %d",
+                      len(self.__protected_nodes))
 
-    def __init_cache(self):
+    def __init_cache(self, timings):
         """Initializes the Apt cache in use by the DpkgGraph."""
-        # Read the system's Apt configuration.
-        logging.debug("Initializing Apt configuration ...")
-        apt_pkg.init_config()  # pylint: disable=no-member
-        conf = apt_pkg.config  # pylint: disable=no-member
-
-        # Tweak the system's Apt configuration to only read the dpkg status
-        # database as Purgatory is only interested in the installed packages.
-        # This has the nice sideffect that this cuts down the Apt cache opening
-        # time drastically as less files need to be parsed.
-        dpkg_db = conf["Dir::State::status"]
-        conf.clear("Dir::State")
-        if self.__dpkg_db:
-            conf["Dir::State::status"] = self.__dpkg_db
-        else:
-            conf["Dir::State::status"] = dpkg_db
-        self.__dpkg_db = conf["Dir::State::status"]
-        logging.debug("dpkg status database: %s", self.__dpkg_db)
-
-        # As Purgatory uses a special configuration the Apt cache will be
-        # built in memory so that the valid cache on disk for the full
-        # configuration isn't overwritten.
-        conf["Dir::Cache::pkgcache"] = ""
-        conf["Dir::Cache::srcpkgcache"] = ""
-
-        # Initialize Apt with the tweaked config.
-        logging.debug("Initializing Apt system ...")
-        apt_pkg.init_system()  # pylint: disable=no-member
-
-        # Opening Apt cache. This step actually reads the dpkg status database.
-        logging.debug("Opening Apt cache ...")
-        cache = apt.cache.Cache()
-
-        # Filter Apt cache to only contain installed packages.
-        filtered_cache = apt.cache.FilteredCache(cache)
-        filtered_cache.set_filter(apt.cache.InstalledFilter())
-        logging.debug("%d installed packages in the Apt cache",
-                      len(filtered_cache))
-
-        if not len(filtered_cache):
-            raise error.EmptyAptCacheError()
-        self.__cache = filtered_cache
+        if self.__snapshot is not None:
+            logging.debug("Using the Apt snapshot of %s",
+                          self.__snapshot.dpkg_db)
+            self.__dpkg_db = self.__snapshot.dpkg_db
+            self.__native_arch = self.__snapshot.architecture
+            self.__foreign_archs = self.__snapshot.foreign_architectures
+            return
+
+        (self.__cache, self.__dpkg_db, self.__native_arch,
+         self.__foreign_archs) = apt_cache.open_apt_cache(
+             self.__dpkg_db, self.__native_arch, self.__foreign_archs,
+             timings=timings)
 
     def __init_nodes_and_edges_phase1(self):
         """Phase 1 of the initialization of the dpkg graph.
@@ -114,37 +146,66 @@ class DpkgGraph(graph.Graph):
         * Installed dependency nodes
         * Dependency edges (between installed package and dependency nodes)
         """
+        # Extract the raw dependencies of all installed packages first.  This
+        # is the expensive part as Apt has to resolve every dependency and
+        # hence it is done in parallel for many packages.  A snapshot already
+        # contains the raw dependencies.
+        if self.__snapshot is not None:
+            ipns = [package_node.PackageNode(name=pkg)
+                    for pkg in self.__snapshot.packages]
+            dep_table = self.__snapshot.dependencies
+        else:
+            pkgs = list(self.__cache)
+            ipns = [package_node.PackageNode(pkg) for pkg in pkgs]
+            dep_table = dependency_table.extract_dependency_table(
+                pkgs, self._ignore_recommends, processes=self.__processes)
+
+        # The nodes and edges are constructed and merged in this process as
+        # the graph's members can't be shared with worker processes.  Nearly
+        # all of the time spent here goes into the construction and linking
+        # of the members.  The deduplication of the TargetVersionsNodes is a
+        # single dict lookup per dependency.
         # Add installed package nodes.
-        for pkg in self.__cache:
-            ipn = package_node.PackageNode(pkg)
+        target_pkgs_to_itvn = {}  # target_pkgs:node
+        itvn_lookups = 0
+        for ipn, raw_deps in zip(ipns, dep_table):
             self._add_node(ipn)
             self.__package_nodes[ipn.uid] = ipn
 
             # Add installed dependency nodes and dependency edges
-            if self._ignore_recommends:
-                deps = ipn.version.get_dependencies("PreDepends", "Depends")
-            else:
-                deps = ipn.version.get_dependencies(
-                    "PreDepends", "Depends", "Recommends")
-            for dep in deps:  # apt.package.Dependency
-                # Add installed dependency node.
-                try:
-                    itvn = target_versions_node.TargetVersionsNode(dep)
-                except error.DependencyIsNotInstalledError:
-                    if dep.rawtype == "Recommends":
+            for raw_dep in raw_deps:  # dependency_table.RawDependency
+                if not raw_dep.target_pkgs:
+                    if raw_dep.rawtype == "Recommends":
                         # Recommended packages don't need to be installed.
+                        self.__missing_recommends |= set(raw_dep.alternatives)
                         continue
-                itvn, dup = self._add_node_dedup(itvn)
-                if not dup:
+                    raise error.DependencyIsNotInstalledError(raw_dep.rawstr)
+
+                # Add installed dependency node.  Dependencies with the same
+                # target packages share the same node.
+                itvn_lookups += 1
+                itvn = target_pkgs_to_itvn.get(raw_dep.target_pkgs)
+                if itvn is None:
+                    itvn = target_versions_node.TargetVersionsNode(
+                        target_pkgs=raw_dep.target_pkgs)
+                    self._add_node(itvn)
                     self.__target_versions_nodes[itvn.uid] = itvn
+                    target_pkgs_to_itvn[raw_dep.target_pkgs] = itvn
 
                 # Add dependency edge from the installed package node to the
                 # installed dependency node.
-                de = dependency_edge.DependencyEdge(ipn, itvn, dep)
+                de = dependency_edge.DependencyEdge(ipn, itvn, raw_dep)
                 self._add_edge(de)
-                self.__dependency_edges[de.uid] = de
+                self.__dependency_edges[de.key] = de
+
+        logging.debug(
+            "Target versions nodes: %d lookups, %d constructed, %.1f%% hit "
+            "rate", itvn_lookups, len(target_pkgs_to_itvn),
+            100.0 * (itvn_lookups - len(target_pkgs_to_itvn)) / itvn_lookups
+            if itvn_lookups else 0.0)
 
-        # Freeze all dicts that have been filled so far.
+        # Freeze all dicts and sets that have been filled so far.
+        self.__missing_recommends = frozenset(self.__missing_recommends)
         self.__package_nodes = types.MappingProxyType(
             self.__package_nodes)
         self.__target_versions_nodes = types.MappingProxyType(
@@ -158,37 +219,282 @@ class DpkgGraph(graph.Graph):
         Phase 2 of the initialization adds the following to the graph:
         * Target edges (between installed dependency nodes and packages nodes)
         """
-        pkg_to_uid = package_node.PackageNode.pkg_to_uid
         for itvn in self.__target_versions_nodes.values():
             # Add target edges from the installed dependency node to the
             # installed package node.
-            for itver in itvn.installed_target_versions:
-                itpkg = itver.package
-                itpkg_uid = pkg_to_uid(itpkg)
+            for itpkg_uid in itvn.target_packages:
                 itpn = self.__package_nodes[itpkg_uid]
 
                 te = target_edge.TargetEdge(itvn, itpn)
                 self._add_edge(te)
-                self.__target_edges[te.uid] = te
+                self.__target_edges[te.key] = te
 
         # Freeze the target edges dict.
         self.__target_edges = types.MappingProxyType(self.__target_edges)
 
+    def __init_nodes_and_edges_phase3(self):
+        """Phase 3 of the initialization of the dpkg graph.
+
+        Phase 3 of the initialization adds the following to the graph:
+        * KeepNode (only if there are packages to keep)
+        * Keep edges (between the KeepNode and the package nodes to keep)
+        """
+        if self.__keep:
+            self.__keep_node = keep_node.KeepNode()
+            self._add_node(self.__keep_node)
+        for pkg in sorted(self.__keep):
+            pn = self.__package_nodes.get(pkg)
+            if pn is None:
+                logging.info(
+                    "The package '%s' is not installed and hence doesn't "
+                    "need to be kept.", pkg)
+                continue
+            ke = keep_edge.KeepEdge(self.__keep_node, pn)
+            self._add_edge(ke)
+            self.__keep_edges[ke.key] = ke
+
+        # Freeze the keep edges dict.
+        self.__keep_edges = types.MappingProxyType(self.__keep_edges)
+
+    def __init_protected_nodes(self):
+        """Determines the nodes that are protected by the KeepNode.
+
+        A node is protected if it is reachable from the KeepNode by edges
+        without alternatives (probability 1.0).  Marking a protected node as
+        deleted would always mark the KeepNode as deleted.  Nodes that are
+        only reachable via alternatives aren't protected as another
+        alternative can satisfy the dependency.
+        """
+        if self.__keep_node is None:
+            return
+        protected = set((self.__keep_node,))
+        to_visit = [self.__keep_node]
+        while to_visit:
+            node = to_visit.pop()
+            for edge in node.outgoing_edges:
+                if (edge.to_node not in protected and
+                        abs(edge.probability - 1.0) < graph.EPSILON):
+                    protected |= set((edge.to_node,))
+                    to_visit.append(edge.to_node)
+        self.__protected_nodes = frozenset(protected)
+
     def _init_nodes_and_edges(self):
         """Initializes the nodes and edges of the DpkgGraph."""
-        self.__init_nodes_and_edges_phase1()
-        self.__init_nodes_and_edges_phase2()
+        with self._timings.phase("dpkg graph phase 1"):
+            self.__init_nodes_and_edges_phase1()
+        with self._timings.phase("dpkg graph phase 2"):
+            self.__init_nodes_and_edges_phase2()
+        with self._timings.phase("dpkg graph phase 3"):
+            self.__init_nodes_and_edges_phase3()
+
+    @property
+    def architecture(self):
+        """Returns the native architecture of the graph's dpkg database."""
+        return self.__native_arch
+
+    @property
+    def foreign_architectures(self):
+        """Returns the frozenset of the foreign architectures of the graph."""
+        return self.__foreign_archs
+
+    @property
+    def auto_installed_packages(self):
+        """Returns a frozenset of the automatically installed package names.
+
+        The names are read from Apt's extended_states file given to the
+        constructor on first access.  Only installed packages are included.
+        The set is empty if no extended_states file has been given.
+
+        Raises:
+            OSError: If the extended_states file can't be read.
+        """
+        if self.__auto_installed_packages is None:
+            auto_installed = frozenset()
+            if self.__extended_states is not None:
+                logging.debug("Reading Apt extended states ...")
+                auto_installed = package_metadata.read_auto_installed(
+                    self.__extended_states, self.__native_arch)
+            self.__auto_installed_packages = auto_installed.intersection(
+                self.__package_nodes)
+        return self.__auto_installed_packages
+
+    @property
+    def autoremovable_package_nodes(self):
+        """Returns a set of the package nodes that are no longer needed.
+
+        Like Apt's autoremove the manually installed packages, the essential
+        packages and the kept packages are needed as well as all packages
+        they depend on (including Recommends unless they are ignored).  The
+        automatically installed packages that aren't needed can be removed.
+        The needed nodes are determined in a single pass across the graph.
+        Nodes marked as deleted are ignored.
+
+        Raises:
+            OSError: If the extended_states file can't be read.
+        """
+        auto_installed = self.auto_installed_packages
+        if self.__essential_packages is None:
+            self.__essential_packages = (
+                package_metadata.read_essential_packages(
+                    self.__dpkg_db, self.__native_arch))
+        pkg_nodes = self.live_members_of_type(package_node.PackageNode)
+        needed = set(
+            node for node in pkg_nodes
+            if node.uid not in auto_installed or
+            node.uid in self.__essential_packages)
+        if self.__keep_node is not None and not self.__keep_node.deleted:
+            needed |= set((self.__keep_node,))
+
+        to_visit = list(needed)
+        while to_visit:
+            node = to_visit.pop()
+            for to_node in node.outgoing_nodes:
+                if to_node not in needed:
+                    needed |= set((to_node,))
+                    to_visit.append(to_node)
+        return set(pkg_nodes) - needed
 
     @property
     def cache(self):
-        """Returns the Apt Cache object in use by this DpkgGraph object."""
+        """Returns the Apt Cache object in use by this DpkgGraph object.
+
+        Returns None if the graph has been built from an AptSnapshot.
+        """
         return self.__cache
 
     @property
     def deleted_package_nodes(self):
         """Returns a set of the package nodes marked as deleted."""
-        return {node for node in self.__package_nodes.values()
-                if node.deleted}
+        return set(self.live_deleted_members_of_type(
+            package_node.PackageNode))
+
+    def footprint_deltas(self, other, graph_diff=None):
+        """Returns the changes of the purge footprints of the shared leafs.
+
+        This graph is the old graph and the other graph the new graph.  The
+        footprints of the leafs of both graphs are compared (see
+        purge_footprint and Graph.diff).  Leafs that can't be purged without
+        purging packages that need to be kept are skipped.
+
+        The footprint of a leaf only depends on the members below it and on
+        the installed sizes of their packages.  Hence only the footprints of
+        the leafs above changed nodes (added or removed nodes, nodes of
+        added or removed edges and packages with a changed installed size)
+        are determined.
+
+        Args:
+            other: The new DpkgGraph.
+            graph_diff: The GraphDiff of this graph and the other graph if it
+                has been determined already.  Defaults to determining it.
+
+        Returns:
+            Dict of the leafs (frozensets of the nodes of the other graph)
+            whose footprint changed to FootprintDelta with the change of the
+            number of packages and of the installed size in KiB.
+        """
+        if graph_diff is None:
+            graph_diff = self.diff(other)
+        changed_nodes = set(graph_diff.added_nodes)
+        changed_nodes.update(graph_diff.removed_nodes)
+        for edge in graph_diff.added_edges | graph_diff.removed_edges:
+            changed_nodes.add(edge.from_node)
+            changed_nodes.add(edge.to_node)
+        pkg_to_metadata = self.package_metadata
+        other_pkg_to_metadata = other.package_metadata
+        for pkg_node in self.live_members_of_type(package_node.PackageNode):
+            metadata = pkg_to_metadata.get(pkg_node.uid)
+            other_metadata = other_pkg_to_metadata.get(pkg_node.uid)
+            if (metadata is not None and other_metadata is not None and
+                    metadata.installed_size != other_metadata.installed_size):
+                changed_nodes.add(pkg_node)
+        affected_nodes = (_nodes_above(self, changed_nodes) |
+                          _nodes_above(other, changed_nodes))
+
+        other_leafs = {leaf: leaf for leaf in other.leafs}
+        deltas = {}
+        for leaf in self.leafs:
+            other_leaf = other_leafs.get(leaf)
+            if other_leaf is None or affected_nodes.isdisjoint(leaf):
+                continue
+            try:
+                old_footprint = self.purge_footprint(leaf)
+                new_footprint = other.purge_footprint(other_leaf)
+            except error.KeepNodeCanNotBeMarkedDeletedError:
+                continue
+            delta = DpkgGraph.FootprintDelta(
+                packages=(len(new_footprint.package_nodes) -
+                          len(old_footprint.package_nodes)),
+                installed_size=(new_footprint.installed_size -
+                                old_footprint.installed_size))
+            if delta.packages or delta.installed_size:
+                deltas[other_leaf] = delta
+        return deltas
+
+    @property
+    def ignore_recommends(self):
+        """Returns True if dependencies of type Recommends are ignored."""
+        return self._ignore_recommends
+
+    @property
+    def keep_edges(self):
+        """Returns a set of the keep edges.
+
+        The set is empty if the graph has no packages to keep.
+        """
+        return set(self.__keep_edges.values())
+
+    @property
+    def keep_node(self):
+        """Returns the KeepNode or None if no packages need to be kept."""
+        return self.__keep_node
+
+    @property
+    def protected_nodes(self):
+        """Returns a frozenset of the nodes protected by the KeepNode.
+
+        The protected nodes include the KeepNode, the kept package nodes and
+        all nodes below them that can't be marked as deleted without marking
+        the KeepNode as deleted.  The set is determined once during the
+        initialization.  It is empty if the graph has no packages to keep.
+        """
+        return self.__protected_nodes
+
+    @property
+    def missing_recommends(self):
+        """Returns a frozenset of recommended packages that aren't installed.
+
+        The set contains the names of all alternatives of the Recommends
+        dependencies of the installed packages that aren't fulfilled by any
+        installed package.  It is empty if Recommends are ignored.
+        """
+        return self.__missing_recommends
+
+    @property
+    def package_metadata(self):
+        """Returns a dict of package name to PackageMetadata.
+
+        The metadata of all installed packages is read in a single bulk pass
+        from the dpkg status database on first access.
+        """
+        if self.__package_metadata is None:
+            logging.debug("Reading package metadata ...")
+            self.__package_metadata = types.MappingProxyType(
+                package_metadata.read_package_metadata(
+                    self.__dpkg_db, self.__native_arch))
+        return self.__package_metadata
+
+    @property
+    def package_name_index(self):
+        """Returns a graph.NameIndex of package name to package node.
+
+        The index contains all installed package nodes including the ones
+        marked as deleted.  It is built on first access and kept for the
+        lifetime of the graph as the package nodes never change.
+        """
+        if self.__package_name_index is None:
+            logging.debug("Building package name index ...")
+            self.__package_name_index = graph.NameIndex(self.__package_nodes)
+        return self.__package_name_index
 
     @property
     def package_nodes(self):
@@ -196,10 +502,10 @@ class DpkgGraph(graph.Graph):
 
         The set doesn't include package nodes that have been marked deleted.
         See the deleted_package_nodes property for a set of package nodes that
-        have been marked deleted.
+        have been marked deleted.  See the live_members_of_type method for a
+        live view of the package nodes with an O(1) count.
         """
-        return {node for node in self.__package_nodes.values()
-                if not node.deleted}
+        return set(self.live_members_of_type(package_node.PackageNode))
 
     @property
     def dependency_edges(self):
@@ -207,8 +513,80 @@ class DpkgGraph(graph.Graph):
 
         The set doesn't include dependency edges that have been marked deleted.
         """
-        return {edge for edge in self.__dependency_edges.values()
-                if not edge.deleted}
+        return set(self.live_members_of_type(
+            dependency_edge.DependencyEdge))
+
+    def purge_footprint(self, members):
+        """Returns the footprint of purging the given members.
+
+        The given members and the members that would be obsoleted by this
+        operation are marked as deleted and afterwards the graph is rolled back
+        to its previous state.
+
+        Args:
+            members: Members of this graph to purge.
+
+        Returns:
+            PurgeFootprint with the set of package nodes that would be purged
+            and their total installed size in KiB.
+
+        Raises:
+            KeepNodeCanNotBeMarkedDeletedError: If purging the members would
+                purge packages that need to be kept.  The graph is rolled back
+                nevertheless.
+        """
+        checkpoint = self.checkpoint()
+        try:
+            self.mark_members_including_obsolete_deleted(members)
+            deleted_nodes = self.deleted_nodes_since(checkpoint)
+        finally:
+            self.rollback(checkpoint)
+
+        pkg_nodes = frozenset(
+            node for node in deleted_nodes
+            if node.__class__ is package_node.PackageNode)
+        pkg_to_metadata = self.package_metadata
+        installed_size = 0
+        for node in pkg_nodes:
+            metadata = pkg_to_metadata.get(node.uid)
+            if metadata is not None:
+                installed_size += metadata.installed_size
+        return DpkgGraph.PurgeFootprint(pkg_nodes, installed_size)
+
+    def reinstall_plan(self, baseline_dpkg_db=None):
+        """Returns the plan to restore the installed packages of this graph.
+
+        Installing the leaf packages and the kept packages installs all other
+        packages of the graph as dependencies.  Preventing the recommended
+        packages that aren't installed keeps Apt from installing additional
+        packages.  Only nodes that aren't marked as deleted are considered.
+
+        Args:
+            baseline_dpkg_db: Path to the dpkg status database of the system
+                the plan will be applied to, e.g. a minimal install.  Packages
+                installed on the baseline are omitted from the plan.  Defaults
+                to an empty baseline.
+
+        Returns:
+            ReinstallPlan with the sorted lists of the names of the packages to
+            install and the names of the packages to prevent from being
+            installed.
+        """
+        install = set(
+            node.uid for leaf in self.leafs for node in leaf
+            if node.uid in self.__package_nodes)
+        install |= set(edge.to_node.uid for edge in self.keep_edges)
+        prevent = set(self.__missing_recommends)
+
+        if baseline_dpkg_db is not None:
+            baseline_pkgs = package_metadata.read_package_metadata(
+                baseline_dpkg_db, self.__native_arch).keys()
+            install -= baseline_pkgs
+            prevent -= baseline_pkgs
+        if not install:
+            prevent.clear()  # Nothing will be installed on the baseline.
+
+        return DpkgGraph.ReinstallPlan(sorted(install), sorted(prevent))
 
     @property
     def target_edges(self):
@@ -216,8 +594,7 @@ class DpkgGraph(graph.Graph):
 
         The set doesn't include target edges that have been marked deleted.
         """
-        return {edge for edge in self.__target_edges.values()
-                if not edge.deleted}
+        return set(self.live_members_of_type(target_edge.TargetEdge))
 
     @property
     def target_versions_nodes(self):
@@ -226,5 +603,22 @@ class DpkgGraph(graph.Graph):
         The set doesn't include target versions nodes that have been marked
         deleted.
         """
-        return {node for node in self.__target_versions_nodes.values()
-                if not node.deleted}
+        return set(self.live_members_of_type(
+            target_versions_node.TargetVersionsNode))
+
+
+def _nodes_above(dpkg_graph, nodes):
+    """Returns the set of the live nodes of a graph at or above the nodes.
+
+    The nodes can be members of another graph as members are matched by their
+    interned ids.  Nodes that aren't live nodes of the graph are ignored.
+    """
+    graph_nodes = {node: node for node in dpkg_graph.live_nodes}
+    stack = [graph_nodes[node] for node in nodes if node in graph_nodes]
+    above = set(stack)
+    while stack:
+        for incoming_node in stack.pop().incoming_nodes:
+            if incoming_node not in above:
+                above.add(incoming_node)
+                stack.append(incoming_node)
+    return above
@@ -8,6 +8,25 @@ class DpkgGraphError(error.PurgatoryError):
     """Base class for all dpkg graph related errors."""
 
 
+class AptSimulationError(DpkgGraphError):
+    """Raised if the simulation with Apt's resolver failed."""
+
+    def __init__(self, reason):
+        msg = "The simulation with Apt's resolver failed: %s" % (reason)
+        super().__init__(msg)
+        self.reason = reason
+
+
+class AptWorkerError(DpkgGraphError):
+    """Raised if an Apt worker process couldn't read an Apt snapshot."""
+
+    def __init__(self, dpkg_db, reason):
+        msg = "Reading the Apt snapshot of '%s' failed: %s" % (
+            dpkg_db or "the system's dpkg status database", reason)
+        super().__init__(msg)
+        self.reason = reason
+
+
 class DependencyIsNotInstalledError(DpkgGraphError):
     """Raised if a dependency that is expected to be installed isn't."""
 
@@ -0,0 +1,40 @@
+"""An edge between the KeepNode and an installed package that is kept."""
+
+
+from .. import graph
+
+
+class KeepEdge(graph.Edge):
+    """An edge between the KeepNode and a PackageNode that needs to be kept.
+
+    Please note that the probability of a keep edge is always 1.0 as the
+    package needs to be kept without any alternative.
+    """
+
+    def __init__(self, from_node, to_node):
+        """KeepEdge constructor.
+
+        Args:
+            from_node: KeepNode object.
+            to_node: PackageNode object.
+        """
+        super().__init__(from_node, to_node)
+
+    def _nodes_to_edge_uid(self, from_node, to_node):
+        """Returns an uid for this directed edge based on the nodes."""
+        return "%s --keep--> %s" % (from_node.uid, to_node.uid)
+
+    def _init_str(self):
+        """Initializes self._str for self.__str__."""
+        self._str = "%s --> %s" % (self.from_node, self.to_node)
+
+    @property
+    def graphviz_attributes(self):
+        """Returns the attributes dict for the respective GraphViz member."""
+        return {
+            "arrowsize": 0.8,  # Compensate for the penwidth.
+            "label": "",
+            "penwidth": 2.5,
+            "style": "bold",
+            "tooltip": str(self),
+        }
@@ -29,6 +29,16 @@ class KeepNode(graph.Node):
         """Initializes self._str for self.__str__."""
         self._str = "keep"
 
+    @property
+    def graphviz_attributes(self):
+        """Returns the attributes dict for the respective GraphViz member."""
+        return {
+            "label": "Keep",
+            "penwidth": 2.5,
+            "shape": "octagon",
+            "tooltip": "Keep: all packages below need to be kept",
+        }
+
     def _add_incoming_edge(self, edge):
         """Registers an edge as incoming edge with this node.
 
@@ -38,6 +48,22 @@ class KeepNode(graph.Node):
         """
         raise error.KeepNodeMustBeLeafError()
 
+    @property
+    def can_be_marked_deleted(self):
+        """Returns True if this node can be marked as deleted.
+
+        The KeepNode can't be marked as deleted (see mark_deleted).
+        """
+        return False
+
+    @property
+    def counted_in_purge_impact(self):
+        """Returns True if this node is counted in the purge impact.
+
+        The KeepNode can't be purged and hence it isn't counted.
+        """
+        return False
+
     def mark_deleted(self):
         """Marks the node and its incoming and outgoing edges as deleted.
 
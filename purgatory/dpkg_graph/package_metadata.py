@@ -0,0 +1,169 @@
+"""Metadata of the installed packages in the dpkg status database."""
+
+
+import collections
+
+
+PackageMetadata = collections.namedtuple(
+    "PackageMetadata", ["installed_size", "description", "section",
+                        "priority"])
+PackageMetadata.__doc__ = """Metadata of an installed package.
+
+Attributes:
+    installed_size: Installed size of the package in KiB (int).
+    description: Short description of the package (first line).
+    section: Section of the package.
+    priority: Priority of the package.
+"""
+
+
+# Package states in the dpkg status database that don't count as installed.
+_NOT_INSTALLED_STATES = frozenset(("not-installed", "config-files"))
+
+# Fields in the dpkg status database that mark a package as essential.
+_ESSENTIAL_FIELDS = ("Essential", "Important", "Protected")
+
+
+def _installed_sections(tag_file):
+    """Yields the sections of the installed packages of a tag file."""
+    for section in tag_file:
+        status = section.get("Status", "").split()
+        if status and status[-1] not in _NOT_INSTALLED_STATES:
+            yield section
+
+
+def _qualified_name(section, native_arch):
+    """Returns the package name (PackageNode uid) of a tag file section.
+
+    Packages of another architecture than the native architecture (except
+    'all') are qualified with their architecture the same way as python-apt
+    does ('name:arch').
+    """
+    pkg = section["Package"]
+    arch = section.get("Architecture", native_arch)
+    if arch not in (native_arch, "all"):
+        pkg = "%s:%s" % (pkg, arch)
+    return pkg
+
+
+def read_architectures(dpkg_db):
+    """Reads the architectures of the installed packages.
+
+    The native architecture of a system is the architecture of its installed
+    dpkg package.  All other architectures of the installed packages (except
+    'all') are foreign architectures.
+
+    Args:
+        dpkg_db: Path of the dpkg status database file.
+
+    Returns:
+        Tuple of the native architecture (None if dpkg isn't installed) and
+        the frozenset of the foreign architectures.
+    """
+    import apt_pkg
+
+    native_arch = None
+    archs = set()
+    with apt_pkg.TagFile(dpkg_db) as tag_file:  # pylint: disable=no-member
+        for section in _installed_sections(tag_file):
+            arch = section.get("Architecture", "all")
+            archs |= set((arch,))
+            if section["Package"] == "dpkg":
+                native_arch = arch
+
+    return native_arch, frozenset(archs - set((native_arch, "all")))
+
+
+def read_package_metadata(dpkg_db, native_arch):
+    """Reads the metadata of all installed packages in a single bulk pass.
+
+    Reading the metadata via the python-apt Package and Version objects is
+    slow as each field is looked up individually.  Instead the dpkg status
+    database is parsed with Apt's tag file parser in one go.
+
+    Args:
+        dpkg_db: Path of the dpkg status database file.
+        native_arch: The native architecture of the system.  Packages of
+            another architecture (except 'all') are qualified with their
+            architecture the same way as python-apt does ('name:arch').
+
+    Returns:
+        Dict of package name (PackageNode uid) to PackageMetadata.
+    """
+    import apt_pkg
+
+    pkg_to_metadata = {}
+    with apt_pkg.TagFile(dpkg_db) as tag_file:  # pylint: disable=no-member
+        for section in _installed_sections(tag_file):
+            pkg = _qualified_name(section, native_arch)
+
+            try:
+                installed_size = int(section.get("Installed-Size", "0"))
+            except ValueError:  # pragma: no cover
+                installed_size = 0
+            description = section.get("Description", "").split("\n", 1)[0]
+
+            pkg_to_metadata[pkg] = PackageMetadata(
+                installed_size=installed_size,
+                description=description.strip(),
+                section=section.get("Section", ""),
+                priority=section.get("Priority", ""))
+
+    return pkg_to_metadata
+
+
+def read_essential_packages(dpkg_db, native_arch):
+    """Reads the names of the installed essential packages.
+
+    Packages with the 'Important' or 'Protected' field are counted as
+    essential as well as Apt treats them the same way, e.g. it never removes
+    them automatically.
+
+    Args:
+        dpkg_db: Path of the dpkg status database file.
+        native_arch: The native architecture of the system (see
+            read_package_metadata).
+
+    Returns:
+        Frozenset of the package names (PackageNode uids).
+    """
+    import apt_pkg
+
+    essential = set()
+    with apt_pkg.TagFile(dpkg_db) as tag_file:  # pylint: disable=no-member
+        for section in _installed_sections(tag_file):
+            if "yes" in (section.get(field) for field in _ESSENTIAL_FIELDS):
+                essential |= set((_qualified_name(section, native_arch),))
+    return frozenset(essential)
+
+
+def read_auto_installed(extended_states, native_arch):
+    """Reads the names of the packages marked as automatically installed.
+
+    Apt records the packages that have been installed automatically as
+    dependencies of other packages in its extended_states file.  The file is
+    parsed in a single streaming pass with Apt's tag file parser.
+
+    Args:
+        extended_states: Path of Apt's extended_states file, typically
+            '/var/lib/apt/extended_states'.
+        native_arch: The native architecture of the system (see
+            read_package_metadata).
+
+    Returns:
+        Frozenset of the package names (PackageNode uids).  The packages
+        aren't necessarily installed.
+
+    Raises:
+        OSError: If the file can't be opened.
+    """
+    import apt_pkg
+
+    auto_installed = set()
+    with open(extended_states, "r") as f:
+        with apt_pkg.TagFile(f) as tag_file:  # noqa  # pylint: disable=no-member
+            for section in tag_file:
+                if section.get("Auto-Installed", "0") == "1":
+                    auto_installed |= set(
+                        (_qualified_name(section, native_arch),))
+    return frozenset(auto_installed)
@@ -14,22 +14,29 @@ class PackageNode(graph.Node):
     version (or none) of a package can be installed.
     """
 
-    def __init__(self, pkg):
+    def __init__(self, pkg=None, name=None):
         """PackageNode constructor.
 
+        Either pkg or name has to be given.
+
         Args:
             pkg: apt.package.Package object.
+            name: Name of the installed package (see pkg_to_uid).  The
+                apt.package.Package object is looked up in the graph's Apt
+                cache on demand.
         """
         # Check
-        if not pkg.is_installed:
+        if pkg is not None and not pkg.is_installed:
             raise error.PackageIsNotInstalledError(pkg)
 
         # Private
         self.__pkg = pkg
-        self.__ver = pkg.installed
+        self.__ver = pkg.installed if pkg is not None else None
 
         # Init
-        super().__init__(PackageNode.pkg_to_uid(pkg))
+        if pkg is not None:
+            name = PackageNode.pkg_to_uid(pkg)
+        super().__init__(name)
 
     @staticmethod
     def pkg_to_uid(pkg):
@@ -40,6 +47,14 @@ class PackageNode(graph.Node):
         """Initializes self._str for self.__str__."""
         self._str = self.uid
 
+    @property
+    def auto_installed(self):
+        """Returns True if Apt marked the package as automatically installed.
+
+        See DpkgGraph.auto_installed_packages for details.
+        """
+        return self.uid in self.graph.auto_installed_packages
+
     @property
     def graphviz_attributes(self):
         """Returns the attributes dict for the respective GraphViz member."""
@@ -50,12 +65,31 @@ class PackageNode(graph.Node):
             "tooltip": "Package: %s" % self.uid,
         }
 
+    @property
+    def metadata(self):
+        """Returns the PackageMetadata for this node.
+
+        See DpkgGraph.package_metadata for details.  Returns None if the dpkg
+        status database has no metadata for this package.
+        """
+        return self.graph.package_metadata.get(self.uid)
+
     @property
     def package(self):
-        """Returns the apt.package.Package object for this node."""
+        """Returns the apt.package.Package object for this node.
+
+        Returns None if the graph has no Apt cache.
+        """
+        if self.__pkg is None and self.graph.cache is not None:
+            self.__pkg = self.graph.cache[self.uid]
         return self.__pkg
 
     @property
     def version(self):
-        """Returns the apt.package.Version object for this node."""
+        """Returns the apt.package.Version object for this node.
+
+        Returns None if the graph has no Apt cache.
+        """
+        if self.__ver is None and self.package is not None:
+            self.__ver = self.__pkg.installed
         return self.__ver
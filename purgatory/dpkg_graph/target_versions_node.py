@@ -19,25 +19,30 @@ class TargetVersionsNode(graph.Node):
     node represents.
     """
 
-    def __init__(self, dep):
-        """PackageNode constructor.
+    def __init__(self, dep=None, target_pkgs=None):
+        """TargetVersionsNode constructor.
 
         Args:
-            dep: apt.package.Dependency object.
+            dep: apt.package.Dependency object.  Can be omitted if target_pkgs
+                is given.
+            target_pkgs: Iterable of the names (PackageNode uids) of the
+                installed packages that fulfill the dependency.  Only used if
+                dep is omitted.
         """
         # Private
-        self.__itvers = frozenset(dep.installed_target_versions)
+        self.__itvers = None
+        if dep is not None:
+            self.__itvers = frozenset(dep.installed_target_versions)
+            target_pkgs = {str(ver.package) for ver in self.__itvers}
+        self.__target_pkgs = tuple(sorted(set(target_pkgs or ())))
 
         # Check
-        if not self.__itvers:
+        if not self.__target_pkgs:
             raise error.DependencyIsNotInstalledError(dep)
 
         # Init
         # Generate uid as decribed in the TargetVersionsNode docstring.
-        itpkgs_str_set = {str(ver.package) for ver in self.__itvers}
-        itpkgs_str_list = list(itpkgs_str_set)
-        itpkgs_str_list.sort()
-        uid = "<" + "|".join(itpkgs_str_list) + ">"
+        uid = "<" + "|".join(self.__target_pkgs) + ">"
         super().__init__(uid)
 
     def _init_str(self):
@@ -47,12 +52,8 @@ class TargetVersionsNode(graph.Node):
     @property
     def graphviz_attributes(self):
         """Returns the attributes dict for the respective GraphViz member."""
-        itpkgs_str_set = {str(ver.package) for ver in self.__itvers}
-        itpkgs_str_list = list(itpkgs_str_set)
-        itpkgs_str_list.sort()
-
         attrs = {
-            "label": "Possible targets:\n%s" % "\n".join(itpkgs_str_list),
+            "label": "Possible targets:\n%s" % "\n".join(self.__target_pkgs),
             "penwidth": 2.5,
             "shape": "rectangle",
             "style": "rounded",
@@ -60,7 +61,25 @@ class TargetVersionsNode(graph.Node):
         }
         return attrs
 
+    @property
+    def counted_in_purge_impact(self):
+        """Returns True if this node is counted in the purge impact.
+
+        Only packages are counted in the purge impact.  The target versions
+        node only glues the packages together and hence it isn't counted.
+        """
+        return False
+
     @property
     def installed_target_versions(self):
         """Returns the set of installed target apt.package.Version objects."""
+        if self.__itvers is None:
+            cache = self.graph.cache
+            self.__itvers = frozenset(
+                cache[pkg].installed for pkg in self.__target_pkgs)
         return self.__itvers
+
+    @property
+    def target_packages(self):
+        """Returns the sorted tuple of the names of the target packages."""
+        return self.__target_pkgs
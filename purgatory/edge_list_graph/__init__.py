@@ -0,0 +1,44 @@
+"""Graph representing a generic dependency graph read from an edge list.
+
+The EdgeListGraph makes the Graph algorithms (leafs, marking obsolete members
+as deleted, clustering, ...) available for dependency graphs other than the
+dpkg status database, e.g. the dependencies between services or build
+targets.  It is also a fast way to build large synthetic graphs for
+benchmarks.
+
+Supported edge list formats:
+* TSV and CSV: One edge per line with the fields from node, to node and
+  group.  The to node and the group are optional.
+* JSONL: One JSON object per line with the keys 'from', 'to' and 'group'.
+
+Edges with the same from node and the same group are alternatives (an
+or-relationship) and edges without a group are mandatory.
+"""
+
+
+# Ignore all flake8 issues because F401 issues (unused imports) can't be
+# silenced otherwise.
+# flake8: noqa
+
+# Silence unused import warnings.
+# pylint: disable=unused-import
+
+
+# EdgeListGraph-specific exceptions.
+from .error import EdgeListFormatError
+from .error import EdgeListGraphError
+from .error import UnsupportedEdgeListFormatError
+
+# EdgeListGraph-specific types.
+from .edge_list_reader import EdgeListRecord
+
+# EdgeListGraph-specific functions.
+from .edge_list_reader import edge_list_format_of
+from .edge_list_reader import read_edge_list
+
+# EdgeListGraph-specific classes.
+from .alternative_edge import AlternativeEdge
+from .alternatives_node import AlternativesNode
+from .edge_list_edge import EdgeListEdge
+from .edge_list_graph import EdgeListGraph
+from .edge_list_node import EdgeListNode
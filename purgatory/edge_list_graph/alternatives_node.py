@@ -0,0 +1,55 @@
+"""A graph node that represents an or-group of an edge list."""
+
+
+from . import edge_list_node
+
+
+class AlternativesNode(edge_list_node.EdgeListNode):
+    """A node that represents the alternatives of an or-group.
+
+    The outgoing edges of a node of the graph are either all edges or all
+    or-edges.  Hence an or-group of an edge list is represented by an
+    AlternativesNode: The from node has an edge to the AlternativesNode and
+    the AlternativesNode has an or-edge to every alternative.  Like target
+    versions nodes of the dpkg graph an AlternativesNode is solely defined by
+    its alternatives and hence shared by all or-groups with the same
+    alternatives.
+    """
+
+    def __init__(self, alternatives):
+        """AlternativesNode constructor.
+
+        Args:
+            alternatives: Iterable of the names (EdgeListNode uids) of the
+                alternatives.
+        """
+        # Private
+        self.__alternatives = tuple(sorted(set(alternatives)))
+
+        # Init
+        super().__init__("<" + "|".join(self.__alternatives) + ">")
+
+    @property
+    def alternatives(self):
+        """Returns the sorted tuple of the names of the alternatives."""
+        return self.__alternatives
+
+    @property
+    def counted_in_purge_impact(self):
+        """Returns True if this node is counted in the purge impact.
+
+        The AlternativesNode only glues the nodes together and hence it isn't
+        counted.
+        """
+        return False
+
+    @property
+    def graphviz_attributes(self):
+        """Returns the attributes dict for the respective GraphViz member."""
+        return {
+            "label": "Alternatives:\n%s" % "\n".join(self.__alternatives),
+            "penwidth": 2.5,
+            "shape": "rectangle",
+            "style": "rounded",
+            "tooltip": "Alternatives: %s" % self.uid,
+        }
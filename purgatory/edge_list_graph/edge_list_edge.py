@@ -0,0 +1,40 @@
+"""An edge between two nodes of an edge list."""
+
+
+from .. import graph
+
+
+class EdgeListEdge(graph.Edge):
+    """An edge between two nodes of an edge list.
+
+    Please note that the probability of an edge list edge is always 1.0.
+    Alternatives are represented by an AlternativesNode with
+    AlternativeEdges instead.
+    """
+
+    def __init__(self, from_node, to_node):
+        """EdgeListEdge constructor.
+
+        Args:
+            from_node: EdgeListNode object.
+            to_node: EdgeListNode or AlternativesNode object.
+        """
+        super().__init__(from_node, to_node)
+
+    def _nodes_to_edge_uid(self, from_node, to_node):
+        """Returns an uid for this directed edge based on the nodes."""
+        return "%s --> %s" % (from_node.uid, to_node.uid)
+
+    def _init_str(self):
+        """Initializes self._str for self.__str__."""
+        self._str = self.uid
+
+    @property
+    def graphviz_attributes(self):
+        """Returns the attributes dict for the respective GraphViz member."""
+        return {
+            "arrowsize": 0.8,  # Compensate for the penwidth.
+            "label": "",
+            "penwidth": 2.5,
+            "tooltip": str(self),
+        }
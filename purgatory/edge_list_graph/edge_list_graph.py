@@ -0,0 +1,148 @@
+"""Graph representing the nodes and edges of an edge list."""
+
+
+import logging
+import types
+
+from . import alternative_edge
+from . import alternatives_node
+from . import edge_list_edge
+from . import edge_list_node
+from . import edge_list_reader
+
+from .. import graph
+
+
+class EdgeListGraph(graph.Graph):
+    """Graph representing the nodes and edges of an edge list.
+
+    The edge list can be any dependency graph, e.g. the dependencies between
+    services or build targets.  Every named node of the edge list becomes an
+    EdgeListNode and every edge without a group an EdgeListEdge.  The edges
+    of an or-group become an EdgeListEdge to an AlternativesNode with an
+    AlternativeEdge to every alternative (see AlternativesNode).
+
+    The records of the edge list are streamed and deduplicated first.
+    Afterwards all nodes and edges are constructed in bulk without the
+    per-member checks of the Graph and Node base classes, as deduplicated
+    records can only result in valid members.  Edges from a node to itself
+    are ignored as they can't be satisfied by anything else.
+    """
+
+    def __init__(self, edge_list=None, edge_list_format=None, records=None,
+                 timings=None):
+        """EdgeListGraph constructor.
+
+        Args:
+            edge_list: Path of an edge list file or a text file object (see
+                read_edge_list).
+            edge_list_format: 'csv', 'jsonl' or 'tsv'.  Defaults to the format
+                of the file name extension of the edge list.
+            records: Iterable of EdgeListRecord objects or (from node, to
+                node, group) tuples to build the graph from instead of an
+                edge list, e.g. records generated for benchmarks.  The edge
+                list arguments are ignored then.
+            timings: Timings (purgatory.timings.Timings) to record the phases
+                of the initialization in.  Defaults to disabled timings.
+        """
+        # Private
+        self.__edge_list = edge_list
+        self.__edge_list_format = edge_list_format
+        self.__records = records
+        self.__named_nodes = {}  # uid:node
+        self.__alternatives_nodes = {}  # uid:node
+        self.__self_loops = 0
+
+        # Init
+        logging.debug("Initializing edge list graph ...")
+        super().__init__(timings)  # Calls _init_nodes_and_edges.
+
+        # Log
+        logging.debug("edge list graph contains:")
+        logging.debug("  Named nodes: %d", len(self.__named_nodes))
+        logging.debug("  Alternatives nodes: %d",
+                      len(self.__alternatives_nodes))
+        logging.debug("  Edges: %d", len(self._edges))
+        logging.debug("  Ignored self-loops: %d", self.__self_loops)
+
+    def _init_nodes_and_edges(self):
+        """Initializes the nodes and edges of the edge list graph."""
+        timings = self.timings
+        records = self.__records
+        if records is None:
+            records = edge_list_reader.read_edge_list(
+                self.__edge_list, self.__edge_list_format)
+
+        # Deduplicate the records while streaming them.  Dicts are used as
+        # ordered sets to keep the order of the edge list.
+        names = {}  # name:None
+        targets = {}  # from name:{to uid:None}
+        groups = {}  # (from name, group):{alternative name:None}
+        with timings.phase("edge list records"):
+            for from_name, to_name, group in records:
+                names[from_name] = None
+                if not to_name:
+                    continue
+                names[to_name] = None
+                if group:
+                    groups.setdefault((from_name, group), {})[to_name] = None
+                elif from_name != to_name:
+                    targets.setdefault(from_name, {})[to_name] = None
+                else:
+                    self.__self_loops += 1
+
+        # Construct the nodes.  Or-groups with the same alternatives share
+        # the same AlternativesNode and or-groups with a single alternative
+        # are plain edges.
+        with timings.phase("edge list nodes"):
+            nodes = {name: edge_list_node.EdgeListNode(name) for name in names}
+            self.__named_nodes = dict(nodes)
+            alternatives_to_node = {}  # alternatives:node
+            for (from_name, _), alternatives in groups.items():
+                if from_name in alternatives:
+                    self.__self_loops += 1
+                    continue  # The from node satisfies the or-group itself.
+                if len(alternatives) == 1:
+                    to_uid = next(iter(alternatives))
+                else:
+                    key = tuple(sorted(alternatives))
+                    an = alternatives_to_node.get(key)
+                    if an is None:
+                        an = alternatives_node.AlternativesNode(key)
+                        if an.uid in nodes:
+                            raise graph.MemberAlreadyRegisteredError(an)
+                        nodes[an.uid] = an
+                        self.__alternatives_nodes[an.uid] = an
+                        alternatives_to_node[key] = an
+                    to_uid = an.uid
+                targets.setdefault(from_name, {})[to_uid] = None
+            self._add_nodes_bulk(nodes.values())
+
+        # Construct the edges.
+        with timings.phase("edge list edges"):
+            edges = []
+            for from_name, to_uids in targets.items():
+                from_node = nodes[from_name]
+                for to_uid in to_uids:
+                    edges.append(edge_list_edge.EdgeListEdge(
+                        from_node, nodes[to_uid]))
+            for an in self.__alternatives_nodes.values():
+                for name in an.alternatives:
+                    edges.append(alternative_edge.AlternativeEdge(
+                        an, nodes[name]))
+            self._add_edges_bulk(edges)
+
+        # Freeze the node dicts.
+        self.__named_nodes = types.MappingProxyType(self.__named_nodes)
+        self.__alternatives_nodes = types.MappingProxyType(
+            self.__alternatives_nodes)
+
+    @property
+    def alternatives_nodes(self):
+        """Returns the dict of uid to AlternativesNode of the graph."""
+        return self.__alternatives_nodes
+
+    @property
+    def named_nodes(self):
+        """Returns the dict of name to EdgeListNode of the graph."""
+        return self.__named_nodes
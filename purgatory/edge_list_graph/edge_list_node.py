@@ -0,0 +1,57 @@
+"""A graph node that represents a named node of an edge list."""
+
+
+from .. import graph
+
+
+class EdgeListNode(graph.Node):
+    """A node that represents a named node of an edge list.
+
+    The EdgeListGraph constructs its nodes and edges from deduplicated input
+    and ensures that a node has either only edges or only or-edges as
+    outgoing edges.  Hence the edges are registered without the checks of
+    the Node base class, which speeds up the construction of large graphs.
+    """
+
+    def __init__(self, name):
+        """EdgeListNode constructor.
+
+        Args:
+            name: Name of the node in the edge list.  Used as uid.
+        """
+        super().__init__(name)
+
+    def _add_incoming_edge(self, edge):
+        """Registers an edge as incoming edge with this node.
+
+        The checks of Node._add_incoming_edge are skipped as the edge list
+        graph only constructs valid edges.
+        """
+        self._incoming_edges.add(edge)
+        self._incoming_nodes.add(edge.from_node)
+
+    def _add_outgoing_edge(self, edge):
+        """Registers an edge as outgoing edge with this node.
+
+        The checks of Node._add_outgoing_edge are skipped as the edge list
+        graph only constructs valid edges and never mixes edges and or-edges
+        in the outgoing edges of a node.
+        """
+        if self._outgoing_or_edges is None:
+            self._outgoing_or_edges = edge.is_oredge_instance
+        self._outgoing_edges.add(edge)
+        self._outgoing_nodes.add(edge.to_node)
+
+    def _init_str(self):
+        """Initializes self._str for self.__str__."""
+        self._str = self.uid
+
+    @property
+    def graphviz_attributes(self):
+        """Returns the attributes dict for the respective GraphViz member."""
+        return {
+            "label": self.uid,
+            "penwidth": 2.5,
+            "shape": "rectangle",
+            "tooltip": self.uid,
+        }
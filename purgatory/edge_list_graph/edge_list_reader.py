@@ -0,0 +1,166 @@
+"""Streaming readers for edge lists in the TSV, CSV and JSONL formats."""
+
+
+import collections
+import csv
+import json
+import os.path
+
+from . import error
+
+
+EdgeListRecord = collections.namedtuple(
+    "EdgeListRecord", ["from_node", "to_node", "group"])
+EdgeListRecord.__doc__ = """A single line of an edge list.
+
+Attributes:
+    from_node: Name of the node the edge starts at.
+    to_node: Name of the node the edge points to.  An empty string declares
+        the from node without adding an edge, e.g. for isolated nodes.
+    group: Name of the or-group of the edge or an empty string.  The edges
+        with the same from node and the same group are alternatives and any
+        of them satisfies the from node.  The name is only meaningful per
+        from node.
+"""
+
+_EXTENSION_TO_FORMAT = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".tsv": "tsv",
+}
+
+
+def edge_list_format_of(edge_list):
+    """Returns the format of an edge list based on its file name extension.
+
+    Args:
+        edge_list: Path of the edge list file.
+
+    Returns:
+        'csv', 'jsonl', 'tsv' or None if the extension is unknown.
+    """
+    return _EXTENSION_TO_FORMAT.get(os.path.splitext(edge_list)[1].lower())
+
+
+def _rows_to_records(edge_list, numbered_rows):
+    """Yields the EdgeListRecords of the (line number, fields) tuples.
+
+    Lines without fields and lines starting with '#' are skipped.  A first
+    row with the fields 'from' and 'to' is skipped as header.
+    """
+    first = True
+    for line_number, row in numbered_rows:
+        if not row or (len(row) == 1 and not row[0].strip()):
+            continue
+        if row[0].startswith("#"):
+            continue
+        fields = [field.strip() for field in row]
+        if first:
+            first = False
+            if fields[:2] == ["from", "to"]:
+                continue
+        if len(fields) > 3:
+            raise error.EdgeListFormatError(
+                edge_list, line_number,
+                "expected at most 3 fields but got %d" % len(fields))
+        fields += [""] * (3 - len(fields))
+        record = EdgeListRecord(*fields)
+        if not record.from_node:
+            raise error.EdgeListFormatError(
+                edge_list, line_number, "the from node is missing")
+        if record.group and not record.to_node:
+            raise error.EdgeListFormatError(
+                edge_list, line_number, "the group has no to node")
+        yield record
+
+
+def _read_tsv(edge_list, lines):
+    """Yields the EdgeListRecords of the lines of a TSV edge list."""
+    return _rows_to_records(edge_list, (
+        (line_number, line.rstrip("\r\n").split("\t"))
+        for line_number, line in enumerate(lines, 1)))
+
+
+def _read_csv(edge_list, lines):
+    """Yields the EdgeListRecords of the lines of a CSV edge list."""
+    reader = csv.reader(lines)
+    return _rows_to_records(
+        edge_list, ((reader.line_num, row) for row in reader))
+
+
+def _read_jsonl(edge_list, lines):
+    """Yields the EdgeListRecords of the lines of a JSONL edge list.
+
+    Every line is a JSON object with the keys 'from', 'to' and 'group'.  Only
+    'from' is mandatory.
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as ex:
+            raise error.EdgeListFormatError(edge_list, line_number, str(ex))
+        if not isinstance(obj, dict):
+            raise error.EdgeListFormatError(
+                edge_list, line_number, "expected a JSON object")
+        record = EdgeListRecord(
+            obj.get("from") or "", obj.get("to") or "", obj.get("group") or "")
+        if not all(isinstance(field, str) for field in record):
+            raise error.EdgeListFormatError(
+                edge_list, line_number, "expected strings as values")
+        if not record.from_node:
+            raise error.EdgeListFormatError(
+                edge_list, line_number, "the from node is missing")
+        if record.group and not record.to_node:
+            raise error.EdgeListFormatError(
+                edge_list, line_number, "the group has no to node")
+        yield record
+
+
+_FORMAT_TO_READER = {
+    "csv": _read_csv,
+    "jsonl": _read_jsonl,
+    "tsv": _read_tsv,
+}
+
+
+def read_edge_list(edge_list, edge_list_format=None):
+    """Yields the records of an edge list line by line.
+
+    The edge list is streamed and hence only the current line is held in
+    memory.  TSV and CSV edge lists have the fields from node, to node and
+    group per line.  The to node and the group are optional.  Empty lines,
+    lines starting with '#' and a 'from', 'to' header line are skipped.
+    JSONL edge lists have a JSON object with the keys 'from', 'to' and
+    'group' per line.
+
+    Args:
+        edge_list: Path of the edge list file or a text file object.
+        edge_list_format: 'csv', 'jsonl' or 'tsv'.  Defaults to the format
+            of the file name extension.
+
+    Yields:
+        EdgeListRecord objects.
+
+    Raises:
+        UnsupportedEdgeListFormatError: If the format isn't supported or
+            can't be determined.
+        EdgeListFormatError: If a line can't be parsed.
+    """
+    if isinstance(edge_list, str):
+        name = edge_list
+    else:
+        name = getattr(edge_list, "name", "<stream>")
+    if edge_list_format is None and isinstance(name, str):
+        edge_list_format = edge_list_format_of(name)
+    reader = _FORMAT_TO_READER.get(edge_list_format)
+    if reader is None:
+        raise error.UnsupportedEdgeListFormatError(name, edge_list_format)
+
+    if isinstance(edge_list, str):
+        with open(edge_list, "r", newline="") as f:
+            yield from reader(name, f)
+    else:
+        yield from reader(name, edge_list)
@@ -0,0 +1,30 @@
+"""EdgeListGraph-specific exceptions."""
+
+
+from .. import error
+
+
+class EdgeListGraphError(error.PurgatoryError):
+    """Base class for all edge list graph related errors."""
+
+
+class EdgeListFormatError(EdgeListGraphError):
+    """Raised if a line of an edge list can't be parsed."""
+
+    def __init__(self, edge_list, line_number, reason):
+        msg = "Line %d of the edge list '%s' is invalid: %s" % (
+            line_number, edge_list, reason)
+        super().__init__(msg)
+        self.line_number = line_number
+        self.reason = reason
+
+
+class UnsupportedEdgeListFormatError(EdgeListGraphError):
+    """Raised if the format of an edge list is unknown."""
+
+    def __init__(self, edge_list, edge_list_format):
+        msg = ("The edge list '%s' has the unsupported format '%s'!  "
+               "Supported formats: csv, jsonl, tsv") % (
+                   edge_list, edge_list_format)
+        super().__init__(msg)
+        self.edge_list_format = edge_list_format
@@ -51,6 +51,8 @@ classes would be in a 'friend' relationship.
 from .error import DeletedMemberInUseError
 from .error import EdgeWithZeroProbabilityError
 from .error import GraphError
+from .error import InvalidCheckpointError
+from .error import InvalidNamePatternError
 from .error import MemberAlreadyRegisteredError
 from .error import NodeIsNotPartOfEdgeError
 from .error import NotANodeError
@@ -58,12 +60,25 @@ from .error import NotAnEdgeError
 from .error import NotAnOrEdgeError
 from .error import NotMemberOfGraphError
 from .error import UnregisteredMemberInUseError
+from .error import UnsupportedExportFormatError
 
 
 # Graph-specific constants.
 from .const import EPSILON
 
 
+# Graph-specific types.
+from .diff import GraphDiff
+from .graph import Checkpoint
+
+
+# Graph-specific helper classes.
+from .chains import ChainIndex
+from .leaf_tracker import LeafTracker
+from .member_view import MemberView
+from .name_index import NameIndex
+
+
 # Graph-specific abstract base classes.
 from .edge import Edge
 from .graph import Graph
@@ -0,0 +1,261 @@
+"""Determine the shortest chains from the leafs of a Graph to its nodes."""
+
+
+import heapq
+
+from . import components
+from . import error
+
+
+class ChainIndex:
+    """Shortest chains from the leafs of a graph to its nodes.
+
+    A chain explains why a node is part of the graph: It starts at a leaf
+    node or leaf cycle and follows the edges down to the node.  Every hop of a
+    chain is a component of the graph, i.e. a single node or all the nodes of
+    a cycle, as cycles are treated as an undividable cluster of nodes.
+
+    The index condenses the graph into its components once and keeps the
+    adjacency of the components.  The chains are then searched on the
+    condensed graph without determining the incoming nodes recursive sets.
+    The index is a snapshot of the graph: Nodes and edges that are marked as
+    deleted when the index is built are ignored and later changes of the
+    graph aren't reflected.
+    """
+
+    def __init__(self, graph):
+        """ChainIndex constructor.
+
+        Args:
+            graph: Purgatory graph (purgatory.graph.Graph).
+        """
+        self.__graph = graph
+
+        # Number the components by their smallest sort key so that the
+        # results don't depend on the iteration order of sets.
+        comps = components.strongly_connected_components(graph.live_nodes)
+        comps.sort(key=lambda comp: min(node.sort_key for node in comp))
+        self.__comps = comps
+        self.__node_to_comp_index = {}
+        for comp_index, comp in enumerate(comps):
+            for node in comp:
+                self.__node_to_comp_index[node] = comp_index
+
+        # Adjacency of the condensed graph as sorted tuples.
+        node_to_comp_index = self.__node_to_comp_index
+        successors = [set() for _ in comps]
+        predecessors = [set() for _ in comps]
+        for comp_index, comp in enumerate(comps):
+            for node in comp:
+                for to_node in node.outgoing_nodes:
+                    to_comp_index = node_to_comp_index[to_node]
+                    if to_comp_index != comp_index:
+                        successors[comp_index] |= set((to_comp_index,))
+                        predecessors[to_comp_index] |= set((comp_index,))
+        self.__successors = [tuple(sorted(s)) for s in successors]
+        self.__predecessors = [tuple(sorted(p)) for p in predecessors]
+        self.__leafs = tuple(
+            comp_index for comp_index, p in enumerate(self.__predecessors)
+            if not p)
+
+        # Distances from the nearest leaf and the predecessor on the way to
+        # it.  Determined on demand by a single pass over the condensed graph.
+        self.__leaf_distances = None
+        self.__leaf_parents = None
+
+    def __comp_index(self, node):
+        """Returns the index of the component of the node.
+
+        Raises:
+            NotMemberOfGraphError: If the node isn't part of the graph.
+            DeletedMemberInUseError: If the node has been marked as deleted
+                before the index has been built.
+        """
+        if node.graph is not self.__graph:
+            raise error.NotMemberOfGraphError(node)
+        comp_index = self.__node_to_comp_index.get(node)
+        if comp_index is None:
+            raise error.DeletedMemberInUseError(node)
+        return comp_index
+
+    def __to_chain(self, comp_indexes):
+        """Returns the chain (tuple of frozensets) of the component indexes."""
+        return tuple(self.__comps[comp_index] for comp_index in comp_indexes)
+
+    def __init_leaf_distances(self):
+        """Determines the distances from the nearest leaf (BFS)."""
+        if self.__leaf_distances is not None:
+            return
+        distances = [None] * len(self.__comps)
+        parents = [None] * len(self.__comps)
+        frontier = list(self.__leafs)
+        for comp_index in frontier:
+            distances[comp_index] = 0
+        while frontier:
+            next_frontier = []
+            for comp_index in frontier:
+                distance = distances[comp_index] + 1
+                for to_comp_index in self.__successors[comp_index]:
+                    if distances[to_comp_index] is None:
+                        distances[to_comp_index] = distance
+                        parents[to_comp_index] = comp_index
+                        next_frontier.append(to_comp_index)
+            frontier = next_frontier
+        self.__leaf_distances = distances
+        self.__leaf_parents = parents
+
+    def __bidirectional_search(self, target_index):
+        """Returns the component indexes of a shortest chain to the target.
+
+        The search expands the smaller one of the frontiers of a forward
+        breadth-first search from all leafs and a backward breadth-first
+        search from the target level by level until they meet.
+        """
+        forward = {comp_index: None for comp_index in self.__leafs}
+        if target_index in forward:
+            return [target_index]
+        backward = {target_index: None}
+        forward_frontier = list(self.__leafs)
+        backward_frontier = [target_index]
+        forward_depth = {comp_index: 0 for comp_index in forward}
+        backward_depth = {target_index: 0}
+        while forward_frontier and backward_frontier:
+            # Expand the smaller frontier by one level and look for the
+            # components where both searches meet.
+            if len(forward_frontier) <= len(backward_frontier):
+                visited, depth, other, other_depth = (
+                    forward, forward_depth, backward, backward_depth)
+                frontier, adjacency = forward_frontier, self.__successors
+            else:
+                visited, depth, other, other_depth = (
+                    backward, backward_depth, forward, forward_depth)
+                frontier, adjacency = backward_frontier, self.__predecessors
+            next_frontier = []
+            meetings = []
+            for comp_index in frontier:
+                for next_index in adjacency[comp_index]:
+                    if next_index in visited:
+                        continue
+                    visited[next_index] = comp_index
+                    depth[next_index] = depth[comp_index] + 1
+                    next_frontier.append(next_index)
+                    if next_index in other:
+                        meetings.append((
+                            depth[next_index] + other_depth[next_index],
+                            next_index))
+            if meetings:
+                meeting_index = min(meetings)[1]
+                chain = []
+                comp_index = meeting_index
+                while comp_index is not None:
+                    chain.append(comp_index)
+                    comp_index = forward[comp_index]
+                chain.reverse()
+                comp_index = backward[meeting_index]
+                while comp_index is not None:
+                    chain.append(comp_index)
+                    comp_index = backward[comp_index]
+                return chain
+            if visited is forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+        return None  # pragma: no cover  # Every component has a leaf above.
+
+    def __k_shortest_search(self, target_index, k):
+        """Returns the component indexes of the k shortest chains.
+
+        The chains are searched backwards from the target.  As the distance
+        from the nearest leaf is known for every component the search always
+        continues with the partial chain that can be completed to the shortest
+        chain.  Hence the chains are found in the order of their length and
+        only the components on the k shortest chains are visited.
+        """
+        self.__init_leaf_distances()
+        distances = self.__leaf_distances
+        chains = []
+        heap = [(distances[target_index], (target_index,))]
+        while heap and len(chains) < k:
+            _, partial = heapq.heappop(heap)
+            comp_index = partial[0]
+            predecessors = self.__predecessors[comp_index]
+            if not predecessors:
+                chains.append(list(partial))
+                continue
+            for from_comp_index in predecessors:
+                heapq.heappush(heap, (
+                    len(partial) + distances[from_comp_index],
+                    (from_comp_index,) + partial))
+        return chains
+
+    def shortest_chain(self, node):
+        """Returns a shortest chain from a leaf to the node.
+
+        Args:
+            node: The node (purgatory.graph.Node) to explain.
+
+        Returns:
+            Tuple of the frozensets of the nodes of the components from a leaf
+            down to the component of the node.  A leaf node or a node of a
+            leaf cycle has a chain with a single component.
+
+        Raises:
+            NotMemberOfGraphError: If the node isn't part of the graph.
+            DeletedMemberInUseError: If the node has been marked as deleted
+                before the index has been built.
+        """
+        return self.__to_chain(
+            self.__bidirectional_search(self.__comp_index(node)))
+
+    def shortest_chains(self, node, k=1):
+        """Returns the k shortest chains from the leafs to the node.
+
+        See the shortest_chain method for the chains and the exceptions.
+
+        Args:
+            node: The node (purgatory.graph.Node) to explain.
+            k: The maximal number of chains.
+
+        Returns:
+            List of the chains, shortest first.  Fewer than k chains are
+            returned if there aren't more chains.
+        """
+        target_index = self.__comp_index(node)
+        if k == 1:
+            chains = [self.__bidirectional_search(target_index)]
+        else:
+            chains = self.__k_shortest_search(target_index, k)
+        return [self.__to_chain(chain) for chain in chains]
+
+    def shortest_chains_of(self, nodes, k=1):
+        """Returns the k shortest chains from the leafs to each of the nodes.
+
+        Contrary to calling the shortest_chains method for each node the
+        distances from the leafs are determined only once in a single pass
+        over the condensed graph for all the nodes.  See the shortest_chain
+        method for the chains and the exceptions.
+
+        Args:
+            nodes: Iterable of the nodes (purgatory.graph.Node) to explain.
+            k: The maximal number of chains per node.
+
+        Returns:
+            Dict of node to the list of its chains, shortest first.
+        """
+        target_indexes = {node: self.__comp_index(node) for node in nodes}
+        self.__init_leaf_distances()
+        node_to_chains = {}
+        for node, target_index in target_indexes.items():
+            if k == 1:
+                chain = []
+                comp_index = target_index
+                while comp_index is not None:
+                    chain.append(comp_index)
+                    comp_index = self.__leaf_parents[comp_index]
+                chain.reverse()
+                chains = [chain]
+            else:
+                chains = self.__k_shortest_search(target_index, k)
+            node_to_chains[node] = [
+                self.__to_chain(chain) for chain in chains]
+        return node_to_chains
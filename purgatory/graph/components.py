@@ -0,0 +1,83 @@
+"""Determine the strongly connected components (cycles) of a Graph."""
+
+
+def strongly_connected_components(nodes, within_nodes=False):
+    """Returns the strongly connected components of the given nodes.
+
+    A strongly connected component is either a single node that isn't part
+    of a cycle or all the nodes of a cycle.  The components are determined by
+    an iterative variant of Tarjan's algorithm in a single pass over the nodes
+    and their outgoing nodes.  Nodes that are marked as deleted are ignored.
+
+    Args:
+        nodes: Iterable of the nodes (purgatory.graph.Node) of a graph that
+            aren't marked as deleted.
+        within_nodes: Only follows the outgoing nodes that are part of the
+            given nodes.  Hence only the components of the subgraph of the
+            given nodes are determined.  nodes has to be a set in this case.
+
+    Returns:
+        List of frozensets of nodes in topological order.  Components that are
+        above (incoming) other components come first.  Hence the first
+        components are always leaf nodes or leaf cycles.
+    """
+    index = {}  # node:index
+    lowlink = {}  # node:lowest index reachable
+    stack = []
+    on_stack = set()
+    components = []
+    counter = 0
+
+    def children_of(node):
+        """Returns an iterator over the outgoing nodes to follow."""
+        if within_nodes:
+            return iter(node.outgoing_nodes & nodes)
+        return iter(node.outgoing_nodes)
+
+    for root in nodes:
+        if root in index:
+            continue  # Already part of a component.
+
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack |= set((root,))
+        work = [(root, children_of(root))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    # Descend into the child node first.
+                    index[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack |= set((child,))
+                    work.append((child, children_of(child)))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                # All children of the node have been visited.
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] != index[node]:
+                    continue  # Node isn't the root of a component.
+
+                # Node is the root of a component.  Pop the component from the
+                # stack.
+                component = []
+                while True:
+                    member = stack.pop()
+                    component.append(member)
+                    if member is node:
+                        break
+                component = frozenset(component)  # noqa  # pylint: disable=redefined-variable-type
+                on_stack -= component
+                components.append(component)
+
+    # Tarjan's algorithm emits a component only after all components below it
+    # have been emitted.  Reverse the list to get the topological order.
+    components.reverse()
+    return components
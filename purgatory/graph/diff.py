@@ -0,0 +1,72 @@
+"""Determine the differences between two Graphs."""
+
+
+import collections
+
+from . import components
+
+
+GraphDiff = collections.namedtuple(
+    "GraphDiff", ["added_nodes", "removed_nodes", "added_edges",
+                  "removed_edges", "added_leafs", "removed_leafs",
+                  "added_cycles", "removed_cycles"])
+GraphDiff.__doc__ = """Differences between an old and a new graph.
+
+Members of the graphs are matched by their interned ids (see Member) and
+hence by their uids.  Added members are members of the new graph and removed
+members are members of the old graph.  Leafs and cycles are frozensets of
+nodes (see Graph.leafs) and are only equal if all their nodes are equal.
+
+Attributes:
+    added_nodes: Frozenset of the nodes only in the new graph.
+    removed_nodes: Frozenset of the nodes only in the old graph.
+    added_edges: Frozenset of the edges only in the new graph.
+    removed_edges: Frozenset of the edges only in the old graph.
+    added_leafs: Frozenset of the leafs only in the new graph.
+    removed_leafs: Frozenset of the leafs only in the old graph.
+    added_cycles: Frozenset of the cycles only in the new graph.  A cycle
+        whose nodes changed is both a removed and an added cycle.
+    removed_cycles: Frozenset of the cycles only in the old graph.
+"""
+
+
+def _cycles(graph):
+    """Returns a frozenset of the cycles (frozensets of nodes) of a graph."""
+    return frozenset(
+        comp for comp in components.strongly_connected_components(
+            graph.live_nodes)
+        if len(comp) > 1)
+
+
+def graph_diff(old_graph, new_graph):
+    """Returns the differences between an old and a new graph.
+
+    The interned ids of the members are shared by all graphs of a process.
+    Hence members of different graphs are compared without looking at their
+    uids and the sets of both graphs are compared with plain set operations.
+    Nodes and edges that are marked as deleted are ignored.
+
+    Args:
+        old_graph: Purgatory graph (purgatory.graph.Graph).
+        new_graph: Purgatory graph (purgatory.graph.Graph).
+
+    Returns:
+        GraphDiff object.
+    """
+    old_nodes = old_graph.live_nodes
+    new_nodes = new_graph.live_nodes
+    old_edges = old_graph.live_edges
+    new_edges = new_graph.live_edges
+    old_leafs = old_graph.leafs
+    new_leafs = new_graph.leafs
+    old_cycles = _cycles(old_graph)
+    new_cycles = _cycles(new_graph)
+    return GraphDiff(
+        added_nodes=frozenset(new_nodes - old_nodes),
+        removed_nodes=frozenset(old_nodes - new_nodes),
+        added_edges=frozenset(new_edges - old_edges),
+        removed_edges=frozenset(old_edges - new_edges),
+        added_leafs=new_leafs - old_leafs,
+        removed_leafs=old_leafs - new_leafs,
+        added_cycles=new_cycles - old_cycles,
+        removed_cycles=old_cycles - new_cycles)
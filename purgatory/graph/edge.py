@@ -25,10 +25,15 @@ class Edge(member.Member):
         # Private
         self.__from_node = from_node
         self.__to_node = to_node
+        self.__uid = None  # Generated on first access by the uid property.
 
         # Init
-        uid = self._nodes_to_edge_uid(from_node, to_node)
-        super().__init__(uid)
+        # Edges are identified by the integer ids of their nodes and their
+        # kind instead of their uid string.  This saves formatting, hashing
+        # and storing an uid string per edge during the graph initialization.
+        key = (from_node._uid_intid, to_node._uid_intid,  # noqa  # pylint: disable=protected-access
+               self._edge_kind())
+        super().__init__(key)
 
         from_node._add_outgoing_edge(self)  # pylint: disable=protected-access
         try:
@@ -39,10 +44,41 @@ class Edge(member.Member):
             from_node._outgoing_edges.remove(self)  # noqa  # pylint: disable=protected-access
             raise
 
+    def _edge_kind(self):  # pylint: disable=no-self-use
+        """Returns the kind of this edge as part of the edge's key.
+
+        The kind tells apart edges between the same nodes.  It has to be a
+        small hashable value like an integer.  Defaults to 0.
+        """
+        return 0
+
     @abc.abstractmethod
     def _nodes_to_edge_uid(self, from_node, to_node):
         """Returns an uid for this directed edge based on the nodes."""
 
+    @property
+    def sort_key(self):
+        """Returns the key to sort the edge by uid.
+
+        The edges of a graph are ranked on first use as their uids are
+        generated lazily.
+        """
+        if self._sort_rank is None:
+            self.graph._init_edges_sort_ranks()  # noqa  # pylint: disable=protected-access
+        return self._sort_rank
+
+    @property
+    def uid(self):
+        """Returns the uid of the edge.
+
+        The uid is a human readable string that is only generated on first
+        access as edges are identified by their key.
+        """
+        if self.__uid is None:
+            self.__uid = self._nodes_to_edge_uid(
+                self.__from_node, self.__to_node)
+        return self.__uid
+
     @property
     def is_edge_instance(self):
         """Returns True if this object is an Edge instance.
@@ -90,6 +126,19 @@ class Edge(member.Member):
         probability = self.probability
         self._deleted = True
         graph._deleted_edges |= self_set
+        graph._alive_edges -= self_set
+        graph._alive_by_type[self.__class__] -= self_set
+        graph._deleted_by_type[self.__class__] |= self_set
+        if graph._leaf_tracker is not None:
+            graph._leaf_tracker.edge_deleted(self)
+
+        # Record the state of the caches that will be touched so that the
+        # changes can be undone by Graph.rollback().
+        in_touched = to_node._incoming_without_deleted_touched  # noqa  # pylint: disable=protected-access
+        in_nodes = to_node._incoming_nodes_without_deleted  # noqa  # pylint: disable=protected-access
+        in_node_removed = in_nodes is None or from_node in in_nodes
+        out_touched = None
+        out_node_removed = False
 
         # Update/invalidate incoming caches:
         # ----------------------------------
@@ -135,6 +184,10 @@ class Edge(member.Member):
         # updated/invalidated and all nodes and edges below it still have a
         # valid cache.
         if probability < 1.0:
+            out_touched = from_node._outgoing_without_deleted_touched  # noqa  # pylint: disable=protected-access
+            out_nodes = from_node._outgoing_nodes_without_deleted  # noqa  # pylint: disable=protected-access
+            out_node_removed = out_nodes is None or to_node in out_nodes
+
             # Update outgoing edges cache set of the from node.
             # Note: from_node._outgoing_edges_without_deleted is always
             # initialized because checking the probability initializes it.
@@ -162,6 +215,12 @@ class Edge(member.Member):
             graph_cl = graph._mark_deleted_outgoing_cache_level  # noqa  # pylint: disable=protected-access
             from_node._outgoing_nodes_recursive_invalidated_at_cl = graph_cl  # noqa  # pylint: disable=protected-access
 
+        # Append the undo data to the undo log of the graph.  This has to
+        # happen before the from-node will be marked deleted as the undo log is
+        # processed in reverse order.
+        graph._undo_log.append((self, (  # pylint: disable=protected-access
+            in_touched, in_node_removed, out_touched, out_node_removed)))
+
         # Check if the hierarchy is violated and mark the from-node as deleted
         # if necessary.
         if abs(probability - 1.0) < const.EPSILON:
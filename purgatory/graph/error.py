@@ -26,6 +26,23 @@ class EdgeWithZeroProbabilityError(GraphError):
         super().__init__(msg)
 
 
+class InvalidCheckpointError(GraphError):
+    """Raised if a graph can't be rolled back to the given checkpoint."""
+
+    def __init__(self, checkpoint):
+        msg = ("The checkpoint '%s' is no longer valid as the graph has been "
+               "reset or rolled back beyond it!") % (checkpoint,)
+        super().__init__(msg)
+
+
+class InvalidNamePatternError(GraphError):
+    """Raised if a name pattern isn't a valid regular expression."""
+
+    def __init__(self, pattern, reason):
+        msg = "The name pattern '%s' is invalid: %s" % (pattern, reason)
+        super().__init__(msg)
+
+
 class MemberAlreadyRegisteredError(GraphError):
     """Raised if a member has been already registered in the graph."""
 
@@ -86,3 +103,11 @@ class UnregisteredMemberInUseError(GraphError):
         msg = "Unregistered member '%s' with uid '%s' is in use!" % (
             member.__class__, member.uid)
         super().__init__(msg)
+
+
+class UnsupportedExportFormatError(GraphError):
+    """Raised if a graph should be exported in an unsupported format."""
+
+    def __init__(self, export_format):
+        msg = "The export format '%s' is not supported!" % (export_format)
+        super().__init__(msg)
@@ -2,11 +2,25 @@
 
 
 import abc
+import collections
+import operator
 import types
 
 from . import const
+from . import chains
+from . import components
+from . import diff
 from . import error
-from . import graphviz
+from . import impact
+from . import leaf_tracker
+from . import member_view
+
+from .. import timings as purgatory_timings
+
+
+Checkpoint = collections.namedtuple(
+    "Checkpoint",
+    ["undo_log_generation", "undo_log_position", "undo_log_epoch"])
 
 
 class Graph(abc.ABC):
@@ -16,31 +30,54 @@ class Graph(abc.ABC):
     base classes in this module.
     """
 
-    def __init__(self):
-        """Graph constructor."""
+    def __init__(self, timings=None):
+        """Graph constructor.
+
+        Args:
+            timings: Timings (purgatory.timings.Timings) to record the phases
+                of the initialization and of the algorithms in.  Defaults to
+                disabled timings.
+        """
         # Protected
-        self._nodes = {}  # uid:node
-        self._edges = {}  # uid:edge
+        self._nodes = {}  # key:node
+        self._edges = {}  # key:edge
         self._nodes_set = None
         self._edges_set = None
+        self._alive_nodes = None
+        self._alive_edges = None
+        self._alive_by_type = {}  # member type:set of members
+        self._deleted_by_type = {}  # member type:set of members
         self._deleted_nodes = set()
         self._deleted_edges = set()
         self._mark_deleted_incoming_cache_level = 0
         self._mark_deleted_outgoing_cache_level = 0
+        self._undo_log = []  # [(member, undo data), ...]
+        self._undo_log_generation = 0
+        self._undo_log_epochs = {}  # undo log position:epoch of checkpoints
+        self._undo_log_epoch_positions = []  # Keys of epochs in asc. order
+        self._undo_log_epoch = 0  # Last epoch handed out
+        self._leaf_tracker = None  # LeafTracker if enabled
+        self._timings = timings or purgatory_timings.Timings(enabled=False)
 
         # Init and check
         super().__init__()
         self._init_nodes_and_edges()
-        for edge in self._edges.values():
-            if abs(edge.probability - 0.0) < const.EPSILON:
-                raise error.EdgeWithZeroProbabilityError(edge)
+        with self._timings.phase("graph validation"):
+            for edge in self._edges.values():
+                if abs(edge.probability - 0.0) < const.EPSILON:
+                    raise error.EdgeWithZeroProbabilityError(edge)
 
         # Freeze
-        self._nodes = types.MappingProxyType(self._nodes)
-        self._edges = types.MappingProxyType(self._edges)
-        self._nodes_set = frozenset(self._nodes.values())
-        self._edges_set = frozenset(self._edges.values())
-        self.__freeze_nodes_incoming_and_outgoing_edges_and_nodes()
+        with self._timings.phase("graph freeze"):
+            self._nodes = types.MappingProxyType(self._nodes)
+            self._edges = types.MappingProxyType(self._edges)
+            self._nodes_set = frozenset(self._nodes.values())
+            self._edges_set = frozenset(self._edges.values())
+            self._alive_nodes = set(self._nodes_set)
+            self._alive_edges = set(self._edges_set)
+            self.__init_member_type_indexes()
+            self.__freeze_nodes_incoming_and_outgoing_edges_and_nodes()
+            self.__init_sort_ranks(self._nodes_set)
 
     @abc.abstractmethod
     def _init_nodes_and_edges(self):
@@ -52,23 +89,60 @@ class Graph(abc.ABC):
             node._freeze_incoming_edges_and_nodes()  # noqa  # pylint: disable=protected-access
             node._freeze_outgoing_edges_and_nodes()  # noqa  # pylint: disable=protected-access
 
+    def __init_member_type_indexes(self):
+        """Initializes the sets of the members per member type.
+
+        The sets are kept up to date while members are marked or unmarked as
+        deleted.  Hence the members of a type can be looked up without
+        filtering all members of the graph.
+        """
+        for members in (self._nodes_set, self._edges_set):
+            for member in members:
+                self._alive_by_type.setdefault(
+                    member.__class__, set()).add(member)
+        for member_type in self._alive_by_type:
+            self._deleted_by_type[member_type] = set()
+
+    @staticmethod
+    def __init_sort_ranks(members):
+        """Assigns the dense rank by uid to the members as sort key."""
+        ranked = sorted(members, key=operator.attrgetter("uid"))
+        for rank, member in enumerate(ranked):
+            member._sort_rank = rank  # noqa  # pylint: disable=protected-access
+
+    def _init_edges_sort_ranks(self):
+        """Initializes the sort keys of the edges (see Edge.sort_key)."""
+        self.__init_sort_ranks(self._edges_set)
+
     def _add_edge(self, edge):
         """Adds an edge to the self._edges dict."""
         if not edge.is_edge_instance:
             raise error.NotAnEdgeError(edge)
-        if edge.uid in self._edges:
+        if edge.key in self._edges:
             raise error.MemberAlreadyRegisteredError(edge)
         edge.graph = self
-        self._edges[edge.uid] = edge
+        self._edges[edge.key] = edge
+
+    def _add_edges_bulk(self, edges):
+        """Adds edges to the self._edges dict without checking them.
+
+        This is the bulk variant of _add_edge for graphs that construct their
+        edges from already deduplicated input.  The caller guarantees that
+        all edges are unregistered Edge instances with unique keys.
+        """
+        edges_dict = self._edges
+        for edge in edges:
+            edge._graph = self  # noqa  # pylint: disable=protected-access
+            edges_dict[edge._uid] = edge  # noqa  # pylint: disable=protected-access
 
     def _add_node(self, node):
         """Adds a node to the self._nodes dict."""
         if not node.is_node_instance:
             raise error.NotANodeError(node)
-        if node.uid in self._nodes:
+        if node.key in self._nodes:
             raise error.MemberAlreadyRegisteredError(node)
         node.graph = self
-        self._nodes[node.uid] = node
+        self._nodes[node.key] = node
 
     def _add_node_dedup(self, node):
         """Add the given node to the self._nodes dict if it isn't tracked yet.
@@ -81,13 +155,69 @@ class Graph(abc.ABC):
           Tupel of the node in the self._nodes dict and a boolean if the
           given node was a duplicate.
         """
-        dict_node = self._nodes.get(node.uid)
+        dict_node = self._nodes.get(node.key)
         if dict_node:
             return (dict_node, True)  # Deduplicate
         else:
             self._add_node(node)
             return (node, False)  # Not a duplicate
 
+    def _add_nodes_bulk(self, nodes):
+        """Adds nodes to the self._nodes dict without checking them.
+
+        This is the bulk variant of _add_node for graphs that construct their
+        nodes from already deduplicated input.  The caller guarantees that
+        all nodes are unregistered Node instances with unique keys.
+        """
+        nodes_dict = self._nodes
+        for node in nodes:
+            node._graph = self  # noqa  # pylint: disable=protected-access
+            nodes_dict[node._uid] = node  # noqa  # pylint: disable=protected-access
+
+    @property
+    def chain_index(self):
+        """Returns the index of the shortest chains from the leafs to nodes.
+
+        The chains explain why a node is part of the graph.  The returned
+        ChainIndex is a snapshot of the graph: Nodes and edges that are marked
+        as deleted are ignored and later changes aren't reflected.
+
+        Returns:
+            ChainIndex object.
+        """
+        return chains.ChainIndex(self)
+
+    def checkpoint(self):
+        """Returns a checkpoint of the current deleted state of the graph.
+
+        Every member that is marked as deleted after the checkpoint has been
+        taken can be unmarked again with the rollback method.  Checkpoints can
+        be nested.  A checkpoint becomes invalid once the graph has been rolled
+        back beyond it or once unmark_deleted has been called.
+
+        Returns:
+            Checkpoint object.
+        """
+        # All checkpoints at the same undo log position share an epoch.  A
+        # rollback drops the epochs of the positions beyond it and hence
+        # the checkpoints taken there become invalid even once the undo log
+        # has grown past these positions again.
+        position = len(self._undo_log)
+        epoch = self._undo_log_epochs.get(position)
+        if epoch is None:
+            self._undo_log_epoch += 1
+            epoch = self._undo_log_epoch
+            self._undo_log_epochs[position] = epoch
+            self._undo_log_epoch_positions.append(position)
+        return Checkpoint(self._undo_log_generation, position, epoch)
+
+    def __check_checkpoint(self, checkpoint):
+        """Raises InvalidCheckpointError if the checkpoint isn't valid."""
+        if (checkpoint.undo_log_generation != self._undo_log_generation or
+                self._undo_log_epochs.get(checkpoint.undo_log_position) !=
+                checkpoint.undo_log_epoch):
+            raise error.InvalidCheckpointError(checkpoint)
+
     @property
     def deleted_edges(self):
         """Returns a set of the edges in the graph marked as deleted."""
@@ -98,16 +228,89 @@ class Graph(abc.ABC):
         """Returns a set of the nodes in the graph marked as deleted."""
         return frozenset(self._deleted_nodes)
 
+    def deleted_nodes_since(self, checkpoint):
+        """Returns a set of the nodes marked as deleted since the checkpoint.
+
+        The undo log is also the journal of the members marked as deleted and
+        the checkpoint is the cursor to read the journal from.  Hence the cost
+        is proportional to the number of members marked as deleted since the
+        checkpoint has been taken and not to the number of all members marked
+        as deleted.
+
+        Args:
+            checkpoint: Checkpoint object returned by the checkpoint method.
+        """
+        self.__check_checkpoint(checkpoint)
+        undo_log = self._undo_log
+        position = checkpoint.undo_log_position
+        return {member for member, undo_data in undo_log[position:]
+                if undo_data is None}
+
+    def diff(self, other):
+        """Returns the differences between this graph and the other graph.
+
+        This graph is the old graph and the other graph the new graph.  The
+        graphs can be of different types but their members are matched by
+        uid.  Nodes and edges that are marked as deleted are ignored.
+
+        Args:
+            other: Purgatory graph (purgatory.graph.Graph).
+
+        Returns:
+            GraphDiff object.
+        """
+        return diff.graph_diff(self, other)
+
+    def disable_leaf_tracker(self):
+        """Disables the incremental tracking of the leafs.
+
+        See the enable_leaf_tracker method.
+        """
+        self._leaf_tracker = None
+
     @property
     def edges(self):
         """Returns a set of the edges in the graph.
 
         This set doesn't include the edges that have been marked as deleted.
+        See the live_edges property for a view without copying the edges.
 
         Returns:
             Set of edges in the graph.
         """
-        return self._edges_set - self._deleted_edges
+        return set(self._alive_edges)
+
+    def enable_leaf_tracker(self):
+        """Enables the incremental tracking of the leafs.
+
+        Once enabled the leaf nodes and leaf cycles are kept up to date while
+        members are marked or unmarked as deleted (see LeafTracker) and the
+        leafs property only reads them instead of determining them from
+        scratch.  This pays off if the leafs are read after every round of
+        marking members as deleted, e.g. to peel the graph layer by layer.
+        Tracking the leafs slightly slows down marking members as deleted.
+        """
+        if self._leaf_tracker is None:
+            self._leaf_tracker = leaf_tracker.LeafTracker(self)
+
+    def export(self, output, export_format="json", batch_size=None):
+        """Exports the nodes and edges of the graph with their attributes.
+
+        See purgatory.graph.interchange.export_graph for the formats and the
+        attributes.  All graph members are exported, including the ones marked
+        as deleted.  These are marked as deleted again after the export but
+        all checkpoints are invalidated.
+
+        Args:
+            output: Path of the output file or directory.  A text file object
+                for the 'graphml' and 'json' formats.
+            export_format: 'arrow', 'graphml', 'json' or 'parquet'.
+                Defaults to 'json'.
+            batch_size: Number of rows per record batch or row group of the
+                'arrow' and 'parquet' formats.
+        """
+        from . import interchange
+        interchange.export_graph(self, output, export_format, batch_size)
 
     @property
     def graphviz_graph(self):
@@ -119,8 +322,57 @@ class Graph(abc.ABC):
         Returns:
             GraphViz graph (pygraphviz.AGraph).
         """
+        from . import graphviz
         return graphviz.graph_to_agraph(self)
 
+    @property
+    def layers(self):
+        """Returns the layers of the graph.
+
+        The first layer contains the leaf nodes and the nodes of the leaf
+        cycles.  Every further layer contains the leafs that are left once the
+        previous layers have been marked as deleted.  Hence every node is in
+        exactly one layer and the nodes of a cycle are in the same layer.
+
+        The layers are determined in a single pass over the condensed graph
+        (each cycle is a single component) in topological order without
+        marking any node as deleted.  The layer of a component is one below
+        the lowest layer of the components above it.  Hence nodes that can't
+        be marked as deleted (see Node.can_be_marked_deleted) are layered as
+        well.
+
+        This property will reset all graph members marked as deleted as the
+        layers are determined for the full graph.
+
+        Returns:
+            List of the layers.  Every layer is a list of nodes sorted by
+            their sort key.
+        """
+        self.unmark_deleted()
+
+        # The components are in topological order and hence the layers of all
+        # components above a component are known once it is processed.
+        node_to_layer_index = {}
+        layers = []
+        for comp in components.strongly_connected_components(
+                self._alive_nodes):
+            layer_index = 0
+            for node in comp:
+                for incoming_node in node.incoming_nodes:
+                    if incoming_node not in comp:
+                        layer_index = max(
+                            layer_index,
+                            node_to_layer_index[incoming_node] + 1)
+            for node in comp:
+                node_to_layer_index[node] = layer_index
+            if layer_index == len(layers):
+                layers.append([])
+            layers[layer_index].extend(comp)
+
+        for layer in layers:
+            layer.sort(key=operator.attrgetter("sort_key"))
+        return layers
+
     @property
     def leafs(self):
         """Returns the leaf nodes of the graph.
@@ -132,7 +384,13 @@ class Graph(abc.ABC):
         The return value is a set of set of nodes.  The inner sets contain a
         single node for leaf nodes or multiple nodes in case of a leaf cycle.
         The outer set contains all inner sets.
+
+        If the leaf tracker is enabled (see the enable_leaf_tracker method) the
+        leafs are read from it.
         """
+        if self._leaf_tracker is not None:
+            return self._leaf_tracker.leafs
+
         stage1_nodes_to_visit = set(self._nodes.values())
         stage2_nodes_to_visit = set()
         stage3_nodes_to_visit = set()
@@ -229,28 +487,54 @@ class Graph(abc.ABC):
         it is obsolete as these have been marked as deleted - hence n4 is
         marked as deleted as well.  n5 isn't marked as deleted as it is still
         needed as foundation for n3.
+
+        Returns:
+            List of sets of the nodes marked as deleted per round.  The first
+            round contains the nodes marked as deleted by marking the given
+            members as deleted.  Every further round contains the nodes that
+            have been obsoleted by the previous round.
+        """
+        return list(self.iter_mark_members_including_obsolete_deleted(members))
+
+    def iter_mark_members_including_obsolete_deleted(self, members):
+        """Marks the given graph members and obsoleted members as deleted.
+
+        This method behaves the same as the mark_members_including_obsolete_
+        deleted method with the only difference that it returns an iterator
+        that marks the nodes of a round as deleted and then yields the set of
+        nodes that have been marked as deleted in this round.  This allows to
+        process the results of a round while the next rounds haven't been
+        determined yet.  The graph must not be altered while iterating and
+        only the rounds that have been iterated over are marked as deleted.
+
+        Returns:
+            Iterator over the sets of the nodes marked as deleted per round.
         """
         # Ensure that all members are part of this graph.
         for m in members:
             if m.graph != self:
                 raise error.NotMemberOfGraphError(m)
-
-        to_process = set(members)
-        all_deleted = None  # All nodes marked as deleted.
-        prev_deleted = self.deleted_nodes  # Previously marked as deleted.
+        return self.__mark_members_including_obsolete_deleted_rounds(
+            set(members))
+
+    def __mark_members_including_obsolete_deleted_rounds(self, to_process):
+        """Generator for iter_mark_members_including_obsolete_deleted."""
+        # All nodes marked as deleted.  The set of the graph is used without
+        # copying it as the graph must not be altered while iterating.
+        all_deleted = self._deleted_nodes
         while to_process:
             # Mark all the members to process as deleted.  This doesn't use
             # Graph.mark_members_deleted as it would needlessly check if the
             # members are members of this Graph.
+            checkpoint = self.checkpoint()
             for m in to_process:
                 m.mark_deleted()
 
             # Determine the nodes that have been marked as deleted in this
-            # round.  The number of nodes marked as deleted can differ from the
-            # number of nodes in the to_process set.
-            all_deleted = self.deleted_nodes
-            round_deleted = all_deleted - prev_deleted
-            prev_deleted = all_deleted
+            # round from the undo log.  The number of nodes marked as deleted
+            # can differ from the number of nodes in the to_process set.
+            round_deleted = self.deleted_nodes_since(checkpoint)
+            yield round_deleted
 
             # Determine all outgoing nodes that are below the nodes that have
             # been marked as deleted.  The read only set node._outgoing_nodes
@@ -299,14 +583,201 @@ class Graph(abc.ABC):
         """Returns a set of the nodes in the graph.
 
         This set doesn't include the nodes that have been marked as deleted.
+        See the live_nodes property for a view without copying the nodes.
 
         Returns:
             Set of edges in the graph.
         """
-        return self._nodes_set - self._deleted_nodes
+        return set(self._alive_nodes)
+
+    def live_members_of_type(self, member_type):
+        """Returns a live view (MemberView) of the members of a type.
+
+        The view only contains the members that are exactly of the given type
+        (not of a subclass) and that aren't marked as deleted.  Its len() is
+        the current count of these members.
+
+        Args:
+            member_type: The class of the members, e.g. a Node subclass.
+        """
+        return member_view.MemberView(
+            self._alive_by_type.get(member_type, frozenset()))
+
+    def live_deleted_members_of_type(self, member_type):
+        """Returns a live view (MemberView) of the deleted members of a type.
+
+        Same as the live_members_of_type method but for the members that are
+        marked as deleted.
+        """
+        return member_view.MemberView(
+            self._deleted_by_type.get(member_type, frozenset()))
+
+    @property
+    def member_type_counts(self):
+        """Returns a dict of member type to the count of members of the type.
+
+        The counts are tuples of the count of the members that aren't marked
+        as deleted and the count of the members that are marked as deleted.
+        """
+        return {member_type: (len(alive), len(
+            self._deleted_by_type[member_type]))
+                for member_type, alive in self._alive_by_type.items()}
+
+    @property
+    def leaf_tracker_enabled(self):
+        """Returns True if the leaf tracker is enabled."""
+        return self._leaf_tracker is not None
+
+    @property
+    def live_deleted_edges(self):
+        """Returns a live view (MemberView) of the edges marked as deleted."""
+        return member_view.MemberView(self._deleted_edges)
+
+    @property
+    def live_deleted_nodes(self):
+        """Returns a live view (MemberView) of the nodes marked as deleted."""
+        return member_view.MemberView(self._deleted_nodes)
+
+    @property
+    def live_edges(self):
+        """Returns a live view (MemberView) of the edges in the graph.
+
+        Same as the edges property but without copying the edges.  The view
+        doesn't include the edges marked as deleted and reflects all later
+        changes of the graph.
+        """
+        return member_view.MemberView(self._alive_edges)
+
+    @property
+    def live_nodes(self):
+        """Returns a live view (MemberView) of the nodes in the graph.
+
+        Same as the nodes property but without copying the nodes.  The view
+        doesn't include the nodes marked as deleted and reflects all later
+        changes of the graph.
+        """
+        return member_view.MemberView(self._alive_nodes)
+
+    @property
+    def purge_impact(self):
+        """Returns the expected impact of purging each node of the graph.
+
+        The impact of a node is the expected number of nodes that would be
+        marked as deleted if the node would be marked as deleted.  Only nodes
+        that are counted in the purge impact are considered.  Alternatives
+        (edges of type OrEdge) reduce the impact according to their
+        probability.  The impacts of all nodes are determined in a single pass
+        over the graph and hence this is a lot cheaper than simulating the
+        removal of each node.
+
+        Nodes and edges that are marked as deleted are ignored.
+
+        Returns:
+            Dict of node to impact (float).
+        """
+        return impact.graph_to_purge_impact(self)
+
+    def rollback(self, checkpoint):
+        """Unmarks all graph members marked as deleted since the checkpoint.
+
+        Contrary to unmark_deleted this method only undoes the changes that
+        have been recorded in the undo log since the checkpoint has been taken.
+        Hence the cost of a rollback is proportional to the number of members
+        marked as deleted since the checkpoint and not to the number of all
+        members marked as deleted.
+
+        Args:
+            checkpoint: Checkpoint object returned by the checkpoint method.
+        """
+        self.__check_checkpoint(checkpoint)
+        undo_log = self._undo_log
+        position = checkpoint.undo_log_position
+
+        # Invalidate the checkpoints beyond the checkpoint.
+        epochs = self._undo_log_epochs
+        epoch_positions = self._undo_log_epoch_positions
+        while epoch_positions and epoch_positions[-1] > position:
+            del epochs[epoch_positions.pop()]
+
+        if position == len(undo_log):
+            return  # Nothing to do.
+
+        # Signal the incoming and outgoing nodes recursive properties that
+        # the cached result might be invalid and needs to be rechecked.
+        self._mark_deleted_incoming_cache_level += 1
+        graph_in_cl = self._mark_deleted_incoming_cache_level
+        self._mark_deleted_outgoing_cache_level += 1
+        graph_out_cl = self._mark_deleted_outgoing_cache_level
+
+        # Undo the changes in reverse order.  This ensures that the nodes of
+        # an edge are unmarked as deleted before the edge itself.
+        tracker = self._leaf_tracker
+        while len(undo_log) > position:
+            member, undo_data = undo_log.pop()
+            member._deleted = False  # pylint: disable=protected-access
+            member_set = set((member,))
+            self._alive_by_type[member.__class__] |= member_set
+            self._deleted_by_type[member.__class__] -= member_set
+            if undo_data is None:
+                # Node
+                self._deleted_nodes -= member_set
+                self._alive_nodes |= member_set
+                if tracker is not None:
+                    tracker.node_undeleted(member)
+                continue
+
+            # Edge
+            self._deleted_edges -= member_set
+            self._alive_edges |= member_set
+            if tracker is not None:
+                tracker.edge_undeleted(member)
+            in_touched, in_node_removed, out_touched, out_node_removed = (
+                undo_data)
+            from_node = member.from_node
+            to_node = member.to_node
+
+            # Restore the incoming edges and nodes of the destination node and
+            # mark the incoming nodes recursive cache as potentially invalid.
+            to_node._incoming_edges_without_deleted |= member_set  # noqa  # pylint: disable=protected-access
+            if in_node_removed:
+                to_node._incoming_nodes_without_deleted |= set((from_node,))  # noqa  # pylint: disable=protected-access
+            to_node._incoming_without_deleted_touched = in_touched  # noqa  # pylint: disable=protected-access
+            to_node._incoming_nodes_recursive_invalidated_at_cl = graph_in_cl  # noqa  # pylint: disable=protected-access,line-too-long
+
+            # Restore the outgoing edges and nodes of the source node if they
+            # have been touched by Edge.mark_deleted and mark the outgoing
+            # nodes recursive cache as potentially invalid.
+            if out_touched is None:
+                continue
+            from_node._outgoing_edges_without_deleted |= member_set  # noqa  # pylint: disable=protected-access
+            if out_node_removed:
+                from_node._outgoing_nodes_without_deleted |= set((to_node,))  # noqa  # pylint: disable=protected-access
+            from_node._outgoing_without_deleted_touched = out_touched  # noqa  # pylint: disable=protected-access
+            from_node._outgoing_nodes_recursive_invalidated_at_cl = graph_out_cl  # noqa  # pylint: disable=protected-access,line-too-long
+
+    @property
+    def timings(self):
+        """Returns the Timings (purgatory.timings.Timings) of the graph.
+
+        The timings are disabled unless they have been given to the graph's
+        constructor.
+        """
+        return self._timings
 
     def unmark_deleted(self):
-        """Unmarks all graph members as deleted."""
+        """Unmarks all graph members as deleted.
+
+        This also invalidates all checkpoints.  See the rollback method for a
+        cheaper way to only undo recent changes.
+        """
+        # Reset the undo log as there is nothing left to undo.
+        self._undo_log = []
+        self._undo_log_generation += 1
+        self._undo_log_epochs = {}
+        self._undo_log_epoch_positions = []
+        if self._leaf_tracker is not None:
+            self._leaf_tracker.invalidate()
+
         # Signal the incoming and outgoing nodes recursive properties that
         # the cached result might be invalid and needs to be rechecked.
         self._mark_deleted_incoming_cache_level += 1
@@ -315,9 +786,11 @@ class Graph(abc.ABC):
         graph_out_cl = self._mark_deleted_outgoing_cache_level
 
         # Unmark the as deleted marked nodes and reset the deleted nodes set.
+        # The sets are changed in place as they are wrapped by live views.
         for node in self._deleted_nodes:
             node._deleted = False  # pylint: disable=protected-access
-        self._deleted_nodes = set()
+        self._alive_nodes |= self._deleted_nodes
+        self._deleted_nodes.clear()
 
         # Unmark the as deleted marked edges and reset the deleted edges set.
         for edge in self._deleted_edges:
@@ -346,4 +819,10 @@ class Graph(abc.ABC):
                 from_node._outgoing_edges_without_deleted = None  # noqa  # pylint: disable=protected-access
                 from_node._outgoing_nodes_without_deleted = None  # noqa  # pylint: disable=protected-access
                 from_node._outgoing_nodes_recursive_invalidated_at_cl = graph_out_cl  # noqa  # pylint: disable=protected-access,line-too-long
-        self._deleted_edges = set()
+        self._alive_edges |= self._deleted_edges
+        self._deleted_edges.clear()
+
+        # Reset the sets of the members per type.
+        for member_type, deleted in self._deleted_by_type.items():
+            self._alive_by_type[member_type] |= deleted
+            deleted.clear()
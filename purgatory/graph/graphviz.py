@@ -1,6 +1,13 @@
 """Generate a GraphViz graph (pygraphviz.AGraph) from Purgatory's graph."""
 
 
+import operator
+
+
+# Sorts graph members by uid with the precomputed integer keys.
+_SORT_KEY = operator.attrgetter("sort_key")
+
+
 def _edged_to_weight(node_to_layer, from_node, to_node):
     """Returns the edge weight depending on the layer distance."""
     from_layer = node_to_layer[from_node]
@@ -38,33 +45,28 @@ def graph_to_agraph(graph):
             "No module named 'pygraphviz'. To install 'pygraphviz' run "
             "'sudo apt install python3-pygraphviz'.")
 
-    # Use the full graph. Laying out partial graphs is currently not supported.
-    graph.unmark_deleted()
-
-    # Identify the layers of the graph and then reset the graph again.
-    # Note: This also build an index of nodes to the respective layer.
-    # TODO(MS): Move the disection into layers to a separate method of the
-    # graph object.
-    layers = []
-    layer_index = 0
+    # Identify the layers of the graph and build an index of the nodes to the
+    # respective layer.  This resets the graph and hence the full graph is
+    # used.  Laying out partial graphs is currently not supported.
+    timings = graph.timings
+    with timings.phase("graph layering"):
+        layers = graph.layers
     node_to_layer = {}
-    while graph.nodes:
-        layer = list(graph.leafs_flat)
-        layer.sort()
-        if layer:
-            layers.append(layer)
+    for layer_index, layer in enumerate(layers):
         for node in layer:
-            node.mark_deleted()
             node_to_layer[node] = layer_index
-        layer_index += 1
 
-    # Reset the graph for the clustering of the graph.
-    graph.unmark_deleted()
+    # The leafs are read after every round of marking nodes as deleted below.
+    # Track them incrementally instead of determining them from scratch.
+    leaf_tracker_enabled = graph.leaf_tracker_enabled
+    graph.enable_leaf_tracker()
 
     # Cluster the graph by taking the leafs, simulating the removal for each
     # leaf and then ignoring all the nodes that would have been removed for the
     # next round. This way cluster layer by cluster layer will be ignored until
-    # the whole graph has been clustered.
+    # the whole graph has been clustered.  Leafs with nodes that can't be
+    # marked as deleted (e.g. a KeepNode) are clustered last with all the
+    # nodes below them that are left.
     # TODO(MS): Move the disection into clusters to a separate method of the
     # graph object.
     clusters = []  # [(index, nodes, leaf_nodes, leaf_cluster), ...]
@@ -72,58 +74,83 @@ def graph_to_agraph(graph):
     ignore = frozenset()  # Nodes that will be ignored in the current round.
     ignore_next_round = set()  # Nodes that will be ignored in the next round.
     node_to_cluster_index = {}
-    while graph.nodes:
-        # Step #1 - Get leafs of the current graph (graph - ignore).
-        leafs = list(graph.leafs)
-        for index in range(len(leafs)):  # noqa  # pylint: disable=consider-using-enumerate
-            leafs[index] = list(leafs[index])  # Set to list conversion.
-            leafs[index].sort()
-        leafs.sort()
-
-        # Step #2 - Simulate the removal for each leaf. The graph will be reset
-        # to the current graph (graph - ignore) after each simulated removal.
-        # All the nodes identified during the simulated removal for a leaf form
-        # a cluster.
-        # Note #1: All nodes identified during the simulated removal will be
-        # ignored in the next round.
-        # Note #2: This also builds an index of the nodes to the respective
-        # cluster they are in.
-        for leaf_nodes in leafs:
-            before_deleted = graph.deleted_nodes
-            # TODO(MS): Add proper exceptions.
-            if set(leaf_nodes) & before_deleted:  # pragma: no cover
-                raise RuntimeError("Leaf node already marked deleted!")
-            if set(leaf_nodes) & ignore_next_round:  # pragma: no cover
-                raise RuntimeError(
-                    "Leaf node already identified for next round!")
-            graph.mark_members_including_obsolete_deleted(leaf_nodes)
-            after_deleted = graph.deleted_nodes
-            cluster_nodes = after_deleted - before_deleted
-            ignore_next_round |= cluster_nodes
-
-            cluster_nodes = list(cluster_nodes)
-            cluster_nodes.sort()
-            leaf_nodes = list(leaf_nodes)
-            leaf_nodes.sort()
-            clusters.append(
-                (cluster_index, cluster_nodes, leaf_nodes))
+    undeletable_leafs = []
+    with timings.phase("graph clustering"):
+        while graph.live_nodes:
+            # Step #1 - Get leafs of the current graph (graph - ignore).
+            leafs = list(graph.leafs)
+            for index in range(len(leafs)):  # noqa  # pylint: disable=consider-using-enumerate
+                leafs[index] = list(leafs[index])  # Set to list conversion.
+                leafs[index].sort(key=_SORT_KEY)
+            leafs.sort(key=lambda leaf: [node.sort_key for node in leaf])
+            undeletable_leafs = [
+                leaf for leaf in leafs
+                if not all(node.can_be_marked_deleted for node in leaf)]
+            leafs = [leaf for leaf in leafs if leaf not in undeletable_leafs]
+            if not leafs:
+                break  # Only leafs that can't be marked as deleted are left.
+
+            # Step #2 - Simulate the removal for each leaf. The graph will be
+            # rolled back to the current graph (graph - ignore) after each
+            # simulated removal.
+            # All the nodes identified during the simulated removal for a leaf
+            # form a cluster.
+            # Note #1: All nodes identified during the simulated removal will
+            # be ignored in the next round.
+            # Note #2: This also builds an index of the nodes to the
+            # respective cluster they are in.
+            for leaf_nodes in leafs:
+                checkpoint = graph.checkpoint()
+                # TODO(MS): Add proper exceptions.
+                if set(leaf_nodes) & graph.live_deleted_nodes:  # noqa  # pragma: no cover
+                    raise RuntimeError("Leaf node already marked deleted!")
+                if set(leaf_nodes) & ignore_next_round:  # pragma: no cover
+                    raise RuntimeError(
+                        "Leaf node already identified for next round!")
+                graph.mark_members_including_obsolete_deleted(leaf_nodes)
+                cluster_nodes = graph.deleted_nodes_since(checkpoint)
+                ignore_next_round |= cluster_nodes
+
+                cluster_nodes = list(cluster_nodes)
+                cluster_nodes.sort(key=_SORT_KEY)
+                leaf_nodes = list(leaf_nodes)
+                leaf_nodes.sort(key=_SORT_KEY)
+                clusters.append(
+                    (cluster_index, cluster_nodes, leaf_nodes))
+                for node in cluster_nodes:
+                    node_to_cluster_index[node] = cluster_index
+                cluster_index += 1
+
+                # Roll back the graph for the next leaf / cluster (not the
+                # next round).
+                graph.rollback(checkpoint)
+
+            # Prepare the graph for the next round (not the next leaf /
+            # cluster) by marking the nodes of the clusters of this round as
+            # deleted.
+            # Note #1: Only the clusters identified during the first round
+            # are leaf clusters.
+            graph.mark_members_deleted(ignore_next_round - ignore)
+            ignore = frozenset(ignore_next_round)  # Copy
+
+        # Step #3 - Cluster the leafs that can't be marked as deleted with the
+        # nodes below them that are left.
+        for leaf_nodes in undeletable_leafs:
+            cluster_nodes = set(leaf_nodes)
+            for node in leaf_nodes:
+                cluster_nodes |= node.outgoing_nodes_recursive
+            cluster_nodes = [node for node in cluster_nodes
+                             if node not in node_to_cluster_index]
+            cluster_nodes.sort(key=_SORT_KEY)
+            clusters.append((cluster_index, cluster_nodes, leaf_nodes))
             for node in cluster_nodes:
                 node_to_cluster_index[node] = cluster_index
             cluster_index += 1
 
-            # Reset graph for the next leaf / cluster (not the next round).
-            graph.unmark_deleted()
-            graph.mark_members_deleted(ignore)
-
-        # Reset graph for the next round (not the next leaf / cluster).
-        # Note #1: Only the clusters identified during the first round are
-        # leaf clusters.
-        ignore = frozenset(ignore_next_round)  # Copy
-        graph.unmark_deleted()
-        graph.mark_members_deleted(ignore)
-
     # Reset the graph for the actual AGraph generation.
     graph.unmark_deleted()
+    if not leaf_tracker_enabled:
+        graph.disable_leaf_tracker()
 
     # Build the GraphViz AGraph.
     # TODO(MS): Re-evaluate options if they are really needed.
@@ -137,7 +164,7 @@ def graph_to_agraph(graph):
     # make sure that the layers are in the correct order. Each layer has rank
     # same to ensure that all nodes in a subgraph are on the same level.
     layer_subgraphs = []
-    for i in range(layer_index):
+    for i in range(len(layers)):
         layer_subgraph = agraph.add_subgraph(
             name="layer-%d" % i, rank="same", ordering="out")
         layer_subgraphs.append(layer_subgraph)
@@ -236,12 +263,12 @@ def graph_to_agraph(graph):
     # edges will be folded together as much as possible with the help of helper
     # nodes in order to avoid a graph cluttered with inter-cluster edges.
     nodes = list(graph.nodes)
-    nodes.sort()
+    nodes.sort(key=_SORT_KEY)
     for node in nodes:
         edges = list(node.incoming_edges)
         if len(edges) == 0:
             continue
-        edges.sort()
+        edges.sort(key=_SORT_KEY)
         remaining_edges = []
 
         # Step #3.1 - Handle intra-cluster edges.
@@ -0,0 +1,151 @@
+"""Determine the expected impact of purging the nodes of a Graph."""
+
+
+from . import components
+from . import const
+
+
+def graph_to_purge_impact(graph):
+    """Returns the expected impact of purging each node of the given graph.
+
+    The impact of a node is the expected number of nodes that would need to be
+    marked as deleted if the node would be marked as deleted.  Only nodes that
+    are counted in the purge impact (see Node.counted_in_purge_impact) are
+    considered.
+
+    The impacts are determined in a single pass over the condensed graph (each
+    cycle is a single component) in topological order.  For each component the
+    set of nodes above it that will certainly be marked as deleted is tracked
+    as a bitset.  These are the nodes that are connected to the component via
+    edges with the probability 1.0.  Edges with a lower probability are
+    edges of type OrEdge with alternatives.  The nodes above such an edge are
+    only counted with the probability of the edge as they would only be marked
+    as deleted if all the alternatives would be marked as deleted as well.
+    Hence alternatives reduce the impact.  If all the alternatives of a node
+    are certainly deleted along with a component then the node and
+    everything above it is certainly deleted as well.  For this the nodes
+    with alternatives that are reachable from the certainly deleted nodes of
+    a component are tracked as well.  Using bitsets ensures that nodes that
+    are reachable via several paths are only counted once.
+
+    Nodes and edges that are marked as deleted are ignored.
+
+    Args:
+        graph: Purgatory graph (purgatory.graph.Graph).
+
+    Returns:
+        Dict of node to impact (float).  All nodes of a cycle have the same
+        impact.
+    """
+    comps = components.strongly_connected_components(graph.nodes)
+
+    node_to_comp_index = {}
+    for comp_index, comp in enumerate(comps):
+        for node in comp:
+            node_to_comp_index[node] = comp_index
+
+    # Every node gets a bit so that it can be checked whether all the
+    # alternatives of a node are certainly deleted.  Only the bits of the
+    # nodes that are counted in the purge impact are counted.
+    node_to_bit = {}
+    counted = 0
+    bit = 1
+    for comp in comps:
+        for node in comp:
+            node_to_bit[node] = bit
+            if node.counted_in_purge_impact:
+                counted |= bit
+            bit <<= 1
+
+    # The components are in topological order and hence all components above
+    # a component have been processed once the component is processed.
+    certain = []  # comp_index:bitset of the nodes that are certainly deleted
+    uncertain = []  # comp_index:{bitset of nodes deleted together:probability}
+    pending = []  # comp_index:set of the from-nodes of unresolved alternatives
+    comp_impacts = []
+    for comp_index, comp in enumerate(comps):
+        comp_certain = 0
+        comp_uncertain = {}
+        comp_pending = set()
+        uncertain_edges = []
+        for node in comp:
+            comp_certain |= node_to_bit[node]
+            for edge in node.incoming_edges:
+                from_comp_index = node_to_comp_index[edge.from_node]
+                if from_comp_index == comp_index:
+                    continue  # Edge within the cycle.
+                probability = edge.probability
+                if abs(probability - 1.0) < const.EPSILON:
+                    comp_certain |= certain[from_comp_index]
+                    _merge_uncertain(
+                        comp_uncertain, uncertain[from_comp_index], 1.0)
+                    comp_pending |= pending[from_comp_index]
+                else:
+                    uncertain_edges.append((probability, from_comp_index))
+                    comp_pending.add(edge.from_node)
+
+        # Nodes of which all the alternatives are certainly deleted are
+        # certainly deleted as well.  Promoting them can resolve the
+        # alternatives of further nodes and hence this is repeated until
+        # nothing changes anymore.
+        promoted = True
+        while promoted:
+            promoted = False
+            for from_node in list(comp_pending):
+                if node_to_bit[from_node] & comp_certain:
+                    comp_pending.discard(from_node)
+                    continue  # Certainly deleted already.
+                if all(node_to_bit[edge.to_node] & comp_certain
+                       for edge in from_node.outgoing_edges):
+                    from_comp_index = node_to_comp_index[from_node]
+                    comp_certain |= certain[from_comp_index]
+                    _merge_uncertain(
+                        comp_uncertain, uncertain[from_comp_index], 1.0)
+                    comp_pending |= pending[from_comp_index]
+                    comp_pending.discard(from_node)
+                    promoted = True
+
+        # The nodes above edges with alternatives are only deleted with the
+        # probability of the edge.  The same goes for everything that is
+        # uncertain above these nodes.
+        for probability, from_comp_index in uncertain_edges:
+            _merge_uncertain(
+                comp_uncertain, {certain[from_comp_index]: 1.0}, probability)
+            _merge_uncertain(
+                comp_uncertain, uncertain[from_comp_index], probability)
+
+        # Only the nodes that aren't certainly deleted anyway count towards
+        # the expected number of uncertainly deleted nodes.
+        comp_impact = float(_bit_count(comp_certain & counted))
+        for bitset, probability in list(comp_uncertain.items()):
+            bitset_only = bitset & ~comp_certain
+            if bitset_only:
+                comp_impact += probability * _bit_count(bitset_only & counted)
+            else:
+                del comp_uncertain[bitset]  # Certainly deleted anyway.
+
+        certain.append(comp_certain)
+        uncertain.append(comp_uncertain)
+        pending.append(comp_pending)
+        comp_impacts.append(comp_impact)
+
+    return {node: comp_impacts[comp_index]
+            for node, comp_index in node_to_comp_index.items()}
+
+
+def _merge_uncertain(uncertain, other, probability):
+    """Merges the other uncertain dict scaled by probability into uncertain.
+
+    The same set of nodes can be reached via several paths.  As these are
+    typically the same event the highest probability is kept instead of
+    combining the probabilities.
+    """
+    for bitset, other_probability in other.items():
+        other_probability *= probability
+        if other_probability > uncertain.get(bitset, 0.0):
+            uncertain[bitset] = other_probability
+
+
+def _bit_count(bitset):
+    """Returns the number of bits set in the given bitset (int)."""
+    return bin(bitset).count("1")
@@ -0,0 +1,271 @@
+"""Export Purgatory's graph to interchange formats (GraphML, JSON, Arrow)."""
+
+
+import json
+import operator
+import os.path
+from xml.sax import saxutils
+
+from . import components
+from . import error
+
+
+# Sorts graph members by uid with the precomputed integer keys.
+_SORT_KEY = operator.attrgetter("sort_key")
+
+# Columns of the node and edge records in the order of the record tuples.
+NODE_COLUMNS = ("uid", "type", "cycle", "layer")
+EDGE_COLUMNS = ("uid", "from", "to", "type", "rawtype", "probability")
+
+# Rows per record batch or row group of the 'arrow' and 'parquet' formats.
+DEFAULT_BATCH_SIZE = 65536
+
+_GRAPHML_KEYS = (
+    # (id, for, attr.name, attr.type, record column)
+    ("node_type", "node", "type", "string", 1),
+    ("cycle", "node", "cycle", "int", 2),
+    ("layer", "node", "layer", "int", 3),
+    ("edge_type", "edge", "type", "string", 3),
+    ("rawtype", "edge", "rawtype", "string", 4),
+    ("probability", "edge", "probability", "double", 5),
+)
+
+
+def _node_to_cycle(graph):
+    """Returns the dict of node to cycle id for the nodes in cycles.
+
+    The cycles are numbered by their smallest sort key so that the ids don't
+    depend on the iteration order of sets.
+    """
+    cycles = [comp for comp in components.strongly_connected_components(
+        graph.live_nodes) if len(comp) > 1]
+    cycles.sort(key=lambda comp: min(node.sort_key for node in comp))
+    node_to_cycle = {}
+    for cycle_id, cycle in enumerate(cycles):
+        for node in cycle:
+            node_to_cycle[node] = cycle_id
+    return node_to_cycle
+
+
+def iter_node_records(graph):
+    """Yields the records of the nodes of the graph sorted by uid.
+
+    This function will reset all graph members marked as deleted as the
+    layers are determined for the full graph (see Graph.layers).  Use
+    export_graph to restore the members marked as deleted afterwards.
+
+    Args:
+        graph: Purgatory graph (purgatory.graph.Graph).
+
+    Yields:
+        Tuples with the values of the NODE_COLUMNS: The uid, the class name,
+        the cycle id (None if the node isn't in a cycle) and the layer index.
+    """
+    node_to_layer = {}
+    for layer_index, layer in enumerate(graph.layers):
+        for node in layer:
+            node_to_layer[node] = layer_index
+    node_to_cycle = _node_to_cycle(graph)
+    for node in sorted(graph.live_nodes, key=_SORT_KEY):
+        yield (node.uid, node.__class__.__name__, node_to_cycle.get(node),
+               node_to_layer[node])
+
+
+def iter_edge_records(graph):
+    """Yields the records of the edges of the graph sorted by uid.
+
+    Edges marked as deleted are skipped.
+
+    Args:
+        graph: Purgatory graph (purgatory.graph.Graph).
+
+    Yields:
+        Tuples with the values of the EDGE_COLUMNS: The uid, the uids of the
+        from and to node, the class name, the raw dependency type (None if
+        the edge isn't a dependency) and the probability.
+    """
+    for edge in sorted(graph.live_edges, key=_SORT_KEY):
+        attrs = edge.export_attributes
+        yield (edge.uid, edge.from_node.uid, edge.to_node.uid,
+               edge.__class__.__name__, attrs.get("rawtype"),
+               edge.probability)
+
+
+def _write_graphml(graph, f, batch_size):  # pylint: disable=unused-argument
+    """Writes the graph as GraphML document line by line."""
+    quote = saxutils.quoteattr
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    for key_id, key_for, name, key_type, _ in _GRAPHML_KEYS:
+        f.write('  <key id="%s" for="%s" attr.name="%s" attr.type="%s"/>\n' % (
+            key_id, key_for, name, key_type))
+    f.write('  <graph id="G" edgedefault="directed">\n')
+
+    members = (
+        ("node", iter_node_records(graph)),
+        ("edge", iter_edge_records(graph)))
+    for member, records in members:
+        keys = [(key_id, column) for key_id, key_for, _, _, column
+                in _GRAPHML_KEYS if key_for == member]
+        for record in records:
+            if member == "node":
+                f.write("    <node id=%s>" % quote(record[0]))
+            else:
+                f.write("    <edge id=%s source=%s target=%s>" % (
+                    quote(record[0]), quote(record[1]), quote(record[2])))
+            for key_id, column in keys:
+                value = record[column]
+                if value is not None:
+                    f.write('<data key="%s">%s</data>' % (
+                        key_id, saxutils.escape(str(value))))
+            f.write("</%s>\n" % member)
+
+    f.write("  </graph>\n")
+    f.write("</graphml>\n")
+
+
+def _write_json(graph, f, batch_size):  # pylint: disable=unused-argument
+    """Writes the graph as JSON object with one node or edge per line."""
+    tables = (
+        ("nodes", NODE_COLUMNS, iter_node_records(graph)),
+        ("edges", EDGE_COLUMNS, iter_edge_records(graph)))
+    for index, (name, columns, records) in enumerate(tables):
+        f.write('{"%s": [' % name if not index else ',\n"%s": [' % name)
+        separator = "\n"
+        for record in records:
+            f.write(separator + json.dumps(
+                dict(zip(columns, record)), sort_keys=True))
+            separator = ",\n"
+        f.write("\n]")
+    f.write("}\n")
+
+
+def _import_pyarrow(file_format):
+    """Returns the pyarrow module with the submodules for the file format."""
+    # Try to import pyarrow.
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        if file_format == "parquet":
+            import pyarrow.parquet  # noqa  # pylint: disable=unused-variable
+    except ImportError:  # pragma: no cover
+        raise ImportError(
+            "No module named 'pyarrow'. To install 'pyarrow' run "
+            "'pip3 install pyarrow'.")
+    return pyarrow
+
+
+def _write_table(pyarrow, path, schema, records, file_format, batch_size):
+    """Writes the records as table in batches of batch_size rows.
+
+    Only the rows of the current batch are held in memory.  Every batch
+    becomes a record batch of the Arrow file or a row group of the Parquet
+    file.
+    """
+    if file_format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(path, schema)
+    else:
+        writer = pyarrow.ipc.new_file(path, schema)
+    with writer:
+        columns = [[] for _ in schema.names]
+        rows = 0
+        for record in records:
+            for column, value in zip(columns, record):
+                column.append(value)
+            rows += 1
+            if rows == batch_size:
+                writer.write_batch(
+                    pyarrow.record_batch(columns, schema=schema))
+                columns = [[] for _ in schema.names]
+                rows = 0
+        if rows:
+            writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+
+
+def _write_tables(graph, directory, batch_size, file_format):
+    """Writes the nodes and edges tables into the directory."""
+    pyarrow = _import_pyarrow(file_format)
+    string = pyarrow.string()
+    node_schema = pyarrow.schema([
+        ("uid", string), ("type", string), ("cycle", pyarrow.int32()),
+        ("layer", pyarrow.int32())])
+    edge_schema = pyarrow.schema([
+        ("uid", string), ("from", string), ("to", string), ("type", string),
+        ("rawtype", string), ("probability", pyarrow.float64())])
+
+    os.makedirs(directory, exist_ok=True)
+    tables = (
+        ("nodes", node_schema, iter_node_records(graph)),
+        ("edges", edge_schema, iter_edge_records(graph)))
+    for name, schema, records in tables:
+        path = os.path.join(directory, "%s.%s" % (name, file_format))
+        _write_table(pyarrow, path, schema, records, file_format, batch_size)
+
+
+def _write_arrow(graph, directory, batch_size):
+    """Writes the nodes and edges as Arrow IPC files into the directory."""
+    _write_tables(graph, directory, batch_size, "arrow")
+
+
+def _write_parquet(graph, directory, batch_size):
+    """Writes the nodes and edges as Parquet files into the directory."""
+    _write_tables(graph, directory, batch_size, "parquet")
+
+
+# Export formats with their writers and whether they write a text file (True)
+# or the files nodes.<format> and edges.<format> into a directory (False).
+EXPORT_FORMATS = {
+    "arrow": (_write_arrow, False),
+    "graphml": (_write_graphml, True),
+    "json": (_write_json, True),
+    "parquet": (_write_parquet, False),
+}
+
+
+def export_graph(graph, output, export_format, batch_size=None):
+    """Exports the nodes and edges of the graph with their attributes.
+
+    The nodes and edges are written into the output record by record (see
+    iter_node_records and iter_edge_records) and hence the output is never
+    held in memory as a whole.  The sorted nodes and edges, their cycles and
+    their layers are determined up front though and hence the memory needed
+    for the export grows with the number of graph members.  The 'graphml' and
+    'json' formats write a single text file.  The 'arrow' and 'parquet'
+    formats write the tables nodes.<format> and edges.<format> into a
+    directory and need the pyarrow module.
+
+    All graph members are exported, including the ones marked as deleted.
+    Hence the graph is reset for the export.  Afterwards the members that
+    were marked as deleted are marked as deleted again but all checkpoints
+    are invalidated (see Graph.unmark_deleted).
+
+    Args:
+        graph: Purgatory graph (purgatory.graph.Graph).
+        output: Path of the output file or directory.  A text file object
+            for the 'graphml' and 'json' formats.
+        export_format: 'arrow', 'graphml', 'json' or 'parquet'.
+        batch_size: Number of rows per record batch or row group of the
+            'arrow' and 'parquet' formats.  Defaults to DEFAULT_BATCH_SIZE.
+
+    Raises:
+        UnsupportedExportFormatError: If the export format isn't supported.
+        ImportError: If pyarrow isn't installed for 'arrow' and 'parquet'.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise error.UnsupportedExportFormatError(export_format)
+    writer, text = EXPORT_FORMATS[export_format]
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    deleted_members = graph.deleted_nodes | graph.deleted_edges
+    graph.unmark_deleted()
+    try:
+        if text and isinstance(output, str):
+            with open(output, "w") as f:
+                writer(graph, f, batch_size)
+        else:
+            writer(graph, output, batch_size)
+    finally:
+        # Restore the members marked as deleted.  They are closed under the
+        # marking as deleted and hence marking them again in any order
+        # doesn't mark additional members as deleted.
+        graph.unmark_deleted()
+        graph.mark_members_deleted(deleted_members)
@@ -0,0 +1,161 @@
+"""Incrementally maintained leaf nodes and leaf cycles of a Graph."""
+
+
+from . import components
+
+
+class LeafTracker:
+    """Incrementally maintained leaf nodes and leaf cycles of a Graph.
+
+    The tracker keeps the strongly connected components (leaf nodes and
+    cycles) of the nodes that aren't marked as deleted and counts for every
+    component the incoming edges from outside the component that aren't
+    marked as deleted.  A component without such incoming edges is a leaf.
+    The counters are updated by the mark_deleted methods of the members and by
+    Graph.rollback.  Hence reading the leafs is proportional to the number of
+    leafs and peeling the graph layer by layer is linear overall.
+
+    Marking members of a cycle as deleted can break up the cycle (OrEdges).
+    Such components are split lazily when the leafs are read next.  Once a
+    component has been split the tracker can't restore it incrementally and
+    hence it is rebuilt on the next read if members are unmarked as deleted.
+    The same applies to nodes that have been marked as deleted before the
+    tracker has been built.
+
+    The tracker is enabled with Graph.enable_leaf_tracker and then used by the
+    Graph.leafs property.
+    """
+
+    def __init__(self, graph):
+        """LeafTracker constructor.
+
+        Args:
+            graph: The Graph (purgatory.graph.Graph) to track.
+        """
+        self.__graph = graph
+        self.__valid = False
+        self.__split = False
+        self.__node_to_component = {}  # node:component index
+        self.__components = []  # [set of nodes not marked as deleted, ...]
+        self.__in_degrees = []  # [incoming edges from outside, ...]
+        self.__leaf_components = set()  # Indexes of the leaf components
+        self.__dirty_components = set()  # Indexes of components to split
+
+    def __add_component(self, nodes):
+        """Adds a component and counts its incoming edges from outside."""
+        index = len(self.__components)
+        self.__components.append(set(nodes))
+        in_degree = 0
+        for node in nodes:
+            self.__node_to_component[node] = index
+            for edge in node.incoming_edges:
+                if edge.from_node not in nodes:
+                    in_degree += 1
+        self.__in_degrees.append(in_degree)
+        if not in_degree:
+            self.__leaf_components |= set((index,))
+
+    def __rebuild(self):
+        """Rebuilds the components and counters from the graph's state."""
+        self.__node_to_component = {}
+        self.__components = []
+        self.__in_degrees = []
+        self.__leaf_components = set()
+        self.__dirty_components = set()
+        self.__split = False
+        for component in components.strongly_connected_components(
+                self.__graph.live_nodes):
+            self.__add_component(component)
+        self.__valid = True
+
+    def __split_dirty_components(self):
+        """Splits the components whose cycles might have been broken up."""
+        while self.__dirty_components:
+            index = self.__dirty_components.pop()
+            nodes = self.__components[index]
+            new_components = components.strongly_connected_components(
+                nodes, within_nodes=True)
+            if len(new_components) == 1:
+                continue  # The cycle is still intact.
+
+            self.__split = True
+            self.__components[index] = set()
+            self.__leaf_components -= set((index,))
+            for component in new_components:
+                self.__add_component(component)
+
+    def invalidate(self):
+        """Rebuilds the tracker on the next read, e.g. after unmarking."""
+        self.__valid = False
+
+    def edge_deleted(self, edge):
+        """Updates the counters after the edge has been marked as deleted."""
+        if not self.__valid:
+            return
+        from_index = self.__node_to_component[edge.from_node]
+        to_index = self.__node_to_component[edge.to_node]
+        if from_index != to_index:
+            self.__in_degrees[to_index] -= 1
+            if not self.__in_degrees[to_index]:
+                self.__leaf_components |= set((to_index,))
+        elif len(self.__components[to_index]) > 1:
+            self.__dirty_components |= set((to_index,))
+
+    def edge_undeleted(self, edge):
+        """Updates the counters after the edge has been unmarked as deleted."""
+        if not self.__valid:
+            return
+        if self.__split:
+            self.__valid = False
+            return
+        from_index = self.__node_to_component[edge.from_node]
+        to_index = self.__node_to_component[edge.to_node]
+        if from_index != to_index:
+            if not self.__in_degrees[to_index]:
+                self.__leaf_components -= set((to_index,))
+            self.__in_degrees[to_index] += 1
+
+    def node_deleted(self, node):
+        """Updates the components after the node has been marked as deleted.
+
+        All the edges of the node are already marked as deleted.
+        """
+        if not self.__valid:
+            return
+        index = self.__node_to_component[node]
+        component = self.__components[index]
+        component -= set((node,))
+        if not component:
+            self.__leaf_components -= set((index,))
+            self.__dirty_components -= set((index,))
+        else:
+            self.__dirty_components |= set((index,))
+
+    def node_undeleted(self, node):
+        """Updates the components after the node has been unmarked as deleted.
+
+        None of the edges of the node are unmarked as deleted yet.
+        """
+        if not self.__valid:
+            return
+        index = self.__node_to_component.get(node)
+        if self.__split or index is None:
+            # Split components and nodes marked as deleted before the tracker
+            # has been built can't be restored incrementally.
+            self.__valid = False
+            return
+        component = self.__components[index]
+        if not component and not self.__in_degrees[index]:
+            self.__leaf_components |= set((index,))
+        component |= set((node,))
+        if len(component) > 1:
+            self.__dirty_components |= set((index,))
+
+    @property
+    def leafs(self):
+        """Returns the leaf nodes and leaf cycles (see Graph.leafs)."""
+        if not self.__valid:
+            self.__rebuild()
+        self.__split_dirty_components()
+        return frozenset(frozenset(self.__components[index])
+                         for index in self.__leaf_components)
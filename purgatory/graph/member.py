@@ -13,25 +13,32 @@ class Member(abc.ABC):
     __uid_counter = 0
     __uid_to_uid_intid = {}  # uid:uid_intid
 
-    def __init__(self, uid):
-        # Get unique integer id based on the uid
-        uid_intid = Member.__uid_to_uid_intid.get(uid)
+    def __init__(self, key):
+        """Member constructor.
+
+        Args:
+            key: Hashable key that uniquely identifies the member.  Nodes use
+                their uid as key.  Edges use a compact tuple of integers (see
+                Edge) and generate their uid only on demand.
+        """
+        # Get unique integer id based on the key
+        uid_intid = Member.__uid_to_uid_intid.get(key)
         if uid_intid is None:
             uid_intid = Member.__uid_counter
-            Member.__uid_to_uid_intid[uid] = uid_intid
+            Member.__uid_to_uid_intid[key] = uid_intid
             Member.__uid_counter += 1
 
         # Protected
-        self._uid = uid
+        self._uid = key
         self._uid_intid = uid_intid
-        self._hash = hash(uid)
-        self._str = None
+        self._hash = hash(key)
+        self._str = None  # Initialized by _init_str on first use.
         self._deleted = False
         self._graph = None
+        self._sort_rank = None  # Initialized by the graph.
 
         # Init
         super().__init__()
-        self._init_str()
 
     def __eq__(self, other):
         """Equals magic method with extreme speed optimizations.
@@ -46,28 +53,30 @@ class Member(abc.ABC):
         return self._uid_intid == other_uid_intid  # Unique id for all Members.
 
     def __ge__(self, other):
-        return self._uid >= other.uid
+        return self.uid >= other.uid
 
     def __gt__(self, other):
-        return self._uid > other.uid
+        return self.uid > other.uid
 
     def __hash__(self):
         return self._hash
 
     def __le__(self, other):
-        return self._uid <= other.uid
+        return self.uid <= other.uid
 
     def __lt__(self, other):
-        return self._uid < other.uid
+        return self.uid < other.uid
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __str__(self):
+        if self._str is None:
+            self._init_str()
         return self._str
 
     def __repr__(self):
-        return "%s(uid='%s')" % (self.__class__.__name__, self._uid)
+        return "%s(uid='%s')" % (self.__class__.__name__, self.uid)
 
     @abc.abstractmethod
     def _init_str(self):
@@ -78,6 +87,14 @@ class Member(abc.ABC):
         """Returns True if this graph member has been marked as deleted."""
         return self._deleted
 
+    @property
+    def export_attributes(self):
+        """Returns the dict of additional attributes for graph exports.
+
+        See purgatory.graph.interchange for the supported attributes.
+        """
+        return {}
+
     @property
     def graphviz_attributes(self):  # pragma: no cover
         """Returns the attributes dict for the respective GraphViz member."""
@@ -130,6 +147,22 @@ class Member(abc.ABC):
                 raise error.NotMemberOfGraphError(self)
         self._graph = graph
 
+    @property
+    def key(self):
+        """Returns the hashable key that uniquely identifies the member."""
+        return self._uid
+
+    @property
+    def sort_key(self):
+        """Returns the key to sort the graph member by uid.
+
+        The key is the dense rank of the member's uid among the nodes or the
+        edges of the graph.  Sorting by this integer key gives the same order
+        as sorting by uid without Python-level comparisons.  Node keys are
+        available once the graph has been initialized.
+        """
+        return self._sort_rank
+
     @property
     def uid(self):
         """Returns the uid of the graph member."""
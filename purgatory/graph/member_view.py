@@ -0,0 +1,46 @@
+"""Read-only live view of a set of graph members."""
+
+
+import collections.abc
+
+
+class MemberView(collections.abc.Set):
+    """Read-only live view of a set of graph members.
+
+    The view wraps a set of the graph that is kept up to date incrementally
+    while members are marked or unmarked as deleted.  Hence len(), truthiness
+    and membership tests are O(1) and iterating only visits the members
+    currently in the set.  Contrary to the set-returning properties of the
+    graph no copy of the members is made.
+
+    The view reflects all later changes of the graph.  Don't mark members as
+    deleted (or unmark them) while iterating over a view.  Set operations
+    like view - other return new sets.
+    """
+
+    __slots__ = ("__members",)
+
+    def __init__(self, members):
+        """MemberView constructor.
+
+        Args:
+            members: The live set of members of the graph.
+        """
+        self.__members = members
+
+    def __contains__(self, member):
+        return member in self.__members
+
+    def __iter__(self):
+        return iter(self.__members)
+
+    def __len__(self):
+        return len(self.__members)
+
+    def __repr__(self):
+        return "%s(%d members)" % (self.__class__.__name__, len(self))
+
+    @classmethod
+    def _from_iterable(cls, it):
+        """Returns a set as result of the set operations."""
+        return set(it)
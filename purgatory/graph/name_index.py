@@ -0,0 +1,145 @@
+"""Sorted index of names for exact, prefix, regex and glob lookups."""
+
+
+import bisect
+import fnmatch
+import re
+
+from . import error
+
+
+# Characters that have a special meaning in regular expressions.  A backslash
+# followed by one of these characters is a literal character.
+_REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+# Regex quantifiers that make the preceding literal character optional.
+_REGEX_OPTIONAL_QUANTIFIERS = frozenset("*?{")
+
+# Characters that have a special meaning in glob patterns.
+_GLOB_SPECIAL_CHARS = frozenset("*?[")
+
+
+def _regex_literal_prefix(pattern):
+    """Returns the literal prefix every name matching the regex must have.
+
+    The literal prefix is the longest leading part of the pattern without any
+    special characters.  Escaped special characters are part of the literal
+    prefix.  The prefix is empty if it can't be determined safely, e.g. if the
+    pattern contains alternatives.
+
+    Args:
+        pattern: A regular expression that has to match the whole name.
+
+    Returns:
+        The literal prefix string.
+    """
+    if "|" in pattern:
+        return ""  # An alternative can start with any character.
+
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            if i + 1 < len(pattern) and pattern[i + 1] in _REGEX_SPECIAL_CHARS:
+                char = pattern[i + 1]
+                i += 1
+            else:
+                break  # Character class like \d or end of the pattern.
+        elif char in _REGEX_SPECIAL_CHARS:
+            # A quantifier makes the previous literal character optional.
+            if char in _REGEX_OPTIONAL_QUANTIFIERS and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+        i += 1
+    return "".join(prefix)
+
+
+def _glob_literal_prefix(pattern):
+    """Returns the literal prefix every name matching the glob must have."""
+    for i, char in enumerate(pattern):
+        if char in _GLOB_SPECIAL_CHARS:
+            return pattern[:i]
+    return pattern
+
+
+class NameIndex:
+    """Sorted index of names for exact, prefix, regex and glob lookups.
+
+    The names are kept in a sorted list.  All names starting with a given
+    prefix are a contiguous range of the sorted list that is found by binary
+    search - the same lookup a trie would provide without the memory overhead
+    of a node per character.  Regex and glob lookups only match the names in
+    the range of the literal prefix of the pattern instead of all names.
+    """
+
+    def __init__(self, name_to_value):
+        """NameIndex constructor.
+
+        Args:
+            name_to_value: Dict of name to the value returned by lookups.  The
+                dict is copied and hence later changes aren't reflected.
+        """
+        self.__name_to_value = dict(name_to_value)
+        self.__names = sorted(self.__name_to_value)
+
+    def __contains__(self, name):
+        return name in self.__name_to_value
+
+    def __len__(self):
+        return len(self.__names)
+
+    def get(self, name, default=None):
+        """Returns the value of the exact name or default."""
+        return self.__name_to_value.get(name, default)
+
+    def names_with_prefix(self, prefix):
+        """Returns a sorted list of the names starting with the prefix."""
+        if not prefix:
+            return list(self.__names)
+        first = bisect.bisect_left(self.__names, prefix)
+        # Every name with the prefix is smaller than the prefix followed by
+        # the highest possible character.
+        last = bisect.bisect_left(
+            self.__names, prefix + chr(0x10ffff), lo=first)
+        return self.__names[first:last]
+
+    def __match(self, prefix, regex):
+        """Returns a dict of name to value for all matching names."""
+        return {
+            name: self.__name_to_value[name]
+            for name in self.names_with_prefix(prefix)
+            if regex.fullmatch(name)}
+
+    def match_regex(self, pattern):
+        """Returns a dict of name to value for all names matching the regex.
+
+        Args:
+            pattern: A regular expression that has to match the whole name.
+
+        Returns:
+            Dict of name to value of all matching names.
+
+        Raises:
+            InvalidNamePatternError: If the pattern isn't a valid regular
+                expression.
+        """
+        try:
+            regex = re.compile(pattern)
+        except re.error as ex:
+            raise error.InvalidNamePatternError(pattern, ex)
+        return self.__match(_regex_literal_prefix(pattern), regex)
+
+    def match_glob(self, pattern):
+        """Returns a dict of name to value for all names matching the glob.
+
+        Args:
+            pattern: A shell-style wildcard pattern (see the fnmatch module)
+                that has to match the whole name.
+
+        Returns:
+            Dict of name to value of all matching names.
+        """
+        regex = re.compile(fnmatch.translate(pattern))
+        return self.__match(_glob_literal_prefix(pattern), regex)
@@ -252,6 +252,24 @@ class Node(member.Member):  # pylint: disable=abstract-method
 
         return in_cycle
 
+    @property
+    def can_be_marked_deleted(self):  # pylint: disable=no-self-use
+        """Returns True if this node can be marked as deleted.
+
+        Algorithms that mark the leafs of the graph as deleted to process it
+        layer by layer skip leafs with nodes that can't be marked as deleted.
+        Defaults to True.
+        """
+        return True
+
+    @property
+    def counted_in_purge_impact(self):  # pylint: disable=no-self-use
+        """Returns True if this node is counted in the purge impact.
+
+        See Graph.purge_impact for details.  Defaults to True.
+        """
+        return True
+
     @property
     def incoming_cycle_nodes(self):
         """Returns the incoming nodes of the cycle if the node is in a cycle.
@@ -763,6 +781,15 @@ class Node(member.Member):  # pylint: disable=abstract-method
         for edge in outgoing_edges:
             edge.mark_deleted()
 
-        # Finally mark the node itself as deleted.
+        # Finally mark the node itself as deleted and record it in the undo
+        # log of the graph.
+        graph = self.graph
+        self_set = set((self,))
         self._deleted = True
-        self.graph._deleted_nodes |= set((self,))
+        graph._deleted_nodes |= self_set  # noqa  # pylint: disable=protected-access
+        graph._alive_nodes -= self_set  # noqa  # pylint: disable=protected-access
+        graph._alive_by_type[self.__class__] -= self_set  # noqa  # pylint: disable=protected-access
+        graph._deleted_by_type[self.__class__] |= self_set  # noqa  # pylint: disable=protected-access
+        if graph._leaf_tracker is not None:  # noqa  # pylint: disable=protected-access
+            graph._leaf_tracker.node_deleted(self)  # noqa  # pylint: disable=protected-access
+        graph._undo_log.append((self, None))  # noqa  # pylint: disable=protected-access
@@ -0,0 +1,146 @@
+"""Timing of the phases of the graph construction and of the commands."""
+
+
+import collections
+import contextlib
+import time
+import tracemalloc
+
+
+PhaseTiming = collections.namedtuple(
+    "PhaseTiming", ["phase", "depth", "seconds", "allocated", "peak"])
+PhaseTiming.__doc__ = """The duration and memory allocations of a phase.
+
+Attributes:
+    phase: Name of the phase.
+    depth: Nesting depth of the phase.  0 for phases that aren't nested in
+        other phases.
+    seconds: Duration of the phase according to a monotonic clock.
+    allocated: Difference of the memory allocated by Python in bytes between
+        the end and the start of the phase.  Negative if more memory was
+        freed than allocated.  None if allocations aren't traced.
+    peak: Peak of the memory allocated by Python during the phase in bytes
+        relative to the start of the phase.  None if allocations aren't
+        traced or if tracemalloc can't reset its peak (before Python 3.9).
+"""
+
+
+# Context manager for the phases of disabled timings.
+_NULL_PHASE = contextlib.nullcontext()
+
+# tracemalloc.reset_peak is only available since Python 3.9.  Without it the
+# peaks of the phases can't be told apart and hence aren't recorded.
+_TRACEMALLOC_CAN_RESET_PEAK = hasattr(tracemalloc, "reset_peak")
+
+
+class Timings:
+    """Records the duration of named phases with a monotonic clock.
+
+    Optionally the memory allocations of each phase are traced with
+    tracemalloc.  Tracing allocations slows down the phases considerably and
+    hence the durations are only comparable to durations measured with the
+    same setting.  Phases can be nested, e.g. the phases of the graph
+    initialization in the phase of a command, and a phase can be recorded
+    several times, e.g. once per graph.
+
+    Disabled timings record nothing and their phases cost next to nothing.
+    Hence code can always time its phases instead of checking if timings are
+    requested.
+    """
+
+    def __init__(self, enabled=True, trace_allocations=False):
+        """Timings constructor.
+
+        Args:
+            enabled: Records the phases.  Defaults to True.
+            trace_allocations: Traces the memory allocations of the phases
+                with tracemalloc.  tracemalloc is started if it isn't tracing
+                yet and stopped again by the stop method.  Defaults to False.
+        """
+        # Private
+        self.__enabled = enabled
+        self.__trace_allocations = enabled and trace_allocations
+        self.__started_tracemalloc = False
+        self.__phase_timings = []
+        self.__peaks = []  # [peak of the open phases so far, ...]
+
+        # Init
+        if self.__trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started_tracemalloc = True
+
+    @contextlib.contextmanager
+    def __phase(self, name):
+        """Records the duration and allocations of the with statement.
+
+        tracemalloc only tracks a single peak.  Hence the peak so far is
+        folded into the enclosing phases before it is reset for a nested
+        phase and the peak of the nested phase is folded into them again
+        once it has ended.
+        """
+        peaks = self.__peaks
+        index = len(self.__phase_timings)
+        depth = len(peaks)
+        self.__phase_timings.append(None)  # Keeps the order of the phases.
+        start_allocated = None
+        if self.__trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            if _TRACEMALLOC_CAN_RESET_PEAK:
+                tracemalloc.reset_peak()  # pylint: disable=no-member
+            start_allocated = current
+        peaks.append(0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            allocated = peak = None
+            phase_peak = peaks.pop()
+            if start_allocated is not None:
+                end_allocated, end_peak = tracemalloc.get_traced_memory()
+                phase_peak = max(phase_peak, end_peak)
+                allocated = end_allocated - start_allocated
+                if _TRACEMALLOC_CAN_RESET_PEAK:
+                    peak = phase_peak - start_allocated
+                if peaks:
+                    peaks[-1] = max(peaks[-1], phase_peak)
+            self.__phase_timings[index] = PhaseTiming(
+                name, depth, seconds, allocated, peak)
+
+    @property
+    def enabled(self):
+        """Returns True if the phases are recorded."""
+        return self.__enabled
+
+    def phase(self, name):
+        """Returns a context manager that records a phase.
+
+        Example:
+            with timings.phase("leafs"):
+                leafs = graph.leafs
+
+        Args:
+            name: Name of the phase.
+        """
+        if not self.__enabled:
+            return _NULL_PHASE
+        return self.__phase(name)
+
+    @property
+    def phase_timings(self):
+        """Returns the tuple of the PhaseTimings in the order of the phases.
+
+        A phase is listed before the phases nested in it.  Phases that
+        haven't ended yet aren't listed.
+        """
+        return tuple(phase_timing for phase_timing in self.__phase_timings
+                     if phase_timing is not None)
+
+    def stop(self):
+        """Stops tracemalloc if it has been started by these timings."""
+        if self.__started_tracemalloc:
+            tracemalloc.stop()
+            self.__started_tracemalloc = False
+            self.__trace_allocations = False
@@ -177,3 +177,40 @@ class CommonDpkgGraphTestsMixin(object):
         # deleted that are still needed by other leaf nodes/cycles.
         for c1, c2 in itertools.permutations(deleted_clusters, 2):
             self.assertFalse(c1 & c2)
+
+    def test_checkpoint_rollback(self):
+        graph = self.graph
+
+        # Simulate the removal of each leaf on top of the removal of the first
+        # layer and roll it back afterwards.  The leafs and the deleted nodes
+        # must be the same after each rollback.
+        leafs = graph.leafs
+        graph.mark_members_deleted(next(iter(leafs)))
+        deleted_nodes = graph.deleted_nodes
+        leafs = graph.leafs
+        for leaf in leafs:
+            checkpoint = graph.checkpoint()
+            graph.mark_members_including_obsolete_deleted(leaf)
+            graph.rollback(checkpoint)
+            self.assertSetEqual(graph.deleted_nodes, deleted_nodes)
+            self.assertSetEqual(graph.leafs, leafs)
+
+    def test_purge_impact(self):
+        graph = self.graph
+        node_to_impact = graph.purge_impact
+        package_nodes = graph.package_nodes
+
+        # Without alternatives the purge impact must be exactly the number of
+        # packages that are marked as deleted if the package is purged.
+        alternatives = any(
+            edge.probability < 1.0 for edge in graph.target_edges)
+        for node in package_nodes:
+            impact = node_to_impact[node]
+            self.assertGreaterEqual(impact, 1.0)
+            self.assertLessEqual(impact, len(package_nodes))
+            if alternatives:
+                continue
+            checkpoint = graph.checkpoint()
+            node.mark_deleted()
+            self.assertEqual(impact, len(graph.deleted_package_nodes))
+            graph.rollback(checkpoint)
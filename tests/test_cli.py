@@ -3,13 +3,20 @@
 # Tests don't require docstrings:
 # pylint: disable=missing-docstring
 
+# Tests are allowed to access protected members:
+# pylint: disable=protected-access
+
 
 import gzip
 import io
+import json
 import logging
 import os
+import subprocess
+import sys
 import tempfile
 import textwrap
+import tracemalloc
 import unittest
 import unittest.mock
 
@@ -18,6 +25,11 @@ import purgatory.cli
 from . import common
 
 
+# Budget for importing purgatory.cli in microseconds.  Starting the CLI must
+# not pay for importing python-apt, pygraphviz or multiprocessing.
+_CLI_IMPORT_TIME_BUDGET_US = 250000
+
+
 def _log_stdout_stderr(stdout, stderr):
     stdout = stdout.rstrip()
     stderr = stderr.rstrip()
@@ -42,6 +54,34 @@ class TestCLI(common.PurgatoryTestCase):
     def tearDownClass(cls):
         os.remove(cls.__dpkg_db)
 
+    def test_cli_import_time(self):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(sys.path)
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import purgatory.cli"],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, check=True)
+
+        # Lines look like: "import time: <self us> | <cumulative us> | <name>"
+        module_to_cumulative = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            fields = line[len("import time:"):].split("|")
+            if not fields[1].strip().isdigit():
+                continue  # Header line.
+            module_to_cumulative[fields[2].strip()] = int(fields[1])
+        logging.debug(
+            "purgatory.cli import time: %d us",
+            module_to_cumulative["purgatory.cli"])
+
+        for module in ("apt", "apt_pkg", "multiprocessing", "pyarrow",
+                       "pygraphviz", "purgatory.graph.interchange",
+                       "purgatory.graph.graphviz"):
+            self.assertNotIn(module, module_to_cumulative)
+        self.assertLess(
+            module_to_cumulative["purgatory.cli"], _CLI_IMPORT_TIME_BUDGET_US)
+
     @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
     @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
     def test_cli_no_command(self, mock_stdout, mock_stderr):
@@ -164,3 +204,573 @@ class TestCLI(common.PurgatoryTestCase):
         self.assertEqual(exit_code, expected_exit_code)
         self.assertIn(expected_in_stdout, stdout)
         self.assertEqual(expected_stderr, stderr)
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_impact_command(self, mock_stdout, mock_stderr):
+        args = [
+            "impact",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "apt",
+            "dpkg",
+            "libc6",
+        ]
+
+        expected_exit_code = 0
+        expected_stdout = textwrap.dedent("""\
+            libc6 94.000
+            dpkg 43.000
+            apt 1.000
+        """)
+        expected_stderr = ""
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        self.assertEqual(expected_stdout, stdout)
+        self.assertEqual(expected_stderr, stderr)
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_leafs_command_long_sort_size(self, mock_stdout, mock_stderr):
+        args = [
+            "leafs",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--long",
+            "--sort=size",
+        ]
+
+        expected_exit_code = 0
+        expected_stdout_head = (
+            "init\t39\t50.4 MiB\tSystem-V-like init utilities - metapackage\n"
+            "apt\t9\t14.1 MiB\tcommandline package manager\n"
+            "bash\t4\t5.7 MiB\tGNU Bourne Again SHell\n"
+        )
+        expected_stderr = ""
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        self.assertTrue(stdout.startswith(expected_stdout_head))
+        self.assertEqual(len(stdout.splitlines()), 16)
+        self.assertEqual(expected_stderr, stderr)
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_leafs_command_jsonl(self, mock_stdout, mock_stderr):
+        args = [
+            "leafs",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--format=jsonl",
+            "--sort=count",
+        ]
+
+        expected_exit_code = 0
+        expected_first_record = {
+            "name": "init",
+            "cycle_members": [],
+            "layer": 0,
+            "footprint": {"packages": 39, "installed_size": 51601},
+        }
+        expected_stderr = ""
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        records = [json.loads(line) for line in stdout.splitlines()]
+        self.assertEqual(len(records), 16)
+        self.assertDictEqual(records[0], expected_first_record)
+        self.assertEqual(expected_stderr, stderr)
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_purge_apt_json_unsorted(self, mock_stdout, mock_stderr):
+        args = [
+            "purge",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--format=json",
+            "--unsorted",
+            "apt",
+        ]
+
+        expected_exit_code = 0
+        expected_pkgs = [
+            "apt", "debian-archive-keyring", "gnupg", "gpgv",
+            "libapt-pkg4.12", "libreadline6", "libstdc++6", "libusb-0.1-4",
+            "readline-common",
+        ]
+        expected_stderr = ""
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        records = json.loads(stdout)
+        self.assertListEqual(
+            sorted(record["name"] for record in records), expected_pkgs)
+        # Records are printed in the order the packages have been marked for
+        # removal.
+        self.assertEqual(records[0]["name"], "apt")
+        self.assertEqual(records[0]["layer"], 0)
+        self.assertListEqual(
+            [record["layer"] for record in records],
+            sorted(record["layer"] for record in records))
+        self.assertEqual(expected_stderr, stderr)
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_purge_regex_and_glob(self, mock_stdout, mock_stderr):
+        args = [
+            "purge",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--format=jsonl",
+            "hostnam.",
+            "--glob",
+            "ncurses-b*",
+        ]
+
+        expected_exit_code = 0
+        expected_pkgs = ["hostname", "ncurses-base", "ncurses-bin"]
+        expected_stderr = ""
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        records = [json.loads(line) for line in stdout.splitlines()]
+        self.assertListEqual(
+            [record["name"] for record in records], expected_pkgs)
+        self.assertEqual(expected_stderr, stderr)
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_purge_verify(self, mock_stdout, mock_stderr):
+        args = [
+            "purge",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--verify",
+            "--format=jsonl",
+            "apt",
+        ]
+
+        expected_exit_code = 0
+        expected_in_output = "Apt's resolver reaches the same result."
+
+        with self.assertLogs(level="INFO") as logs:
+            try:
+                exit_code = purgatory.cli.cli(args)
+            except SystemExit as ex:
+                exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        self.assertIn(expected_in_output, "\n".join(logs.output))
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_purge_verify_mismatch(self, mock_stdout, mock_stderr):
+        args = [
+            "purge",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--verify",
+            "init",
+        ]
+
+        # Apt never removes essential packages like coreutils automatically
+        # but Purgatory doesn't know about essential packages.
+        expected_exit_code = 1
+        expected_in_output = "Only removed by Purgatory: coreutils "
+
+        with self.assertLogs(level="INFO") as logs:
+            try:
+                exit_code = purgatory.cli.cli(args)
+            except SystemExit as ex:
+                exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        self.assertIn(expected_in_output, "\n".join(logs.output))
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_leafs_and_purge_keep(self, mock_stdout, mock_stderr):
+        keep_file = tempfile.NamedTemporaryFile(
+            "w", prefix="keep-", delete=True)
+        keep_file.write("# Packages to keep\n\ninit\n")
+        keep_file.flush()
+        args = [
+            "leafs",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--keep",
+            "apt",
+            "--keep-file",
+            keep_file.name,
+        ]
+
+        expected_exit_code = 0
+        expected_stderr = ""
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        leafs = stdout.splitlines()
+        self.assertEqual(len(leafs), 14)
+        self.assertNotIn("apt", leafs)
+        self.assertNotIn("init", leafs)
+        self.assertEqual(expected_stderr, stderr)
+
+        # Kept packages and their dependencies aren't purged.
+        mock_stdout.truncate(0)
+        mock_stdout.seek(0)
+        args = [
+            "purge",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--keep",
+            "apt",
+            "--format=jsonl",
+            "gpgv",
+            "hostname",
+        ]
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        _log_stdout_stderr(stdout, "")
+
+        self.assertEqual(exit_code, expected_exit_code)
+        records = [json.loads(line) for line in stdout.splitlines()]
+        self.assertListEqual(
+            [record["name"] for record in records], ["hostname"])
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_reinstall_plan_baseline(self, mock_stdout, mock_stderr):
+        # The baseline lacks the apt and hostname packages.
+        with open(self.__dpkg_db, "r") as f:
+            stanzas = f.read().split("\n\n")
+        baseline = tempfile.NamedTemporaryFile(
+            "w", prefix="dpkg-status-db-baseline-", delete=True)
+        baseline.write("\n\n".join(
+            stanza for stanza in stanzas
+            if not stanza.startswith(("Package: apt\n",
+                                      "Package: hostname\n"))))
+        baseline.flush()
+        args = [
+            "reinstall-plan",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--baseline",
+            baseline.name,
+        ]
+
+        expected_exit_code = 0
+        expected_in_stdout = (
+            "apt install apt hostname apt-utils- bash-completion- "
+            "bsdmainutils- dbus- gnupg-curl- libgpm2- libldap-2.4-2- "
+            "libpam-cap- libpam-systemd- libpng12-0- psmisc- uuid-runtime-\n"
+        )
+        expected_stderr = ""
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        self.assertIn(expected_in_stdout, stdout)
+        self.assertEqual(expected_stderr, stderr)
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_why_command(self, mock_stdout, mock_stderr):
+        args = [
+            "why",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--chains",
+            "2",
+            "dpkg",
+            "apt",
+            "not-installed",
+        ]
+
+        expected_exit_code = 0
+        expected_stdout = textwrap.dedent("""\
+            apt: apt
+            dpkg: grep -> dpkg
+            dpkg: gzip -> dpkg
+        """)
+        expected_stderr = ""
+
+        with self.assertLogs(level=logging.INFO) as logs:
+            try:
+                exit_code = purgatory.cli.cli(args)
+            except SystemExit as ex:
+                exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        self.assertEqual(expected_stdout, stdout)
+        self.assertEqual(expected_stderr, stderr)
+        self.assertIn("'not-installed' is not installed", logs.output[0])
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_autoremove_command(self, mock_stdout, mock_stderr):
+        extended_states = tempfile.NamedTemporaryFile(
+            "w", prefix="extended-states-", delete=True)
+        extended_states.write(textwrap.dedent("""\
+            Package: apt
+            Architecture: amd64
+            Auto-Installed: 1
+
+            Package: debian-archive-keyring
+            Architecture: all
+            Auto-Installed: 1
+        """))
+        extended_states.flush()
+        args = [
+            "autoremove",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--extended-states",
+            extended_states.name,
+            "--format",
+            "jsonl",
+        ]
+
+        expected_exit_code = 0
+        expected_stdout = textwrap.dedent("""\
+            {"installed_size": 3788, "name": "apt"}
+            {"installed_size": 108, "name": "debian-archive-keyring"}
+        """)
+        expected_stderr = ""
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        self.assertEqual(expected_stdout, stdout)
+        self.assertEqual(expected_stderr, stderr)
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_diff_command(self, mock_stdout, mock_stderr):
+        # The old dpkg status database lacks the apt and hostname packages.
+        with open(self.__dpkg_db, "r") as f:
+            stanzas = f.read().split("\n\n")
+        old_dpkg_db = tempfile.NamedTemporaryFile(
+            "w", prefix="dpkg-status-db-old-", delete=True)
+        old_dpkg_db.write("\n\n".join(
+            stanza for stanza in stanzas
+            if not stanza.startswith(("Package: apt\n",
+                                      "Package: hostname\n"))))
+        old_dpkg_db.flush()
+        args = [
+            "diff",
+            old_dpkg_db.name,
+            self.__dpkg_db,
+        ]
+
+        expected_exit_code = 0
+        expected_stdout = textwrap.dedent("""\
+            + package apt
+            + package hostname
+            + leaf apt
+            - leaf debian-archive-keyring
+            + leaf hostname
+            - leaf libapt-pkg4.12
+        """)
+        expected_stderr = ""
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        self.assertEqual(expected_stdout, stdout)
+        self.assertEqual(expected_stderr, stderr)
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_export_command(self, mock_stdout, mock_stderr):
+        args = [
+            "export",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--format",
+            "json",
+            "-",
+        ]
+
+        expected_exit_code = 0
+        expected_stderr = ""
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        self.assertEqual(expected_stderr, stderr)
+        export = json.loads(stdout)
+        self.assertEqual(len(export["nodes"]), 186)
+        self.assertEqual(len(export["edges"]), 411)
+        self.assertIn(
+            {"uid": "dpkg", "type": "PackageNode", "cycle": None,
+             "layer": 34},
+            export["nodes"])
+        self.assertIn(
+            {"uid": "apt --Depends--> gnupg", "from": "apt", "to": "<gnupg>",
+             "type": "DependencyEdge", "rawtype": "Depends",
+             "probability": 1.0},
+            export["edges"])
+        self.assertEqual(
+            len({node["cycle"] for node in export["nodes"]} - set((None,))),
+            4)
+
+    def test_cli_arch_args_before_command(self):
+        parsed_args = purgatory.cli._parse_args(
+            ["--arch", "arm64", "--foreign-arch", "i386", "leafs"])
+        self.assertEqual(parsed_args.command, "leafs")
+        self.assertEqual(parsed_args.arch, "arm64")
+        self.assertListEqual(parsed_args.foreign_arch, ["i386"])
+
+        parsed_args = purgatory.cli._parse_args(
+            ["leafs", "-a", "arm64", "--foreign-arch", "i386",
+             "--foreign-arch", "armhf"])
+        self.assertEqual(parsed_args.arch, "arm64")
+        self.assertListEqual(parsed_args.foreign_arch, ["i386", "armhf"])
+
+        parsed_args = purgatory.cli._parse_args(["leafs"])
+        self.assertIsNone(parsed_args.arch)
+        self.assertIsNone(parsed_args.foreign_arch)
+
+    def test_cli_timings_flag_keeps_positional_args(self):
+        parsed_args = purgatory.cli._parse_args(["--timings", "leafs"])
+        self.assertEqual(parsed_args.command, "leafs")
+        self.assertTrue(parsed_args.timings_enabled)
+        self.assertEqual(parsed_args.timings_format, "text")
+        self.assertFalse(parsed_args.trace_allocations)
+
+        parsed_args = purgatory.cli._parse_args(
+            ["--timings", "--trace-allocations", "leafs"])
+        self.assertTrue(parsed_args.timings_enabled)
+        self.assertTrue(parsed_args.trace_allocations)
+
+        parsed_args = purgatory.cli._parse_args(
+            ["purge", "--timings", "--timings-format", "json", "foo"])
+        self.assertEqual(parsed_args.command, "purge")
+        self.assertTrue(parsed_args.timings_enabled)
+        self.assertEqual(parsed_args.timings_format, "json")
+
+        parsed_args = purgatory.cli._parse_args(
+            ["purge", "--trace-allocations", "foo"])
+        self.assertFalse(parsed_args.timings_enabled)
+        self.assertTrue(parsed_args.trace_allocations)
+
+    @unittest.mock.patch("sys.stderr", new_callable=io.StringIO)
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_cli_timings(self, mock_stdout, mock_stderr):
+        args = [
+            "leafs",
+            "--dpkg-status-database",
+            self.__dpkg_db,
+            "--timings",
+            "--timings-format",
+            "json",
+            "--trace-allocations",
+        ]
+
+        expected_exit_code = 0
+
+        try:
+            exit_code = purgatory.cli.cli(args)
+        except SystemExit as ex:
+            exit_code = ex.code
+        stdout = mock_stdout.getvalue()
+        stderr = mock_stderr.getvalue()
+        _log_stdout_stderr(stdout, stderr)
+
+        self.assertEqual(exit_code, expected_exit_code)
+        self.assertIn("apt\n", stdout)
+        phases = json.loads(stderr)
+        self.assertListEqual(
+            [(phase["phase"], phase["depth"]) for phase in phases],
+            [("purgatory leafs", 0), ("apt config", 1), ("apt cache open", 1),
+             ("apt cache filter", 1), ("dpkg graph phase 1", 1),
+             ("dpkg graph phase 2", 1), ("dpkg graph phase 3", 1),
+             ("graph validation", 1), ("graph freeze", 1),
+             ("dpkg graph protected nodes", 1), ("leafs", 1),
+             ("leaf listing", 1)])
+        for phase in phases:
+            self.assertGreaterEqual(phase["seconds"], 0.0)
+            self.assertGreaterEqual(phase["peak"], 0)
+            self.assertGreaterEqual(phase["peak"], phase["allocated"])
+        self.assertFalse(tracemalloc.is_tracing())
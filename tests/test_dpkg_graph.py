@@ -7,10 +7,15 @@
 # pylint: disable=protected-access
 
 
+import io
+import json
+import sys
 import unittest.mock
 
 import purgatory.graph
 import purgatory.dpkg_graph
+import purgatory.dpkg_graph.apt_cache
+import purgatory.dpkg_graph.dependency_table
 
 from . import common
 
@@ -32,6 +37,102 @@ class TestDpkgGraph(common.PurgatoryTestCase):
             purgatory.dpkg_graph.DependencyIsNotInstalledError,
             purgatory.dpkg_graph.TargetVersionsNode, dep_mock)
 
+    def test_target_versions_node_ctor_with_target_pkgs(self):
+        # The target packages are deduplicated and sorted for the uid.
+        tvn = purgatory.dpkg_graph.TargetVersionsNode(
+            target_pkgs=["mawk", "gawk", "mawk"])
+        self.assertEqual(tvn.uid, "<gawk|mawk>")
+        self.assertTupleEqual(tvn.target_packages, ("gawk", "mawk"))
+
+        self.assertRaises(
+            purgatory.dpkg_graph.DependencyIsNotInstalledError,
+            purgatory.dpkg_graph.TargetVersionsNode, target_pkgs=[])
+
+    def test_extract_dependencies_resolution_cache(self):
+        def dep_mock(rawtype, rawstr, target_pkgs):
+            vers = set(
+                unittest.mock.Mock(package=pkg) for pkg in target_pkgs)
+            return unittest.mock.Mock(
+                rawtype=rawtype, rawstr=rawstr, installed_target_versions=vers,
+                or_dependencies=[unittest.mock.Mock()])
+
+        def pkg_mock(arch, deps):
+            version = unittest.mock.Mock(architecture=arch)
+            version.get_dependencies.return_value = deps
+            return unittest.mock.Mock(installed=version)
+
+        extract = purgatory.dpkg_graph.dependency_table.extract_dependencies
+        resolutions = {}
+        dep_types = ("PreDepends", "Depends", "Recommends")
+
+        raw_deps = extract(pkg_mock("amd64", [
+            dep_mock("Depends", "libc6 (>= 2.14)", ["libc6"]),
+            dep_mock("Recommends", "gawk | mawk", ["mawk", "gawk"]),
+        ]), dep_types, resolutions)
+        self.assertListEqual(raw_deps, [
+            purgatory.dpkg_graph.RawDependency(
+                "Depends", "libc6 (>= 2.14)", ("libc6",), ()),
+            purgatory.dpkg_graph.RawDependency(
+                "Recommends", "gawk | mawk", ("gawk", "mawk"), ()),
+        ])
+        self.assertEqual(len(resolutions), 2)
+
+        # The same dependency of a package with the same architecture is
+        # resolved by the cache - even if Apt would resolve it differently.
+        raw_deps = extract(pkg_mock("amd64", [
+            dep_mock("PreDepends", "libc6 (>= 2.14)", ["other"]),
+        ]), dep_types, resolutions)
+        self.assertTupleEqual(raw_deps[0].target_pkgs, ("libc6",))
+        self.assertEqual(raw_deps[0].rawtype, "PreDepends")
+        self.assertEqual(len(resolutions), 2)
+
+        # The same dependency of a package with another architecture needs to
+        # be resolved by Apt.
+        raw_deps = extract(pkg_mock("i386", [
+            dep_mock("Depends", "libc6 (>= 2.14)", ["libc6:i386"]),
+        ]), dep_types, resolutions)
+        self.assertTupleEqual(raw_deps[0].target_pkgs, ("libc6:i386",))
+        self.assertEqual(len(resolutions), 3)
+
+    def test_configure_apt_defaults_to_system_dpkg_db(self):
+        # A minimalistic Apt configuration of a system with the default
+        # dpkg status database.
+        class Configuration(dict):
+
+            def clear(self, prefix):
+                for key in list(self):
+                    if key.startswith(prefix):
+                        del self[key]
+
+            def find(self, key):
+                return self.get(key, "")
+
+        conf = Configuration({
+            "APT::Architecture": "amd64",
+            "Dir::State::status": "/var/lib/dpkg/status"})
+        apt_pkg_mock = unittest.mock.Mock(config=conf)
+        apt_cache = purgatory.dpkg_graph.apt_cache
+
+        with unittest.mock.patch.dict(sys.modules, apt_pkg=apt_pkg_mock), \
+                unittest.mock.patch.object(
+                    apt_cache, "_apt_system_architecture", None), \
+                unittest.mock.patch.object(
+                    apt_cache, "_apt_system_dpkg_db", None), \
+                unittest.mock.patch.object(
+                    apt_cache.package_metadata, "read_architectures",
+                    return_value=("amd64", frozenset())):
+            dpkg_db, _, _ = apt_cache._configure_apt(
+                "/tmp/other-dpkg-status-db", None, None)
+            self.assertEqual(dpkg_db, "/tmp/other-dpkg-status-db")
+
+            # The next graph without an explicit dpkg status database uses
+            # the system's database and not the one of the previous graph.
+            dpkg_db, _, _ = apt_cache._configure_apt(None, None, None)
+            self.assertEqual(dpkg_db, "/var/lib/dpkg/status")
+            self.assertEqual(
+                conf["Dir::State::status"], "/var/lib/dpkg/status")
+        apt_pkg_mock.init_config.assert_called_once_with()
+
     def test_dep_edge_ctor_raise_unsupported_dependency_type_error(self):
         # to_node.dependency.rawtype has to be set to an unsupported dependency
         # type to trigger an UnsupportedDependencyTypeError in the
@@ -172,3 +273,25 @@ class TestDpkgGraph(common.PurgatoryTestCase):
         # kn --> n2
         #
         self.assertSetEqual(g.nodes, set((kn, n2)))
+
+        # The KeepNode is layered, exported and rendered like any other leaf
+        # although it can't be marked as deleted.
+        self.assertListEqual(
+            [[node.uid for node in layer] for layer in g.layers],
+            [["!!KEEP!!", "n1"], ["n2"]])
+        n1.mark_deleted()
+        f = io.StringIO()
+        g.export(f, export_format="json")
+        self.assertListEqual(
+            [(node["uid"], node["layer"])
+             for node in json.loads(f.getvalue())["nodes"]],
+            [("!!KEEP!!", 0), ("n1", 0), ("n2", 1)])
+        self.assertSetEqual(g.nodes, set((kn, n2)))
+
+        try:
+            import pygraphviz  # noqa  # pylint: disable=unused-variable
+        except ImportError:  # pragma: no cover
+            self.skipTest("pygraphviz isn't installed")
+        agraph = g.graphviz_graph
+        self.assertTrue(agraph.has_edge("!!KEEP!!", "n2"))
+        self.assertTrue(agraph.has_edge("n1", "n2"))
@@ -5,12 +5,14 @@
 
 
 import gzip
+import io
 import json
 import logging
 import tempfile
 
 import purgatory.graph.graphviz
 import purgatory.dpkg_graph
+import purgatory.dpkg_graph.apt_cache
 
 from . import common
 from . import common_dpkg_graph
@@ -24,22 +26,31 @@ class TestJessieDpkgGraph(
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.__graph = None
+        self.__dpkg_db = None
 
     def setUp(self):
         super().setUp()
         self.graph.unmark_deleted()
 
+    def tearDown(self):
+        super().tearDown()
+        if self.__dpkg_db is not None:
+            self.__dpkg_db.close()  # Deletes the temporary file.
+
     @property
     def graph(self):
         if self.__graph is None:
             logging.debug(
                 "Initializing DpkgGraph (Jessie amd64 minbase) ...")
             gz = "../test-data/dpkg/jessie-amd64-minbase-dpkg-status-db.gz"
+            # The temporary file is kept until the test is torn down as the
+            # package metadata is read lazily from the dpkg status database.
             tmp = tempfile.NamedTemporaryFile(prefix="dpkg-status-db-")
             with gzip.open(gz, "rb") as f:
                 tmp.write(f.read())
+            tmp.flush()
+            self.__dpkg_db = tmp
             self.__graph = purgatory.dpkg_graph.DpkgGraph(dpkg_db=tmp.name)
-            tmp.close()  # Deletes the temporary file.
             logging.debug("DpkgGraph initialized")
         return self.__graph
 
@@ -113,5 +124,241 @@ class TestJessieDpkgGraph(
         prev_result = json.loads(content)
         self.assertDictEqual(result, prev_result)
 
+    def test_jessie_package_metadata(self):
+        graph = self.graph
+        self.assertEqual(len(graph.package_metadata), 101)
+
+        apt_node = {
+            str(node): node for node in graph.package_nodes}["apt"]
+        self.assertEqual(
+            apt_node.metadata,
+            purgatory.dpkg_graph.PackageMetadata(
+                installed_size=3788,
+                description="commandline package manager",
+                section="admin",
+                priority="important"))
+
+    def test_jessie_purge_footprint(self):
+        graph = self.graph
+        apt_node = {
+            str(node): node for node in graph.package_nodes}["apt"]
+
+        footprint = graph.purge_footprint(set((apt_node,)))
+        self.assertEqual(len(footprint.package_nodes), 9)
+        self.assertIn(apt_node, footprint.package_nodes)
+        self.assertEqual(footprint.installed_size, 14485)
+
+        # The graph must be unchanged.
+        self.assertFalse(graph.deleted_nodes)
+
+    def test_jessie_keep(self):
+        self.graph  # pylint: disable=pointless-statement
+        graph = purgatory.dpkg_graph.DpkgGraph(
+            dpkg_db=self.__dpkg_db.name, keep=["apt", "not-installed"])
+        pkg_to_node = {str(node): node for node in graph.package_nodes}
+
+        keep_node = graph.keep_node
+        self.assertIsInstance(keep_node, purgatory.dpkg_graph.KeepNode)
+        self.assertEqual(len(graph.keep_edges), 1)
+        self.assertSetEqual(
+            keep_node.outgoing_nodes, set((pkg_to_node["apt"],)))
+
+        # apt and all its dependencies are protected but not the leafs.
+        protected = graph.protected_nodes
+        self.assertIn(keep_node, protected)
+        for pkg in ("apt", "gpgv", "libc6"):
+            self.assertIn(pkg_to_node[pkg], protected)
+        self.assertNotIn(pkg_to_node["hostname"], protected)
+
+        # apt isn't a leaf anymore.
+        leafs = graph.leafs_flat
+        self.assertNotIn(pkg_to_node["apt"], leafs)
+        self.assertIn(keep_node, leafs)
+
+        # Purging a protected package isn't possible and leaves the graph
+        # unchanged.
+        self.assertRaises(
+            purgatory.dpkg_graph.KeepNodeCanNotBeMarkedDeletedError,
+            graph.purge_footprint, set((pkg_to_node["gpgv"],)))
+        self.assertFalse(graph.deleted_nodes)
+
+        # The kept graph can be layered, exported and rendered.
+        self.assertIn(keep_node, graph.layers[0])
+        f = io.StringIO()
+        graph.export(f, export_format="json")
+        self.assertEqual(
+            len(json.loads(f.getvalue())["nodes"]), len(graph.nodes))
+        graph.graphviz_graph  # pylint: disable=pointless-statement
+        self.assertFalse(graph.deleted_nodes)
+
+    def test_jessie_reinstall_plan(self):
+        graph = self.graph
+        self.assertSetEqual(
+            graph.missing_recommends,
+            set(("apt-utils", "bash-completion", "bsdmainutils", "dbus",
+                 "gnupg-curl", "libgpm2", "libldap-2.4-2", "libpam-cap",
+                 "libpam-systemd", "libpng12-0", "psmisc", "uuid-runtime")))
+
+        plan = graph.reinstall_plan()
+        self.assertEqual(len(plan.install), 16)
+        self.assertIn("init", plan.install)
+        self.assertListEqual(plan.prevent, sorted(graph.missing_recommends))
+
+        # Nothing needs to be installed on a baseline that is the same.
+        plan = graph.reinstall_plan(baseline_dpkg_db=self.__dpkg_db.name)
+        self.assertListEqual(plan.install, [])
+        self.assertListEqual(plan.prevent, [])
+
+    def test_jessie_parallel_init(self):
+        graph = self.graph
+        parallel_graph = purgatory.dpkg_graph.DpkgGraph(
+            dpkg_db=self.__dpkg_db.name, processes=2)
+
+        # The graph has to be the same independent of the number of processes
+        # used to extract the dependencies.
+        self.assertSetEqual(
+            set(node.uid for node in parallel_graph.nodes),
+            set(node.uid for node in graph.nodes))
+        self.assertSetEqual(
+            set(edge.uid for edge in parallel_graph.edges),
+            set(edge.uid for edge in graph.edges))
+        self.assertSetEqual(
+            parallel_graph.missing_recommends, graph.missing_recommends)
+
+    def test_jessie_architectures(self):
+        graph = self.graph
+        self.assertEqual(graph.architecture, "amd64")
+        self.assertSetEqual(graph.foreign_architectures, set())
+
+        # Analyzing the amd64 database as if it belonged to an arm64 system
+        # fails as the 'all' packages then depend on arm64 packages.
+        with self.assertRaises(
+                purgatory.dpkg_graph.DependencyIsNotInstalledError):
+            purgatory.dpkg_graph.DpkgGraph(
+                dpkg_db=self.__dpkg_db.name, architecture="arm64",
+                foreign_architectures=["amd64"])
+
+        foreign_graph = purgatory.dpkg_graph.DpkgGraph(
+            dpkg_db=self.__dpkg_db.name, foreign_architectures=["i386"])
+        self.assertEqual(foreign_graph.architecture, "amd64")
+        self.assertSetEqual(
+            foreign_graph.foreign_architectures, set(("i386",)))
+
+        # The architectures are detected again for the next graph.
+        amd64_graph = purgatory.dpkg_graph.DpkgGraph(
+            dpkg_db=self.__dpkg_db.name)
+        self.assertEqual(amd64_graph.architecture, "amd64")
+        self.assertSetEqual(
+            set(node.uid for node in amd64_graph.package_nodes),
+            set(node.uid for node in graph.package_nodes))
+
+    def test_jessie_default_dpkg_db_after_explicit_dpkg_db(self):
+        import apt_pkg
+
+        self.graph  # pylint: disable=pointless-statement
+        system_dpkg_db = purgatory.dpkg_graph.apt_cache._apt_system_dpkg_db
+        self.assertNotEqual(system_dpkg_db, self.__dpkg_db.name)
+
+        # A graph without an explicit dpkg status database is built for the
+        # system's database and not for the one of the previous graph.
+        try:
+            purgatory.dpkg_graph.DpkgGraph()
+        except purgatory.dpkg_graph.EmptyAptCacheError:
+            pass  # The system doesn't have any installed packages.
+        self.assertEqual(
+            apt_pkg.config["Dir::State::status"],  # pylint: disable=no-member
+            system_dpkg_db)
+
+    def test_jessie_apt_worker_pool(self):
+        graph = self.graph
+        with purgatory.dpkg_graph.AptWorkerPool(processes=2) as pool:
+            graphs = list(pool.build_graphs(
+                [self.__dpkg_db.name, self.__dpkg_db.name], keep=["apt"]))
+
+            with tempfile.NamedTemporaryFile() as empty_dpkg_db:
+                with self.assertRaises(purgatory.dpkg_graph.AptWorkerError):
+                    pool.build_graph(empty_dpkg_db.name)
+
+        # The graphs built from the snapshots of the worker processes are the
+        # same as the graph built from the Apt cache.
+        for worker_graph in graphs:
+            self.assertIsNone(worker_graph.cache)
+            self.assertEqual(worker_graph.architecture, "amd64")
+            self.assertSetEqual(
+                set(node.uid for node in worker_graph.package_nodes),
+                set(node.uid for node in graph.package_nodes))
+            self.assertSetEqual(
+                set(edge.uid for edge in worker_graph.dependency_edges),
+                set(edge.uid for edge in graph.dependency_edges))
+            self.assertSetEqual(
+                worker_graph.missing_recommends, graph.missing_recommends)
+            self.assertEqual(len(worker_graph.keep_edges), 1)
+
+            footprint = worker_graph.purge_footprint(set(
+                node for node in worker_graph.package_nodes
+                if node.uid == "hostname"))
+            self.assertEqual(len(footprint.package_nodes), 1)
+
+    def test_jessie_autoremove(self):
+        self.graph  # pylint: disable=pointless-statement
+        with tempfile.NamedTemporaryFile("w") as extended_states:
+            for pkg, auto in (("apt", 1), ("debian-archive-keyring", 1),
+                              ("gpgv", 1), ("hostname", 1), ("libc6", 0),
+                              ("not-installed", 1)):
+                extended_states.write(
+                    "Package: %s\nArchitecture: amd64\n"
+                    "Auto-Installed: %d\n\n" % (pkg, auto))
+            extended_states.flush()
+            graph = purgatory.dpkg_graph.DpkgGraph(
+                dpkg_db=self.__dpkg_db.name,
+                extended_states=extended_states.name)
+            kept_graph = purgatory.dpkg_graph.DpkgGraph(
+                dpkg_db=self.__dpkg_db.name, keep=["apt"],
+                extended_states=extended_states.name)
+            pkg_to_node = {str(node): node for node in graph.package_nodes}
+
+            self.assertSetEqual(
+                graph.auto_installed_packages,
+                set(("apt", "debian-archive-keyring", "gpgv", "hostname")))
+            self.assertTrue(pkg_to_node["apt"].auto_installed)
+            self.assertFalse(pkg_to_node["libc6"].auto_installed)
+
+            # gpgv is still needed by other packages and hostname is
+            # essential.
+            self.assertSetEqual(
+                set(str(node) for node in graph.autoremovable_package_nodes),
+                set(("apt", "debian-archive-keyring")))
+            self.assertSetEqual(kept_graph.autoremovable_package_nodes, set())
+
+        # Without extended states all packages are manually installed.
+        self.assertSetEqual(self.graph.auto_installed_packages, set())
+        self.assertSetEqual(self.graph.autoremovable_package_nodes, set())
+
+    def test_jessie_diff(self):
+        graph = self.graph
+        ignore_recommends_graph = purgatory.dpkg_graph.DpkgGraph(
+            dpkg_db=self.__dpkg_db.name, ignore_recommends=True)
+
+        # Ignoring the Recommends removes edges and breaks up cycles but the
+        # installed packages are the same.
+        graph_diff = graph.diff(ignore_recommends_graph)
+        self.assertFalse(graph_diff.added_nodes)
+        self.assertFalse(graph_diff.removed_nodes & graph.package_nodes)
+        self.assertEqual(len(graph_diff.removed_edges), 7)
+        self.assertSetEqual(
+            set(frozenset(str(node) for node in leaf)
+                for leaf in graph_diff.added_leafs),
+            set((frozenset(("e2fsprogs",)), frozenset(("debconf-i18n",)))))
+        self.assertFalse(graph_diff.removed_leafs)
+        self.assertFalse(graph_diff.added_cycles)
+        self.assertEqual(len(graph_diff.removed_cycles), 2)
+
+        deltas = graph.footprint_deltas(ignore_recommends_graph)
+        self.assertDictEqual(
+            {" ".join(str(node) for node in leaf): delta
+             for leaf, delta in deltas.items()},
+            {"init": purgatory.dpkg_graph.DpkgGraph.FootprintDelta(
+                packages=-24, installed_size=-28609)})
+
     def test_graphviz(self):
         self.graph.graphviz_graph  # pylint: disable=pointless-statement
@@ -0,0 +1,187 @@
+"""Tests for purgatory.edge_list_graph."""
+
+# Tests don't require docstrings:
+# pylint: disable=missing-docstring
+
+
+import io
+import json
+import tempfile
+import textwrap
+import tracemalloc
+
+import purgatory.edge_list_graph
+import purgatory.graph
+import purgatory.timings
+
+from . import common
+
+
+_EDGES = (
+    ("web", "api", ""),
+    ("web", "cdn", ""),
+    ("api", "db", "store"),
+    ("api", "db-replica", "store"),
+    ("api", "cache", ""),
+    ("worker", "db", "store"),
+    ("worker", "db-replica", "store"),
+    ("worker", "worker", ""),
+    ("cache", "", ""),
+    ("cdn", "cdn", ""),
+    ("orphan", "", ""),
+)
+
+
+def _edge_list_file(suffix, content):
+    f = tempfile.NamedTemporaryFile(
+        "w", prefix="edge-list-", suffix=suffix, delete=True)
+    f.write(content)
+    f.flush()
+    return f
+
+
+class TestEdgeListGraph(common.PurgatoryTestCase):
+
+    def test_read_edge_list(self):
+        tsv = "# Services\nfrom\tto\tgroup\n\n" + "".join(
+            "\t".join(edge).rstrip("\t") + "\n" for edge in _EDGES)
+        csv = "from,to,group\n" + "".join(
+            ",".join(edge) + "\n" for edge in _EDGES)
+        jsonl = "".join(
+            json.dumps({"from": edge[0], "to": edge[1], "group": edge[2]}) +
+            "\n" for edge in _EDGES)
+        expected_records = [
+            purgatory.edge_list_graph.EdgeListRecord(*edge)
+            for edge in _EDGES]
+
+        for suffix, content in ((".tsv", tsv), (".csv", csv),
+                                (".jsonl", jsonl)):
+            with _edge_list_file(suffix, content) as f:
+                self.assertListEqual(
+                    list(purgatory.edge_list_graph.read_edge_list(f.name)),
+                    expected_records)
+        self.assertListEqual(
+            list(purgatory.edge_list_graph.read_edge_list(
+                io.StringIO(tsv), edge_list_format="tsv")),
+            expected_records)
+
+    def test_read_edge_list_errors(self):
+        with self.assertRaises(
+                purgatory.edge_list_graph.UnsupportedEdgeListFormatError):
+            list(purgatory.edge_list_graph.read_edge_list(io.StringIO("")))
+
+        for edge_list_format, content, line_number in (
+                ("tsv", "a\tb\n\tc\n", 2),
+                ("tsv", "a\tb\tg\tx\n", 1),
+                ("csv", "a,,g\n", 1),
+                ("jsonl", '{"from": "a"}\n\n{"from": "a", "to": 1}\n', 3),
+                ("jsonl", '["a", "b"]\n', 1),
+                ("jsonl", '{"from": "a"\n', 1)):
+            with self.assertRaises(
+                    purgatory.edge_list_graph.EdgeListFormatError) as cm:
+                list(purgatory.edge_list_graph.read_edge_list(
+                    io.StringIO(content), edge_list_format=edge_list_format))
+            self.assertEqual(cm.exception.line_number, line_number)
+
+    def test_edge_list_graph(self):
+        content = textwrap.dedent("""\
+            web\tapi
+            web\tapi
+            web\tcdn
+            api\tdb\tstore
+            api\tdb-replica\tstore
+            api\tcache
+            worker\tdb\tstore
+            worker\tdb-replica\tstore
+            worker\tworker
+            cache
+            cdn\tcdn
+            cdn\tdb\tsingle
+            orphan
+        """)
+        with _edge_list_file(".tsv", content) as f:
+            graph = purgatory.edge_list_graph.EdgeListGraph(f.name)
+
+        self.assertSetEqual(
+            set(graph.named_nodes),
+            set(("web", "api", "cdn", "db", "db-replica", "cache", "worker",
+                 "orphan")))
+        self.assertSetEqual(set(graph.alternatives_nodes),
+                            set(("<db|db-replica>",)))
+        self.assertSetEqual(
+            {str(edge) for edge in graph.edges},
+            set(("web --> api", "web --> cdn", "api --> <db|db-replica>",
+                 "api --> cache", "worker --> <db|db-replica>",
+                 "cdn --> db",
+                 "<db|db-replica> --p=0.500--> db",
+                 "<db|db-replica> --p=0.500--> db-replica")))
+        self.assertSetEqual(
+            graph.leafs,
+            set((frozenset((graph.named_nodes["web"],)),
+                 frozenset((graph.named_nodes["worker"],)),
+                 frozenset((graph.named_nodes["orphan"],)))))
+        self.assertFalse(
+            graph.alternatives_nodes["<db|db-replica>"].
+            counted_in_purge_impact)
+
+        # Removing web obsoletes api, cdn and cache but db and db-replica are
+        # still needed by worker and cdn.
+        rounds = graph.mark_members_including_obsolete_deleted(
+            (graph.named_nodes["web"],))
+        self.assertSetEqual(
+            {str(node) for node in set().union(*rounds)},
+            set(("web", "api", "cdn", "cache")))
+        self.assertSetEqual(
+            {str(node) for node in graph.nodes},
+            set(("worker", "orphan", "<db|db-replica>", "db", "db-replica")))
+
+    def test_edge_list_graph_records(self):
+        graph = purgatory.edge_list_graph.EdgeListGraph(records=_EDGES)
+        with _edge_list_file(".jsonl", "".join(
+                json.dumps({"from": edge[0], "to": edge[1],
+                            "group": edge[2]}) + "\n"
+                for edge in _EDGES)) as f:
+            other_graph = purgatory.edge_list_graph.EdgeListGraph(f.name)
+        graph_diff = graph.diff(other_graph)
+        self.assertFalse(any(graph_diff))
+
+    def test_edge_list_graph_alternatives_node_name_clash(self):
+        with self.assertRaises(purgatory.graph.MemberAlreadyRegisteredError):
+            purgatory.edge_list_graph.EdgeListGraph(records=(
+                ("a", "<b|c>", ""),
+                ("a", "b", "g"),
+                ("a", "c", "g")))
+
+    def test_edge_list_graph_timings(self):
+        timings = purgatory.timings.Timings(trace_allocations=True)
+        self.assertTrue(tracemalloc.is_tracing())
+        with timings.phase("build"):
+            graph = purgatory.edge_list_graph.EdgeListGraph(
+                records=_EDGES, timings=timings)
+        with timings.phase("leafs"):
+            self.assertEqual(len(graph.leafs), 3)
+        timings.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertIs(graph.timings, timings)
+
+        phase_timings = timings.phase_timings
+        self.assertListEqual(
+            [(timing.phase, timing.depth) for timing in phase_timings],
+            [("build", 0), ("edge list records", 1), ("edge list nodes", 1),
+             ("edge list edges", 1), ("graph validation", 1),
+             ("graph freeze", 1), ("leafs", 0)])
+        build = phase_timings[0]
+        for timing in phase_timings:
+            self.assertGreaterEqual(timing.seconds, 0.0)
+            self.assertGreaterEqual(timing.peak, 0)
+            self.assertGreaterEqual(timing.peak, timing.allocated)
+            if timing.depth:
+                self.assertLessEqual(timing.seconds, build.seconds)
+
+        # Disabled timings don't record anything.
+        timings = purgatory.timings.Timings(enabled=False)
+        with timings.phase("build"):
+            graph = purgatory.edge_list_graph.EdgeListGraph(
+                records=_EDGES, timings=timings)
+        self.assertTupleEqual(timings.phase_timings, ())
+        self.assertFalse(graph.timings.enabled)
@@ -0,0 +1,81 @@
+"""Profiling for purgatory.edge_list_graph with a large synthetic graph."""
+
+# Tests don't require docstrings:
+# pylint: disable=missing-docstring
+
+
+import logging
+import random
+import unittest
+
+import purgatory.edge_list_graph
+
+from . import common
+
+
+def _synthetic_records(nodes, edges_per_node, or_ratio=0.2, seed=0):
+    """Yields the records of a random acyclic graph with or-groups."""
+    rand = random.Random(seed)
+    for i in range(nodes):
+        from_name = "n%d" % i
+        yield purgatory.edge_list_graph.EdgeListRecord(from_name, "", "")
+        for _ in range(edges_per_node):
+            j = rand.randrange(i + 1, nodes + 1)
+            if j == nodes:
+                continue
+            group = "or" if rand.random() < or_ratio else ""
+            yield purgatory.edge_list_graph.EdgeListRecord(
+                from_name, "n%d" % j, group)
+
+
+class TestEdgeListGraphProfile(common.PurgatoryTestCase):
+    """Profiling for purgatory.edge_list_graph with a synthetic graph."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__graph = None
+
+    def setUp(self):
+        super().setUp()
+        self.graph.unmark_deleted()
+
+    @property
+    def graph(self):
+        if self.__graph is None:
+            self.__init_graph()
+        return self.__graph
+
+    def __init_graph(self):
+        logging.debug("Initializing EdgeListGraph (synthetic) ...")
+        self.__graph = purgatory.edge_list_graph.EdgeListGraph(
+            records=_synthetic_records(20000, 4))
+        logging.debug("EdgeListGraph initialized")
+
+    @unittest.skip
+    @common.cprofile
+    def test_profile_graph_init(self):
+        self.__init_graph()
+
+    @unittest.skip
+    @common.cprofile
+    def test_profile_leafs(self):
+        # Peels the graph layer by layer with the help of the leaf tracker.
+        graph = self.graph
+        graph.enable_leaf_tracker()
+        try:
+            layer = graph.leafs_flat
+            while layer:
+                for node in layer:
+                    node.mark_deleted()
+                layer = graph.leafs_flat
+        finally:
+            graph.disable_leaf_tracker()
+
+    @unittest.skip
+    @common.cprofile
+    def test_profile_mark_members_including_obsolete_deleted(self):
+        graph = self.graph
+        for leaf in sorted(graph.leafs_flat)[:100]:
+            checkpoint = graph.checkpoint()
+            graph.mark_members_including_obsolete_deleted((leaf,))
+            graph.rollback(checkpoint)
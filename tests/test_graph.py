@@ -7,9 +7,15 @@
 # pylint: disable=protected-access
 
 
+import io
+import json
+import os
 import random
+import tempfile
+import xml.etree.ElementTree
 
 import purgatory.graph
+import purgatory.graph.components
 
 from . import common
 
@@ -380,6 +386,96 @@ class TestGraph(common.PurgatoryTestCase):
         g.unmark_deleted()
         self.assertFalse(n.deleted)
 
+    def test_live_member_views(self):
+        # n1 --e--> n2
+        n1 = Node()
+        n2 = Node()
+        e = Edge(n1, n2)
+
+        def init_nodes_and_edges(graph):
+            graph._add_node(n1)
+            graph._add_node(n2)
+            graph._add_edge(e)
+
+        g = Graph(init_nodes_and_edges)
+        live_nodes = g.live_nodes
+        live_edges = g.live_edges
+        live_deleted_nodes = g.live_deleted_nodes
+        live_deleted_edges = g.live_deleted_edges
+        self.assertIsInstance(live_nodes, purgatory.graph.MemberView)
+        self.assertEqual(len(live_nodes), 2)
+        self.assertEqual(len(live_edges), 1)
+        self.assertFalse(live_deleted_nodes)
+        self.assertFalse(live_deleted_edges)
+
+        # The views reflect marking members as deleted.
+        checkpoint = g.checkpoint()
+        n1.mark_deleted()
+        self.assertSetEqual(set(live_nodes), set((n2,)))
+        self.assertNotIn(n1, live_nodes)
+        self.assertFalse(live_edges)
+        self.assertSetEqual(set(live_deleted_nodes), set((n1,)))
+        self.assertSetEqual(set(live_deleted_edges), set((e,)))
+        self.assertSetEqual(live_nodes | live_deleted_nodes, set((n1, n2)))
+        self.assertSetEqual(g.nodes, set(live_nodes))
+
+        # The views reflect rollbacks and unmarking members as deleted.
+        g.rollback(checkpoint)
+        self.assertEqual(len(live_nodes), 2)
+        self.assertEqual(len(live_edges), 1)
+        self.assertFalse(live_deleted_nodes)
+        n2.mark_deleted()
+        self.assertFalse(live_nodes)
+        g.unmark_deleted()
+        self.assertEqual(len(live_nodes), 2)
+        self.assertFalse(live_deleted_edges)
+
+    def test_member_type_indexes(self):
+        # n1 --e--> n2 --oe--> n3
+
+        class OtherNode(Node):
+            pass
+
+        n1 = Node()
+        n2 = Node()
+        n3 = OtherNode()
+        e = Edge(n1, n2)
+        oe = OrEdge(n2, n3)
+
+        def init_nodes_and_edges(graph):
+            graph._add_node(n1)
+            graph._add_node(n2)
+            graph._add_node(n3)
+            graph._add_edge(e)
+            graph._add_edge(oe)
+
+        g = Graph(init_nodes_and_edges)
+        nodes = g.live_members_of_type(Node)
+        deleted_nodes = g.live_deleted_members_of_type(Node)
+        self.assertSetEqual(set(nodes), set((n1, n2)))
+        self.assertSetEqual(set(g.live_members_of_type(OtherNode)), set((n3,)))
+        self.assertFalse(g.live_members_of_type(Member))
+        self.assertDictEqual(
+            g.member_type_counts,
+            {Node: (2, 0), OtherNode: (1, 0), Edge: (1, 0), OrEdge: (1, 0)})
+
+        checkpoint = g.checkpoint()
+        n2.mark_deleted()
+        self.assertSetEqual(set(nodes), set())
+        self.assertSetEqual(set(deleted_nodes), set((n1, n2)))
+        self.assertDictEqual(
+            g.member_type_counts,
+            {Node: (0, 2), OtherNode: (1, 0), Edge: (0, 1), OrEdge: (0, 1)})
+
+        g.rollback(checkpoint)
+        self.assertEqual(len(nodes), 2)
+        self.assertFalse(deleted_nodes)
+        n3.mark_deleted()
+        self.assertEqual(g.member_type_counts[OtherNode], (0, 1))
+        g.unmark_deleted()
+        self.assertEqual(g.member_type_counts[OtherNode], (1, 0))
+        self.assertEqual(g.member_type_counts[Node], (2, 0))
+
     def test_mark_deleted_edge_and_graph(self):
         # nf --ei--> n --eo--> nt
         n = Node(uid="n")
@@ -567,6 +663,51 @@ class TestGraph(common.PurgatoryTestCase):
         self.assertNotEqual(n1, e)
         self.assertNotEqual(n2, e)
 
+    def test_edge_key_and_lazy_uid(self):
+        n1 = Node("1")
+        n2 = Node("2")
+        e = Edge(n1, n2)
+        e1 = Edge(Node("1"), Node("2"))
+
+        # Edges are identified by a tuple of integers and not by their uid.
+        self.assertEqual(len(e.key), 3)
+        for part in e.key:
+            self.assertIsInstance(part, int)
+        self.assertEqual(e.key, e1.key)
+        self.assertEqual(e, e1)
+        self.assertEqual(hash(e), hash(e1))
+        self.assertNotEqual(e, Edge(n2, n1))
+
+        # The uid and the string are generated on demand.
+        self.assertEqual(e.uid, "1 --> 2")
+        self.assertEqual(str(e), "1 --> 2")
+        self.assertEqual(n1.key, n1.uid)
+
+    def test_member_sort_key(self):
+        n1 = Node("b")
+        n2 = Node("a")
+        n3 = Node("c")
+        e1 = Edge(n1, n3)
+        e2 = Edge(n2, n1)
+
+        def init_nodes_and_edges(graph):
+            graph._add_node(n1)
+            graph._add_node(n2)
+            graph._add_node(n3)
+
+            graph._add_edge(e1)
+            graph._add_edge(e2)
+
+        Graph(init_nodes_and_edges)
+
+        # The sort keys are dense ranks by uid.
+        self.assertListEqual(
+            [node.sort_key for node in (n1, n2, n3)], [1, 0, 2])
+        self.assertListEqual([e1.sort_key, e2.sort_key], [1, 0])
+        self.assertListEqual(
+            sorted([n1, n2, n3], key=lambda node: node.sort_key),
+            sorted([n1, n2, n3]))
+
     def test_graph_nodes_property(self):
         n1 = Node()
         n2 = Node()
@@ -1909,6 +2050,16 @@ class TestGraph(common.PurgatoryTestCase):
         #
         self.assertSetEqual(g.deleted_nodes, set((n1, n2, n3, n4)))
 
+        # The rounds only contain the nodes marked as deleted in the round
+        # and not the nodes marked as deleted previously.
+        g.unmark_deleted()
+        n1.mark_deleted()
+        checkpoint = g.checkpoint()
+        rounds = g.mark_members_including_obsolete_deleted(set((n2,)))
+        self.assertListEqual(rounds, [set((n2,)), set((n3,)), set((n4,))])
+        self.assertSetEqual(
+            g.deleted_nodes_since(checkpoint), set((n2, n3, n4)))
+
     def test_graph_mark_members_including_obsolete_deleted_complex(self):
         # n1 --e1-------------------------- n5
         # n2 --e2(p=0.5)--> n3 --e6------>/ ▲
@@ -2514,3 +2665,519 @@ class TestGraph(common.PurgatoryTestCase):
             self.assertSetEqual(g.leafs_flat, set((n2,)))  # Layer 2
             n2.mark_deleted()
             self.assertSetEqual(g.leafs_flat, set())  # Nothing left
+
+    def test_leaf_tracker(self):
+        # n0 --e0--> n1 ------e1------> n2 --e2(p=0.5)--> n3
+        #              \<--e3(p=0.5)--/
+        n0 = Node(uid="n0")
+        n1 = Node(uid="n1")
+        n2 = Node(uid="n2")
+        n3 = Node(uid="n3")
+
+        e0 = Edge(n0, n1)
+        e1 = Edge(n1, n2)
+        e2 = OrEdge(n2, n3)
+        e3 = OrEdge(n2, n1)
+
+        def init_nodes_and_edges(graph):
+            for node in (n0, n1, n2, n3):
+                graph._add_node(node)
+            for edge in (e0, e1, e2, e3):
+                graph._add_edge(edge)
+
+        g = Graph(init_nodes_and_edges)
+        self.assertFalse(g.leaf_tracker_enabled)
+        g.enable_leaf_tracker()
+        self.assertTrue(g.leaf_tracker_enabled)
+
+        # Peel the graph layer by layer.  Marking n1 as deleted breaks the
+        # cycle and hence its component is split.
+        self.assertSetEqual(g.leafs, set((frozenset((n0,)),)))
+        checkpoint = g.checkpoint()
+        n0.mark_deleted()
+        self.assertSetEqual(g.leafs, set((frozenset((n1, n2)),)))
+        n1.mark_deleted()
+        self.assertSetEqual(g.leafs, set((frozenset((n2,)),)))
+
+        # A rollback after a split rebuilds the tracker.
+        g.rollback(checkpoint)
+        self.assertSetEqual(g.leafs, set((frozenset((n0,)),)))
+
+        # Rollbacks without splits update the counters.
+        n0.mark_deleted()
+        checkpoint = g.checkpoint()
+        e3.mark_deleted()
+        self.assertSetEqual(g.leafs, set((frozenset((n1,)),)))
+        g.unmark_deleted()
+        n0.mark_deleted()
+        checkpoint = g.checkpoint()
+        n2.mark_deleted()  # Marks the whole cycle as deleted.
+        self.assertSetEqual(g.leafs, set((frozenset((n3,)),)))
+        g.rollback(checkpoint)
+        self.assertSetEqual(g.leafs, set((frozenset((n1, n2)),)))
+
+        # The tracker yields the same leafs as determining them from scratch.
+        tracked_leafs = g.leafs
+        g.disable_leaf_tracker()
+        self.assertFalse(g.leaf_tracker_enabled)
+        self.assertSetEqual(g.leafs, tracked_leafs)
+
+    def test_checkpoint_and_rollback(self):
+        # n1 --e1-------------------------- n5
+        # n2 --e2(p=0.5)--> n3 --e6------>/ ▲
+        #    \            /    \            |
+        #    |            ▼e4  ▲e5(p=0.5)   |
+        #    \            \    /            /
+        #     -e3(p=0.5)--> n4 --e7(p=0.5)--
+        n1 = Node(uid="n1")
+        n2 = Node(uid="n2")
+        n3 = Node(uid="n3")
+        n4 = Node(uid="n4")
+        n5 = Node(uid="n5")
+
+        e1 = Edge(n1, n5)
+        e2 = OrEdge(n2, n3)
+        e3 = OrEdge(n2, n4)
+        e4 = Edge(n3, n4)
+        e5 = OrEdge(n4, n3)
+        e6 = Edge(n3, n5)
+        e7 = OrEdge(n4, n5)
+
+        def init_nodes_and_edges(graph):
+            for node in (n1, n2, n3, n4, n5):
+                graph._add_node(node)
+            for edge in (e1, e2, e3, e4, e5, e6, e7):
+                graph._add_edge(edge)
+
+        g = Graph(init_nodes_and_edges)
+
+        def state():
+            # Snapshot of everything that depends on the deleted markers.
+            nodes = {}
+            for node in g.nodes:
+                nodes[node] = (
+                    node.incoming_edges, node.incoming_nodes,
+                    node.outgoing_edges, node.outgoing_nodes,
+                    node.incoming_nodes_recursive,
+                    node.outgoing_nodes_recursive,
+                    node.in_cycle, node.cycle_nodes)
+            probabilities = {edge: edge.probability for edge in g.edges}
+            return (g.deleted_nodes, g.deleted_edges, nodes, probabilities)
+
+        full_state = state()
+
+        # Rolling back without changes is a no-op.
+        cp0 = g.checkpoint()
+        g.rollback(cp0)
+        self.assertEqual(state(), full_state)
+
+        # Nested checkpoints.
+        e2.mark_deleted()
+        cp1_state = state()
+        cp1 = g.checkpoint()
+        e7.mark_deleted()
+        cp2_state = state()
+        cp2 = g.checkpoint()
+        g.mark_members_including_obsolete_deleted(set((n5,)))
+        self.assertEqual(g.nodes, set())
+
+        g.rollback(cp2)
+        self.assertEqual(state(), cp2_state)
+        g.rollback(cp1)
+        self.assertEqual(state(), cp1_state)
+        g.rollback(cp0)
+        self.assertEqual(state(), full_state)
+
+        # Checkpoints beyond a rollback are invalid.
+        with self.assertRaises(purgatory.graph.InvalidCheckpointError):
+            g.rollback(cp2)
+
+        # The rolled back state must match the state that is reached by
+        # unmark_deleted and marking the same members as deleted again.
+        for members in ((n3,), (n4,), (n5,), (n2,), (e5,), (e1, e3)):
+            e2.mark_deleted()
+            cp = g.checkpoint()
+            g.mark_members_including_obsolete_deleted(set(members))
+            g.rollback(cp)
+            rolled_back_state = state()
+            g.unmark_deleted()
+            cp0 = g.checkpoint()
+            e2.mark_deleted()
+            self.assertEqual(rolled_back_state, state())
+            g.rollback(cp0)
+            self.assertEqual(state(), full_state)
+
+        # Checkpoints don't survive unmark_deleted.
+        cp = g.checkpoint()
+        g.unmark_deleted()
+        with self.assertRaises(purgatory.graph.InvalidCheckpointError):
+            g.rollback(cp)
+
+        # Checkpoints beyond a rollback stay invalid once the undo log has
+        # grown past them again.
+        cp1 = g.checkpoint()
+        e2.mark_deleted()
+        cp2 = g.checkpoint()
+        g.rollback(cp1)
+        g.mark_members_including_obsolete_deleted(set((n5,)))
+        with self.assertRaises(purgatory.graph.InvalidCheckpointError):
+            g.rollback(cp2)
+        with self.assertRaises(purgatory.graph.InvalidCheckpointError):
+            g.deleted_nodes_since(cp2)
+        self.assertEqual(g.nodes, set())
+        g.rollback(cp1)
+        self.assertEqual(state(), full_state)
+
+    def test_strongly_connected_components(self):
+        # n1 --e1--> n2 --e2--> n3 --e4--> n4
+        #             ▲         /
+        #              \--e3---
+        n1 = Node(uid="n1")
+        n2 = Node(uid="n2")
+        n3 = Node(uid="n3")
+        n4 = Node(uid="n4")
+
+        e1 = Edge(n1, n2)
+        e2 = Edge(n2, n3)
+        e3 = Edge(n3, n2)
+        e4 = Edge(n3, n4)
+
+        def init_nodes_and_edges(graph):
+            for node in (n1, n2, n3, n4):
+                graph._add_node(node)
+            for edge in (e1, e2, e3, e4):
+                graph._add_edge(edge)
+
+        g = Graph(init_nodes_and_edges)
+
+        comps = purgatory.graph.components.strongly_connected_components(
+            g.nodes)
+        self.assertListEqual(
+            comps, [frozenset((n1,)), frozenset((n2, n3)), frozenset((n4,))])
+
+        n1.mark_deleted()
+        comps = purgatory.graph.components.strongly_connected_components(
+            g.nodes)
+        self.assertListEqual(comps, [frozenset((n2, n3)), frozenset((n4,))])
+
+    def test_chain_index(self):
+        # n0 ----------> n2 --> n4 <--\
+        # n1 --> n3 --/          \--> n5
+        #          \--> n6 --------/
+        nodes = [Node(uid="n%d" % i) for i in range(7)]
+        n0, n1, n2, n3, n4, n5, n6 = nodes
+        edges = [Edge(n0, n2), Edge(n1, n3), Edge(n3, n2), Edge(n2, n4),
+                 Edge(n4, n5), Edge(n5, n4), Edge(n3, n6), Edge(n6, n4)]
+
+        def init_nodes_and_edges(graph):
+            for node in nodes:
+                graph._add_node(node)
+            for edge in edges:
+                graph._add_edge(edge)
+
+        g = Graph(init_nodes_and_edges)
+        chain_index = g.chain_index
+        self.assertIsInstance(chain_index, purgatory.graph.ChainIndex)
+
+        # The cycle n4/n5 is a single hop.
+        cycle = frozenset((n4, n5))
+        self.assertTupleEqual(
+            chain_index.shortest_chain(n5),
+            (frozenset((n0,)), frozenset((n2,)), cycle))
+        self.assertTupleEqual(
+            chain_index.shortest_chain(n0), (frozenset((n0,)),))
+
+        # The k shortest chains are ordered by their length.
+        chains = chain_index.shortest_chains(n4, k=5)
+        self.assertListEqual([len(chain) for chain in chains], [3, 4, 4])
+        self.assertTupleEqual(chains[0], chain_index.shortest_chain(n4))
+        self.assertIn(
+            (frozenset((n1,)), frozenset((n3,)), frozenset((n6,)), cycle),
+            chains)
+
+        # Batch mode.
+        node_to_chains = chain_index.shortest_chains_of((n5, n6))
+        self.assertListEqual(node_to_chains[n5], [chains[0]])
+        self.assertListEqual(
+            node_to_chains[n6],
+            [(frozenset((n1,)), frozenset((n3,)), frozenset((n6,)))])
+        self.assertListEqual(
+            chain_index.shortest_chains_of((n4,), k=5)[n4], chains)
+
+        # The index is a snapshot that ignores nodes marked as deleted.
+        n0.mark_deleted()
+        self.assertRaises(
+            purgatory.graph.DeletedMemberInUseError,
+            g.chain_index.shortest_chain, n0)
+        self.assertEqual(len(g.chain_index.shortest_chain(n5)), 4)
+        self.assertEqual(len(chain_index.shortest_chain(n5)), 3)
+
+    def test_graph_diff(self):
+        # Old:                       New:
+        # n1 --> n2 <--> n3          n1 --> n2 --> n3
+        #                            n4 ---/
+        def init_old_nodes_and_edges(graph):
+            nodes = [Node(uid=uid) for uid in ("n1", "n2", "n3")]
+            for node in nodes:
+                graph._add_node(node)
+            for from_index, to_index in ((0, 1), (1, 2), (2, 1)):
+                graph._add_edge(Edge(nodes[from_index], nodes[to_index]))
+
+        def init_new_nodes_and_edges(graph):
+            nodes = [Node(uid=uid) for uid in ("n1", "n2", "n3", "n4")]
+            for node in nodes:
+                graph._add_node(node)
+            for from_index, to_index in ((0, 1), (1, 2), (3, 1)):
+                graph._add_edge(Edge(nodes[from_index], nodes[to_index]))
+
+        old_graph = Graph(init_old_nodes_and_edges)
+        new_graph = Graph(init_new_nodes_and_edges)
+        graph_diff = old_graph.diff(new_graph)
+        self.assertIsInstance(graph_diff, purgatory.graph.GraphDiff)
+
+        # The members are matched by uid.  Added members belong to the new
+        # graph and removed members to the old graph.
+        self.assertSetEqual(
+            set(node.uid for node in graph_diff.added_nodes), set(("n4",)))
+        self.assertIs(next(iter(graph_diff.added_nodes)).graph, new_graph)
+        self.assertSetEqual(graph_diff.removed_nodes, set())
+        self.assertSetEqual(
+            set(edge.uid for edge in graph_diff.added_edges),
+            set(("n4 --> n2",)))
+        self.assertSetEqual(
+            set(edge.uid for edge in graph_diff.removed_edges),
+            set(("n3 --> n2",)))
+        self.assertSetEqual(
+            set(frozenset(node.uid for node in leaf)
+                for leaf in graph_diff.added_leafs),
+            set((frozenset(("n4",)),)))
+        self.assertSetEqual(graph_diff.removed_leafs, set())
+        self.assertSetEqual(graph_diff.added_cycles, set())
+        self.assertSetEqual(
+            set(frozenset(node.uid for node in cycle)
+                for cycle in graph_diff.removed_cycles),
+            set((frozenset(("n2", "n3")),)))
+
+        # Graphs don't differ from themselves.
+        self.assertFalse(any(new_graph.diff(new_graph)))
+
+    def test_graph_layers_and_export(self):
+        # n1 --> n2 <--> n3 --> n4
+        # n5 --(p=0.5)--> n2
+        # n5 --(p=0.5)--> n4
+        def init_nodes_and_edges(graph):
+            nodes = [Node(uid="n%d" % i) for i in range(1, 6)]
+            for node in nodes:
+                graph._add_node(node)
+            for from_index, to_index in ((0, 1), (1, 2), (2, 1), (2, 3)):
+                graph._add_edge(Edge(nodes[from_index], nodes[to_index]))
+            for to_index in (1, 3):
+                graph._add_edge(OrEdge(nodes[4], nodes[to_index]))
+
+        graph = Graph(init_nodes_and_edges)
+        n1 = graph._nodes["n1"]
+        n1.mark_deleted()
+
+        # The layers are determined for the full graph.
+        self.assertListEqual(
+            [[node.uid for node in layer] for layer in graph.layers],
+            [["n1", "n5"], ["n2", "n3"], ["n4"]])
+        self.assertFalse(graph.deleted_nodes)
+
+        expected_nodes = [
+            {"uid": "n1", "type": "Node", "cycle": None, "layer": 0},
+            {"uid": "n2", "type": "Node", "cycle": 0, "layer": 1},
+            {"uid": "n3", "type": "Node", "cycle": 0, "layer": 1},
+            {"uid": "n4", "type": "Node", "cycle": None, "layer": 2},
+            {"uid": "n5", "type": "Node", "cycle": None, "layer": 0},
+        ]
+        expected_edges = [
+            {"uid": "n1 --> n2", "from": "n1", "to": "n2", "type": "Edge",
+             "rawtype": None, "probability": 1.0},
+            {"uid": "n2 --> n3", "from": "n2", "to": "n3", "type": "Edge",
+             "rawtype": None, "probability": 1.0},
+            {"uid": "n3 --> n2", "from": "n3", "to": "n2", "type": "Edge",
+             "rawtype": None, "probability": 1.0},
+            {"uid": "n3 --> n4", "from": "n3", "to": "n4", "type": "Edge",
+             "rawtype": None, "probability": 1.0},
+            {"uid": "n5 --> n2", "from": "n5", "to": "n2", "type": "OrEdge",
+             "rawtype": None, "probability": 0.5},
+            {"uid": "n5 --> n4", "from": "n5", "to": "n4", "type": "OrEdge",
+             "rawtype": None, "probability": 0.5},
+        ]
+
+        # JSON
+        f = io.StringIO()
+        n1.mark_deleted()
+        deleted_members = graph.deleted_nodes | graph.deleted_edges
+        graph.export(f, export_format="json")
+        self.assertDictEqual(
+            json.loads(f.getvalue()),
+            {"nodes": expected_nodes, "edges": expected_edges})
+
+        # The members marked as deleted are exported but stay deleted.
+        self.assertSetEqual(
+            graph.deleted_nodes | graph.deleted_edges, deleted_members)
+        self.assertSetEqual(
+            set(node.uid for node in graph.deleted_nodes), set(("n1",)))
+
+        # GraphML
+        f = io.StringIO()
+        graph.export(f, export_format="graphml")
+        root = xml.etree.ElementTree.fromstring(f.getvalue())
+        ns = "{http://graphml.graphdrawing.org/xmlns}"
+        keys = {key.get("id"): key.get("attr.name")
+                for key in root.iter(ns + "key")}
+        nodes = []
+        for node in root.iter(ns + "node"):
+            record = {"uid": node.get("id"), "cycle": None}
+            for data in node:
+                record[keys[data.get("key")]] = data.text
+            nodes.append(record)
+        self.assertListEqual(nodes, [
+            {key: str(value) if value is not None else None
+             for key, value in record.items()} for record in expected_nodes])
+        self.assertListEqual(
+            [(edge.get("source"), edge.get("target"))
+             for edge in root.iter(ns + "edge")],
+            [(record["from"], record["to"]) for record in expected_edges])
+
+        with self.assertRaises(purgatory.graph.UnsupportedExportFormatError):
+            graph.export(io.StringIO(), export_format="dot")
+
+        # Arrow and Parquet
+        try:
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError:  # pragma: no cover
+            self.skipTest("pyarrow isn't installed")
+        with tempfile.TemporaryDirectory() as directory:
+            graph.export(directory, export_format="arrow", batch_size=2)
+            with pyarrow.ipc.open_file(
+                    os.path.join(directory, "nodes.arrow")) as reader:
+                self.assertEqual(reader.num_record_batches, 3)
+                self.assertListEqual(
+                    reader.read_all().to_pylist(), expected_nodes)
+            graph.export(directory, export_format="parquet", batch_size=4)
+            parquet_file = pyarrow.parquet.ParquetFile(
+                os.path.join(directory, "edges.parquet"))
+            self.assertEqual(parquet_file.num_row_groups, 2)
+            self.assertListEqual(
+                parquet_file.read().to_pylist(), expected_edges)
+
+    def test_purge_impact(self):
+        # n1 --e1--> n3 --e4(p=0.5)--> n4
+        # n2 --e2-->/   \--e5(p=0.5)--> n5 --e6--> n6
+        #   \--e3----------------------------------/
+        n1 = Node(uid="n1")
+        n2 = Node(uid="n2")
+        n3 = Node(uid="n3")
+        n4 = Node(uid="n4")
+        n5 = Node(uid="n5")
+        n6 = Node(uid="n6")
+
+        e1 = Edge(n1, n3)
+        e2 = Edge(n2, n3)
+        e3 = Edge(n2, n6)
+        e4 = OrEdge(n3, n4)
+        e5 = OrEdge(n3, n5)
+        e6 = Edge(n5, n6)
+
+        def init_nodes_and_edges(graph):
+            for node in (n1, n2, n3, n4, n5, n6):
+                graph._add_node(node)
+            for edge in (e1, e2, e3, e4, e5, e6):
+                graph._add_edge(edge)
+
+        g = Graph(init_nodes_and_edges)
+
+        impact = g.purge_impact
+        self.assertEqual(impact[n1], 1.0)
+        self.assertEqual(impact[n2], 1.0)
+        self.assertEqual(impact[n3], 3.0)
+        self.assertEqual(impact[n4], 2.5)  # n4 + 0.5 * (n1, n2, n3)
+        self.assertEqual(impact[n5], 2.5)
+        # n6 + n5 + n2 (certain) + 0.5 * (n1, n3) as n2 is already counted.
+        self.assertEqual(impact[n6], 4.0)
+
+        # Without the alternative n4 the impact of n5 is certain.
+        n4.mark_deleted()
+        impact = g.purge_impact
+        self.assertNotIn(n4, impact)
+        self.assertEqual(impact[n5], 4.0)
+        self.assertEqual(impact[n6], 5.0)
+
+    def test_purge_impact_all_alternatives_deleted(self):
+        # n1 --e1--> n2 --e2(p=0.5)--> n3 --e4--> n5
+        #              \--e3(p=0.5)--> n4 --e5--/
+        n1 = Node(uid="n1")
+        n2 = Node(uid="n2")
+        n3 = Node(uid="n3")
+        n4 = Node(uid="n4")
+        n5 = Node(uid="n5")
+
+        e1 = Edge(n1, n2)
+        e2 = OrEdge(n2, n3)
+        e3 = OrEdge(n2, n4)
+        e4 = Edge(n3, n5)
+        e5 = Edge(n4, n5)
+
+        def init_nodes_and_edges(graph):
+            for node in (n1, n2, n3, n4, n5):
+                graph._add_node(node)
+            for edge in (e1, e2, e3, e4, e5):
+                graph._add_edge(edge)
+
+        g = Graph(init_nodes_and_edges)
+
+        impact = g.purge_impact
+        self.assertEqual(impact[n3], 2.0)  # n3 + 0.5 * (n1, n2)
+        self.assertEqual(impact[n4], 2.0)
+        # Both alternatives of n2 are deleted along with n5 and hence n2 and
+        # n1 are certainly deleted as well.
+        self.assertEqual(impact[n5], 5.0)
+        n5.mark_deleted()
+        self.assertEqual(len(g.nodes), 0)
+
+    def test_name_index(self):
+        names = [
+            "linux-image-4.9.0-3-amd64", "linux-image-4.9.0-4-amd64",
+            "linux-image-amd64", "linux-headers-4.9.0-4-amd64", "texlive",
+            "texlive-base", "texlive-latex-base", "tex-common", "zsh"]
+        index = purgatory.graph.NameIndex({name: name for name in names})
+
+        self.assertEqual(len(index), len(names))
+        self.assertIn("zsh", index)
+        self.assertNotIn("bash", index)
+        self.assertEqual(index.get("zsh"), "zsh")
+        self.assertIsNone(index.get("bash"))
+
+        self.assertListEqual(
+            index.names_with_prefix("texlive"),
+            ["texlive", "texlive-base", "texlive-latex-base"])
+        self.assertListEqual(index.names_with_prefix("bash"), [])
+        self.assertListEqual(index.names_with_prefix(""), sorted(names))
+
+        self.assertSetEqual(
+            set(index.match_regex(r"linux-image-4\..*")),
+            set(("linux-image-4.9.0-3-amd64", "linux-image-4.9.0-4-amd64")))
+        # The regex has to match the whole name.
+        self.assertSetEqual(
+            set(index.match_regex("texlive")), set(("texlive",)))
+        # Optional characters and alternatives aren't part of the prefix.
+        self.assertSetEqual(
+            set(index.match_regex("texs?.*-base")),
+            set(("texlive-base", "texlive-latex-base")))
+        self.assertSetEqual(
+            set(index.match_regex("zsh|tex-common")),
+            set(("zsh", "tex-common")))
+        with self.assertRaises(purgatory.graph.InvalidNamePatternError):
+            index.match_regex("linux-image-[")
+
+        self.assertSetEqual(
+            set(index.match_glob("texlive-*")),
+            set(("texlive-base", "texlive-latex-base")))
+        self.assertSetEqual(
+            set(index.match_glob("linux-*-4.9.0-4-amd64")),
+            set(("linux-image-4.9.0-4-amd64", "linux-headers-4.9.0-4-amd64")))
+        self.assertDictEqual(index.match_glob("bash*"), {})